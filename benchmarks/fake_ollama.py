@@ -0,0 +1,199 @@
+"""
+Fake Ollama server for load tests
+
+Answers Ollama's `/api/chat` with a fixed reply, streamed as NDJSON at a
+configurable token rate, so API throughput and latency can be measured
+without a model. The prompt and reply token counts reported in the final
+chunk are whitespace word counts.
+
+With `prompt_tokens_per_second` set, prompt processing is simulated like a
+server with a prompt (KV) cache: the server remembers its last few prompts,
+evaluates only the tokens after the longest prefix shared with one of them,
+and reports those in `prompt_eval_count` / `prompt_eval_duration`.
+
+Usage:
+    uv run python benchmarks/fake_ollama.py [--port 11435] [--tokens-per-second 50]
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "Based on the company documents, the answer depends on the policy that "
+    "applies to your case. Please check the referenced sources for the exact "
+    "terms and contact support if anything is unclear."
+)
+
+
+class FakeOllama(ThreadingHTTPServer):
+    """
+    Threaded HTTP server that streams a canned chat reply.
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+        tokens_per_second: Token emission rate (0 sends the reply at once)
+        first_token_delay: Seconds before the first token (prompt processing)
+        reply: Text of every reply; each word is one token
+        prompt_tokens_per_second: Prompt evaluation rate (0 disables the
+            prompt cache simulation)
+        cache_slots: Number of recent prompts kept for prefix reuse
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        port: int = 0,
+        tokens_per_second: float = 50.0,
+        first_token_delay: float = 0.05,
+        reply: str = DEFAULT_REPLY,
+        prompt_tokens_per_second: float = 0.0,
+        cache_slots: int = 4,
+    ):
+        super().__init__(("127.0.0.1", port), _FakeOllamaHandler)
+        self.tokens_per_second = tokens_per_second
+        self.first_token_delay = first_token_delay
+        self.reply = reply
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.requests = 0
+        self._cache: deque[list[str]] = deque(maxlen=cache_slots)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+    def evaluate_prompt(self, messages: list[dict]) -> int:
+        """Tokens of a prompt not covered by a cached prefix."""
+        tokens = [
+            token
+            for message in messages
+            for token in (f"<{message.get('role')}>", *str(message["content"]).split())
+        ]
+        with self._lock:
+            cached = max(
+                (_shared_prefix(tokens, prompt) for prompt in self._cache), default=0
+            )
+            self._cache.append(tokens)
+        return len(tokens) - cached
+
+    def start(self) -> "FakeOllama":
+        """Serve from a daemon thread."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def _shared_prefix(a: list[str], b: list[str]) -> int:
+    n = 0
+    for x, y in zip(a, b, strict=False):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class _FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server: FakeOllama = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        with server._lock:
+            server.requests += 1
+
+        model = payload.get("model", "fake")
+        words = server.reply.split(" ")
+        prompt_tokens = sum(
+            len(str(message.get("content", "")).split())
+            for message in payload.get("messages", [])
+        )
+        interval = 1 / server.tokens_per_second if server.tokens_per_second else 0
+        final = {
+            "model": model,
+            "created_at": "2024-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": len(words),
+        }
+
+        delay = server.first_token_delay
+        if server.prompt_tokens_per_second:
+            evaluated = server.evaluate_prompt(payload.get("messages", []))
+            prompt_seconds = evaluated / server.prompt_tokens_per_second
+            final["prompt_eval_count"] = evaluated
+            final["prompt_eval_duration"] = int(prompt_seconds * 1e9)
+            delay += prompt_seconds
+
+        time.sleep(delay)
+        if not payload.get("stream", True):
+            time.sleep(interval * len(words))
+            final["message"]["content"] = server.reply
+            body = (json.dumps(final) + "\n").encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(interval)
+            self._write_chunk(
+                {
+                    "model": model,
+                    "created_at": "2024-01-01T00:00:00Z",
+                    "message": {
+                        "role": "assistant",
+                        "content": word if i == 0 else f" {word}",
+                    },
+                    "done": False,
+                }
+            )
+        self._write_chunk(final)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, line: dict) -> None:
+        data = (json.dumps(line) + "\n").encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--first-token-delay", type=float, default=0.05)
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeOllama(
+        args.port,
+        args.tokens_per_second,
+        args.first_token_delay,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+    )
+    print(f"Fake Ollama listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
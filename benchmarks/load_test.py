@@ -0,0 +1,359 @@
+"""
+API load test against a fake Ollama server
+
+Starts a fake Ollama (`fake_ollama.py`) streaming tokens at a fixed rate and
+the API under uvicorn in a subprocess pointed at it, then drives each
+selected endpoint with a fixed number of concurrent clients (closed loop:
+every client sends its next request as soon as the previous one finished).
+
+Per endpoint it reports throughput (RPS), latency p50/p95/p99, time to first
+token for the streaming endpoints, errors and the growth of the API process
+resident memory. `--output` writes the report as JSON; `--baseline` compares
+against an earlier report and exits with status 1 when RPS or p95 latency
+regressed by more than `--tolerance`.
+
+Chat sessions run `--turns-per-session` turns before starting a new session,
+so conversation memory grows as it would in use. The RAG endpoints need an
+ingested collection (`make ingest`); the answer cache is disabled unless
+`--answer-cache` is given, and FAQ answers always are, so every request
+reaches the model.
+
+Usage:
+    uv run python benchmarks/load_test.py [--endpoints chat rag] [--concurrency 8]
+    uv run python benchmarks/load_test.py --duration 30 --output build.json \\
+        --baseline main.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+from fake_ollama import FakeOllama
+
+ROOT = Path(__file__).parent.parent
+QUESTIONS_FILE = Path(__file__).parent / "labeled_questions.json"
+
+# endpoint name -> (path, request body field, streams NDJSON)
+ENDPOINTS = {
+    "chat": ("/api/v1/chat", "message", False),
+    "chat-stream": ("/api/v1/chat/stream", "message", True),
+    "rag": ("/api/v1/rag-query", "query", False),
+    "rag-stream": ("/api/v1/rag-query/stream", "query", True),
+}
+
+
+def rss_mb(pid: int) -> float | None:
+    """Resident memory of a process in MiB (Linux only)."""
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None
+    for line in status.splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) / 1024
+    return None
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_api(port: int, ollama_url: str, args: argparse.Namespace):
+    """Run the API under uvicorn and wait until it answers."""
+    uses_rag = any(name.startswith("rag") for name in args.endpoints)
+    env = os.environ | {
+        "OLLAMA_BASE_URL": ollama_url,
+        "OLLAMA_MAX_CONCURRENCY": str(args.ollama_concurrency),
+        "RAG_CACHE_ENABLED": str(args.answer_cache).lower(),
+        "FAQ_ENABLED": "false",
+        "WARM_UP_ON_STARTUP": str(uses_rag).lower(),
+        "MEMORY_BACKEND": "memory",
+    }
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "genai_challenge.main:app",
+            "--app-dir",
+            str(ROOT / "src"),
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("API process exited during startup")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/v1/healthcheck", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("API did not start in time")
+
+
+async def send(
+    client: httpx.AsyncClient, endpoint: str, text: str, session_id: str | None
+) -> tuple[float, float | None, str | None]:
+    """
+    Send one request.
+
+    Returns:
+        (latency, time to first token or None, session_id of the reply)
+    """
+    path, field, streams = ENDPOINTS[endpoint]
+    body = {field: text}
+    if session_id:
+        body["session_id"] = session_id
+
+    started = time.perf_counter()
+    if not streams:
+        response = await client.post(path, json=body)
+        response.raise_for_status()
+        return time.perf_counter() - started, None, response.json().get("session_id")
+
+    ttft = None
+    async with client.stream("POST", path, json=body) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            event = json.loads(line)
+            if event["type"] == "error":
+                raise RuntimeError(event.get("detail", "stream error"))
+            if event["type"] == "token" and ttft is None:
+                ttft = time.perf_counter() - started
+            session_id = event.get("session_id", session_id)
+    return time.perf_counter() - started, ttft, session_id
+
+
+async def run_endpoint(
+    base_url: str, endpoint: str, questions: list[str], args: argparse.Namespace
+) -> dict:
+    """Drive one endpoint with `concurrency` clients; return raw samples."""
+    latencies: list[float] = []
+    ttfts: list[float] = []
+    errors = 0
+    sent = 0
+    deadline = time.monotonic() + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=args.request_timeout
+    ) as client:
+
+        async def worker(n: int) -> None:
+            nonlocal errors, sent
+            session_id, turns = None, 0
+            while time.monotonic() < deadline and (
+                not args.requests or sent < args.requests
+            ):
+                text = questions[(sent + n) % len(questions)]
+                sent += 1
+                try:
+                    latency, ttft, session_id = await send(
+                        client, endpoint, text, session_id
+                    )
+                except Exception:
+                    errors += 1
+                    session_id, turns = None, 0
+                    continue
+                latencies.append(latency)
+                if ttft is not None:
+                    ttfts.append(ttft)
+                turns += 1
+                if turns >= args.turns_per_session:
+                    session_id, turns = None, 0
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "latencies": latencies,
+        "ttfts": ttfts,
+        "errors": errors,
+        "elapsed": elapsed,
+    }
+
+
+def percentiles_ms(samples: list[float]) -> dict:
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+def summarize(raw: dict, rss_before: float | None, rss_after: float | None) -> dict:
+    completed = len(raw["latencies"])
+    growth = None
+    if rss_before is not None and rss_after is not None:
+        growth = rss_after - rss_before
+    return {
+        "requests": completed,
+        "errors": raw["errors"],
+        "rps": completed / raw["elapsed"] if raw["elapsed"] else 0.0,
+        "latency": percentiles_ms(raw["latencies"]),
+        "ttft": percentiles_ms(raw["ttfts"]) if raw["ttfts"] else None,
+        "rss_start_mb": rss_before,
+        "rss_end_mb": rss_after,
+        "rss_growth_mb": growth,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of RPS and p95 latency beyond `tolerance` (a fraction)."""
+    regressions = []
+    for endpoint, result in report["results"].items():
+        base = baseline.get("results", {}).get(endpoint)
+        if not base:
+            continue
+        if result["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(
+                f"{endpoint}: RPS {result['rps']:.1f} < baseline {base['rps']:.1f}"
+            )
+        p95, base_p95 = result["latency"]["p95_ms"], base["latency"]["p95_ms"]
+        if p95 is not None and base_p95 and p95 > base_p95 * (1 + tolerance):
+            regressions.append(
+                f"{endpoint}: p95 {p95:.0f} ms > baseline {base_p95:.0f} ms"
+            )
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    def fmt(value: float | None, spec: str = ">8.0f") -> str:
+        return format(value, spec) if value is not None else f"{'-':>8}"
+
+    config = report["config"]
+    print(
+        f"\n--- LOAD TEST (concurrency={config['concurrency']}, "
+        f"{config['tokens_per_second']:g} tokens/s) ---"
+    )
+    print(
+        f"{'endpoint':<12} {'reqs':>6} {'errs':>5} {'rps':>7} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'p99 ms':>8} {'ttft p50':>8} {'rss +MB':>8}"
+    )
+    for endpoint, result in report["results"].items():
+        latency = result["latency"]
+        ttft = (result["ttft"] or {}).get("p50_ms")
+        print(
+            f"{endpoint:<12} {result['requests']:>6} {result['errors']:>5} "
+            f"{result['rps']:>7.1f} {fmt(latency['p50_ms'])} "
+            f"{fmt(latency['p95_ms'])} {fmt(latency['p99_ms'])} {fmt(ttft)} "
+            f"{fmt(result['rss_growth_mb'], '>8.1f')}"
+        )
+
+
+def main(args: argparse.Namespace) -> dict:
+    questions = [
+        item["question"]
+        for item in json.loads(QUESTIONS_FILE.read_text(encoding="utf-8"))
+    ]
+    ollama = FakeOllama(
+        tokens_per_second=args.tokens_per_second,
+        first_token_delay=args.first_token_delay,
+    ).start()
+    api = start_api(args.port, ollama.url, args)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    results = {}
+    try:
+        for endpoint in args.endpoints:
+            # warm-up pass, excluded from the figures
+            warm_up = argparse.Namespace(**vars(args))
+            warm_up.requests, warm_up.duration = args.concurrency, args.duration
+            asyncio.run(run_endpoint(base_url, endpoint, questions, warm_up))
+
+            rss_before = rss_mb(api.pid)
+            raw = asyncio.run(run_endpoint(base_url, endpoint, questions, args))
+            results[endpoint] = summarize(raw, rss_before, rss_mb(api.pid))
+    finally:
+        api.terminate()
+        api.wait()
+        ollama.stop()
+
+    report = {
+        "config": {
+            "endpoints": args.endpoints,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "max_requests": args.requests,
+            "tokens_per_second": args.tokens_per_second,
+            "first_token_delay_s": args.first_token_delay,
+            "ollama_concurrency": args.ollama_concurrency,
+            "turns_per_session": args.turns_per_session,
+            "answer_cache": args.answer_cache,
+        },
+        "environment": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    print_report(report)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--endpoints", nargs="+", choices=list(ENDPOINTS), default=["chat", "rag"]
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--duration", type=float, default=20.0, help="seconds per endpoint"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=0, help="stop after N requests (0: no cap)"
+    )
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--first-token-delay", type=float, default=0.05)
+    parser.add_argument("--ollama-concurrency", type=int, default=4)
+    parser.add_argument("--turns-per-session", type=int, default=5)
+    parser.add_argument("--answer-cache", action="store_true")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    parser.add_argument("--baseline", type=Path, help="earlier report to compare")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.1, help="allowed regression (fraction)"
+    )
+    args = parser.parse_args()
+
+    report = main(args)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("config") != report["config"]:
+            print("warning: baseline was run with a different configuration")
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,184 @@
+"""
+Prompt prefix reuse benchmark: sliding vs stable message layout
+
+Replays a multi-turn chat and a series of RAG queries and reports, per
+request, the prompt tokens the model server had to evaluate
+(`prompt_eval_count`) and the time it took (`prompt_eval_duration`). Ollama
+skips the part of a prompt that matches the prefix of a recent one (its KV
+cache), so the layouts differ in how much of each prompt is new:
+
+- sliding: the previous layout. The chat window drops one turn per turn, and
+  the RAG context is interpolated into the middle of the system prompt.
+- stable: the layout used by the services. The chat window moves in strides
+  of `--window-stride` turns, and the RAG context follows the fixed prompt.
+
+RAG contexts are paragraphs of `data/documents`, so no ingestion is needed.
+By default the requests go to a fake Ollama (`fake_ollama.py`) that simulates
+the prompt cache; pass `--ollama-url` to measure a real server.
+
+Usage:
+    uv run python benchmarks/prompt_prefix.py [--turns 30] [--window-turns 10]
+    uv run python benchmarks/prompt_prefix.py --ollama-url http://localhost:11434
+"""
+
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+
+from fake_ollama import FakeOllama
+from langchain_ollama import ChatOllama
+
+# add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from genai_challenge.core.prompts import RAG_SYSTEM_PROMPT, SYSTEM_PROMPT
+from genai_challenge.services.memory import ConversationStore
+from genai_challenge.services.rag_service import _build_messages
+
+DOCUMENTS_DIR = Path(__file__).parent.parent / "data" / "documents"
+QUESTIONS_FILE = Path(__file__).parent / "labeled_questions.json"
+LAYOUTS = ["sliding", "stable"]
+
+
+def load_paragraphs() -> list[dict]:
+    """Paragraphs of the sample documents, shaped like retrieved chunks."""
+    paragraphs = []
+    for path in sorted(DOCUMENTS_DIR.glob("*.txt")):
+        for text in path.read_text().split("\n\n"):
+            if len(text.split()) >= 20:
+                paragraphs.append(
+                    {"content": text.strip(), "metadata": {"source": path.name}}
+                )
+    return paragraphs
+
+
+def rag_messages(layout: str, query: str, docs: list[dict]) -> list[dict]:
+    messages = _build_messages(query, docs)
+    if layout == "stable":
+        return messages
+    # the previous builder put the context inside the system prompt
+    head, guidelines = RAG_SYSTEM_PROMPT.split("Guidelines:", 1)
+    system = f"{head}{messages[1]['content']}\nGuidelines:{guidelines}"
+    return [{"role": "system", "content": system}, messages[-1]]
+
+
+def ask(llm: ChatOllama, messages: list[dict]) -> tuple[str, dict]:
+    result = llm.invoke(messages)
+    metadata = result.response_metadata
+    return result.content, {
+        "prompt_tokens": metadata.get("prompt_eval_count") or 0,
+        "prompt_seconds": (metadata.get("prompt_eval_duration") or 0) / 1e9,
+    }
+
+
+def run_chat(llm: ChatOllama, layout: str, questions: list[str], args) -> list[dict]:
+    store = ConversationStore(
+        window_turns=args.window_turns,
+        window_stride=args.window_stride if layout == "stable" else 1,
+    )
+    samples = []
+    for i in range(args.turns):
+        question = questions[i % len(questions)]
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            *store.get_window("benchmark"),
+            {"role": "user", "content": question},
+        ]
+        reply, sample = ask(llm, messages)
+        store.add_interaction("benchmark", question, reply)
+        samples.append(sample)
+    return samples
+
+
+def run_rag(llm: ChatOllama, layout: str, questions: list[str], args) -> list[dict]:
+    paragraphs = load_paragraphs()
+    rng = random.Random(0)
+    samples = []
+    for i in range(args.turns):
+        docs = rng.sample(paragraphs, min(args.top_k, len(paragraphs)))
+        messages = rag_messages(layout, questions[i % len(questions)], docs)
+        samples.append(ask(llm, messages)[1])
+    return samples
+
+
+def summarize(samples: list[dict]) -> dict:
+    tokens = [s["prompt_tokens"] for s in samples]
+    seconds = [s["prompt_seconds"] for s in samples]
+    return {
+        "requests": len(samples),
+        "prompt_tokens": sum(tokens),
+        "prompt_tokens_per_request": sum(tokens) / len(samples),
+        "prompt_seconds": sum(seconds),
+        "prompt_ms_per_request": sum(seconds) / len(samples) * 1000,
+    }
+
+
+def main(args: argparse.Namespace) -> dict:
+    questions = [item["question"] for item in json.loads(QUESTIONS_FILE.read_text())]
+    report = {}
+    for scenario, run in (("chat", run_chat), ("rag", run_rag)):
+        for layout in LAYOUTS:
+            # a fresh fake server per run, so no run starts with a warm cache
+            fake = None
+            url = args.ollama_url
+            if url is None:
+                fake = FakeOllama(
+                    tokens_per_second=0,
+                    first_token_delay=0,
+                    prompt_tokens_per_second=args.prompt_tokens_per_second,
+                ).start()
+                url = fake.url
+            llm = ChatOllama(
+                base_url=url,
+                model=args.model,
+                keep_alive=args.keep_alive,
+                num_ctx=args.num_ctx,
+            )
+            try:
+                report[f"{scenario}/{layout}"] = summarize(
+                    run(llm, layout, questions, args)
+                )
+            finally:
+                if fake is not None:
+                    fake.stop()
+    return report
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"{'run':<14} {'requests':>8} {'prompt tok':>11} {'tok/req':>8} "
+        f"{'eval s':>8} {'ms/req':>8}"
+    )
+    for name, row in report.items():
+        print(
+            f"{name:<14} {row['requests']:>8} {row['prompt_tokens']:>11} "
+            f"{row['prompt_tokens_per_request']:>8.1f} "
+            f"{row['prompt_seconds']:>8.2f} {row['prompt_ms_per_request']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--window-turns", type=int, default=10)
+    parser.add_argument("--window-stride", type=int, default=5)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--ollama-url", help="real Ollama server (default: fake)")
+    parser.add_argument("--model", default="llama3.2:3b")
+    parser.add_argument("--keep-alive", default="30m")
+    parser.add_argument("--num-ctx", type=int, default=8192)
+    parser.add_argument(
+        "--prompt-tokens-per-second",
+        type=float,
+        default=2000.0,
+        help="prompt evaluation rate of the fake server",
+    )
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    args = parser.parse_args()
+
+    report = main(args)
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
@@ -0,0 +1,170 @@
+"""
+Quantized search benchmark: float32 vs int8 vs binary first pass
+
+Builds a synthetic NumPy index (default 1M chunks of 384 dimensions, the
+size of all-MiniLM-L6-v2 vectors) and compares exact search with the two
+quantized modes of `QuantizedRetriever` at several re-scoring multipliers.
+
+For each mode it reports the size of the vectors the first pass scans
+(float32 matrix or in-memory codes), per-query search latency and recall@k
+against exact search. Vectors are drawn around `--clusters` random centers
+and queries are fresh draws from the same distribution, which is closer to
+real embeddings than uniform random vectors (on those, every neighbor is
+about equally far and quantization looks worse than it is).
+
+The index (about 2 GB at the default size) is written to a temporary
+directory unless `--index-dir` is given; an existing index there is reused.
+
+Usage:
+    uv run python benchmarks/quantized_search.py [--size 1000000] [--k 10]
+    uv run python benchmarks/quantized_search.py --size 200000 --multipliers 4 10
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from genai_challenge.adapters.retrievers import (
+    BLOCK_ROWS,
+    MATRIX_FILE,
+    METADATA_FILE,
+    QUANTIZATIONS,
+    NumpyRetriever,
+    QuantizedRetriever,
+    write_quantized_codes,
+)
+
+MODEL = "synthetic"
+
+
+def sample(rng, centers: np.ndarray, size: int, noise: float) -> np.ndarray:
+    """Unit vectors scattered around random centers."""
+    picked = centers[rng.integers(0, len(centers), size=size)]
+    vectors = picked + rng.normal(scale=noise, size=picked.shape)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def build_index(directory: Path, args: argparse.Namespace) -> np.ndarray:
+    """Write the synthetic index and codes; return the cluster centers."""
+    rng = np.random.default_rng(args.seed)
+    centers = rng.normal(size=(args.clusters, args.dim))
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    if (directory / METADATA_FILE).exists():
+        return centers
+
+    directory.mkdir(parents=True, exist_ok=True)
+    matrix = np.lib.format.open_memmap(
+        directory / MATRIX_FILE,
+        mode="w+",
+        dtype=np.float32,
+        shape=(args.size, args.dim),
+    )
+    for start in range(0, args.size, BLOCK_ROWS):
+        rows = min(BLOCK_ROWS, args.size - start)
+        matrix[start : start + rows] = sample(rng, centers, rows, args.noise)
+    matrix.flush()
+    del matrix
+
+    ids = [f"chunk-{i}" for i in range(args.size)]
+    sidecar = {
+        "embedding_model": MODEL,
+        "ids": ids,
+        "documents": [""] * args.size,
+        "metadatas": [None] * args.size,
+    }
+    (directory / METADATA_FILE).write_text(json.dumps(sidecar), encoding="utf-8")
+    write_quantized_codes(directory)
+    return centers
+
+
+def measure(retriever, queries: np.ndarray, k: int) -> tuple[list[set], float]:
+    """Top-k ids per query and the median single-query latency in ms."""
+    results, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        found = retriever.search([query.tolist()], k)[0]
+        latencies.append(time.perf_counter() - started)
+        results.append({doc["id"] for doc in found})
+    return results, float(np.median(latencies)) * 1000
+
+
+def main(args: argparse.Namespace) -> list[dict]:
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.index_dir or Path(tmp) / "index"
+        print(f"Building {args.size} x {args.dim} index in {directory}...")
+        started = time.perf_counter()
+        centers = build_index(directory, args)
+        print(f"  done in {time.perf_counter() - started:.1f}s")
+
+        rng = np.random.default_rng(args.seed + 1)
+        queries = sample(rng, centers, args.queries, args.noise)
+
+        exact = NumpyRetriever(directory, MODEL)
+        truth, latency = measure(exact, queries, args.k)
+        rows = [
+            {
+                "mode": "float32",
+                "multiplier": None,
+                "vector_bytes": exact._matrix.nbytes,
+                "p50_ms": latency,
+                "recall": 1.0,
+            }
+        ]
+        for quantization in QUANTIZATIONS:
+            retriever = QuantizedRetriever(directory, MODEL, quantization=quantization)
+            for multiplier in args.multipliers:
+                retriever.rescore_multiplier = multiplier
+                found, latency = measure(retriever, queries, args.k)
+                hits = sum(len(a & b) for a, b in zip(found, truth, strict=True))
+                rows.append(
+                    {
+                        "mode": quantization,
+                        "multiplier": multiplier,
+                        "vector_bytes": retriever.nbytes,
+                        "p50_ms": latency,
+                        "recall": hits / (len(queries) * args.k),
+                    }
+                )
+    return rows
+
+
+def print_report(rows: list[dict], k: int) -> None:
+    print(
+        f"\n{'mode':<8} {'rescore':>7} {'vectors MB':>10} {'p50 ms':>8} "
+        f"{f'recall@{k}':>9}"
+    )
+    for row in rows:
+        multiplier = f"{row['multiplier']}x" if row["multiplier"] else "-"
+        print(
+            f"{row['mode']:<8} {multiplier:>7} {row['vector_bytes'] / 2**20:>10.1f} "
+            f"{row['p50_ms']:>8.1f} {row['recall']:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--multipliers", type=int, nargs="+", default=[4, 10, 40])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--index-dir", type=Path, help="keep the index here")
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    args = parser.parse_args()
+
+    report = main(args)
+    print_report(report, args.k)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
@@ -0,0 +1,167 @@
+"""
+Retrieval backend benchmark: Chroma vs NumPy exact search
+
+Measures per-query search latency (query embedding excluded) and recall@k of
+both retrieval backends. Brute-force search over the exported embeddings is the
+ground truth, so the NumPy backend scores a recall of 1.0 by construction and
+the Chroma figure shows what its approximate HNSW index gives up.
+
+By default the ingested collection is used, queried with sample questions.
+`--synthetic N` benchmarks N random vectors instead, to see how both backends
+scale past the size of the sample corpus.
+
+Usage:
+    uv run python benchmarks/retrieval_backends.py [--k 3] [--repeat 50]
+    uv run python benchmarks/retrieval_backends.py --synthetic 100000
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from genai_challenge.adapters.chroma import get_embeddings, get_vector_store
+from genai_challenge.adapters.retrievers import (
+    MATRIX_FILE,
+    METADATA_FILE,
+    ChromaRetriever,
+    NumpyRetriever,
+    write_numpy_index,
+)
+from genai_challenge.config import settings
+
+SAMPLE_QUESTIONS = [
+    "What is the refund policy?",
+    "How many vacation days do employees get?",
+    "How do I reset my password?",
+    "What expenses can be reimbursed?",
+    "Is the platform SOC 2 compliant?",
+    "How do I authenticate against the API?",
+    "What changed in the latest release?",
+    "Who should I contact for technical support?",
+    "What are the payment terms for invoices?",
+    "What should I do in my first week?",
+]
+
+
+def synthetic_collection(size: int, dim: int, seed: int = 0):
+    """In-memory Chroma collection with `size` random unit vectors."""
+    import chromadb
+
+    rng = np.random.default_rng(seed)
+    collection = chromadb.EphemeralClient().create_collection("benchmark")
+    for start in range(0, size, 5000):
+        vectors = rng.normal(size=(min(5000, size - start), dim))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        ids = [f"chunk-{i}" for i in range(start, start + len(vectors))]
+        collection.add(
+            ids=ids,
+            embeddings=vectors,
+            documents=ids,
+            metadatas=[{"source": "synthetic"}] * len(ids),
+        )
+    return collection
+
+
+def exact_top_k(index_dir: Path, queries: np.ndarray, k: int) -> list[list[str]]:
+    """Ground truth: full sort of every cosine similarity."""
+    ids = json.loads((index_dir / METADATA_FILE).read_text(encoding="utf-8"))["ids"]
+    matrix = np.load(index_dir / MATRIX_FILE)
+    normalized = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    order = np.argsort(-(normalized @ matrix.T), axis=1)[:, :k]
+    return [[ids[i] for i in row] for row in order]
+
+
+def measure(retriever, queries: np.ndarray, k: int, repeat: int) -> dict:
+    """Time single-query searches and keep the results of the first pass."""
+    latencies = []
+    results = []
+    for n in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            hits = retriever.search([query.tolist()], k)[0]
+            latencies.append((time.perf_counter() - started) * 1000)
+            if n == 0:
+                results.append([doc["id"] for doc in hits])
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "results": results,
+    }
+
+
+def recall(results: list[list[str]], truth: list[list[str]]) -> float:
+    return float(
+        np.mean(
+            [
+                len(set(found) & set(expected)) / len(expected)
+                for found, expected in zip(results, truth, strict=True)
+                if expected
+            ]
+        )
+    )
+
+
+def main(k: int, repeat: int, synthetic: int | None, dim: int) -> dict:
+    if synthetic:
+        collection = synthetic_collection(synthetic, dim)
+        rng = np.random.default_rng(1)
+        queries = rng.normal(size=(100, dim)).astype(np.float32)
+        model = "synthetic"
+    else:
+        collection = get_vector_store()._collection
+        queries = np.asarray(
+            get_embeddings().embed_documents(SAMPLE_QUESTIONS), dtype=np.float32
+        )
+        model = settings.embedding_model
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = Path(tmp)
+        started = time.perf_counter()
+        size = write_numpy_index(collection, index_dir, model)
+        build_seconds = time.perf_counter() - started
+
+        truth = exact_top_k(index_dir, queries, k)
+        backends = {
+            "chroma": ChromaRetriever(collection),
+            "numpy": NumpyRetriever(index_dir, model),
+        }
+        report = {"chunks": size, "k": k, "numpy_build_seconds": build_seconds}
+        for name, retriever in backends.items():
+            stats = measure(retriever, queries, k, repeat)
+            report[name] = {
+                "p50_ms": stats["p50_ms"],
+                "p95_ms": stats["p95_ms"],
+                f"recall@{k}": recall(stats["results"], truth),
+            }
+
+    print(f"\n--- RETRIEVAL BENCHMARK ({size} chunks, k={k}) ---")
+    print(f"NumPy index build: {build_seconds:.2f}s")
+    print(f"{'backend':<8} {'p50 ms':>8} {'p95 ms':>8} {'recall@' + str(k):>10}")
+    for name in backends:
+        row = report[name]
+        print(
+            f"{name:<8} {row['p50_ms']:>8.3f} {row['p95_ms']:>8.3f} "
+            f"{row[f'recall@{k}']:>10.3f}"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--k", type=int, default=settings.default_top_k)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument(
+        "--synthetic", type=int, help="benchmark N random vectors instead"
+    )
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    main(args.k, args.repeat, args.synthetic, args.dim)
@@ -0,0 +1,65 @@
+"""
+Retrieval quality benchmark: vector vs BM25 vs hybrid (RRF)
+
+Runs a small labeled question set (`labeled_questions.json`: question plus the
+source files that answer it) through every retrieval mode and reports
+recall@k: the share of questions with at least one expected source among the
+top k chunks.
+
+Requires an ingested collection (`make ingest`), which also builds the BM25
+index.
+
+Usage:
+    uv run python benchmarks/retrieval_recall.py [--k 1 3 5] [--questions FILE]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# add src to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from genai_challenge.config import settings
+from genai_challenge.services.rag_service import retrieve
+
+MODES = ["vector", "bm25", "hybrid"]
+QUESTIONS_FILE = Path(__file__).parent / "labeled_questions.json"
+
+
+def recall_at_k(questions: list[dict], mode: str, k: int) -> float:
+    settings.retrieval_mode = mode
+    hits = 0
+    for item in questions:
+        docs = retrieve(item["question"], k)
+        sources = {doc["metadata"].get("source") for doc in docs}
+        hits += bool(sources & set(item["sources"]))
+    return hits / len(questions)
+
+
+def main(ks: list[int], questions_path: Path) -> dict:
+    questions = json.loads(questions_path.read_text(encoding="utf-8"))
+    original_mode = settings.retrieval_mode
+    try:
+        report = {
+            mode: {f"recall@{k}": recall_at_k(questions, mode, k) for k in ks}
+            for mode in MODES
+        }
+    finally:
+        settings.retrieval_mode = original_mode
+
+    print(f"\n--- RETRIEVAL RECALL ({len(questions)} questions) ---")
+    print(f"{'mode':<8}" + "".join(f"{'recall@' + str(k):>11}" for k in ks))
+    for mode, row in report.items():
+        print(f"{mode:<8}" + "".join(f"{row[f'recall@{k}']:>11.3f}" for k in ks))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--questions", type=Path, default=QUESTIONS_FILE)
+    args = parser.parse_args()
+
+    main(args.k, args.questions)
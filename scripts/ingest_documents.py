@@ -3,88 +3,274 @@ Docuement ingestion script for RAG pipeline
 
 Read documents from a directory, splits them into chunks, and stores them in ChromaDB with embeddings.
 
+Documents are split at their section headings, then into chunks of
+`chunk_size` tokens of the embedding model's tokenizer (see
+`genai_challenge.core.chunking`). Each chunk's metadata records its section
+title, token count and the tokens it shares with the previous chunk, which
+the RAG service uses to budget the prompt context.
+
+Ingestion is incremental: a manifest stored next to the vector store records
+the content hash of every ingested file and the chunking parameters used.
+Unchanged files are skipped, new or modified files are re-embedded (their old
+chunks are removed first) and chunks of deleted files are removed. Chunks get
+deterministic IDs, so re-running the script never duplicates them.
+
+Ingestion is a streaming pipeline: files are read lazily, chunks are grouped
+into batches of `ingest_batch_size`, batches are embedded on a pool of
+`ingest_workers` threads and written to ChromaDB (in order) as they complete.
+Only a bounded number of batches is in memory at once, and the manifest is
+saved periodically so an interrupted run resumes where it stopped.
+
+Whenever the collection changed (or an index is missing) the BM25 keyword
+index is rebuilt from it, and with RETRIEVAL_BACKEND=numpy so is the NumPy
+exact-search index. Question/answer pairs of FAQ-style files are kept in a
+separate FAQ index, updated for the files that changed since it was written.
+
 Usage:
     uv run python scripts/ingest_documents.py /path/to/documents
 """
 
+import hashlib
+import json
 import sys
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import batched
 from pathlib import Path
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-
 # add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from genai_challenge.adapters.chroma import get_vector_store, get_embeddings
+from genai_challenge.adapters.bm25 import bm25_index_path, write_bm25_index
+from genai_challenge.adapters.chroma import (
+    bump_collection_version,
+    get_token_counter,
+    get_vector_store,
+    numpy_index_path,
+)
+from genai_challenge.adapters.faq import faq_index_path, update_faq_index
+from genai_challenge.adapters.retrievers import (
+    numpy_index_complete,
+    write_numpy_index,
+)
 from genai_challenge.config import settings
+from genai_challenge.core.chunking import chunk_document, split_sections
+
+MANIFEST_FILE = "ingest_manifest.json"
+# seconds between manifest checkpoints during a run
+MANIFEST_SAVE_INTERVAL = 10.0
+# bump when the chunking algorithm changes, so every file is re-chunked
+CHUNKER_VERSION = "sections-tokens-1"
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 of a document's text."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
 
+def chunking_params() -> dict:
+    """Parameters that change the chunks (and vectors) produced for a file."""
+    return {
+        "chunker": CHUNKER_VERSION,
+        "chunk_size": settings.chunk_size,
+        "chunk_overlap": settings.chunk_overlap,
+        "embedding_model": settings.embedding_model,
+    }
 
-def load_documents(docs_path: Path) -> list[dict]:
+
+def manifest_path() -> Path:
+    return Path(settings.chroma_persist_directory) / MANIFEST_FILE
+
+
+def load_manifest() -> dict:
     """
-    Load all text files from a directory
+    Load the ingestion manifest.
 
     Returns:
-        List of dicts with 'content' and 'source' keys
+        Dict with 'params' (chunking parameters) and 'files'
+        (source -> {'hash', 'chunks'}).
+    """
+    path = manifest_path()
+    if not path.exists():
+        return {"params": None, "files": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_manifest(manifest: dict) -> None:
+    path = manifest_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, sort_keys=True), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def load_documents(docs_path: Path) -> Iterator[dict]:
     """
-    documents = []
+    Lazily load all text files from a directory
 
-    for file_path in docs_path.glob("*.txt"):
+    Yields:
+        Dicts with 'content', 'source' and 'hash' keys
+    """
+    for file_path in sorted(docs_path.glob("*.txt")):
         content = file_path.read_text(encoding="utf-8")
-        documents.append(
-            {
-                "content": content,
-                "source": file_path.name,
-            }
-        )
-        print(f"Loaded: {file_path.name}")
-    return documents
+        yield {
+            "content": content,
+            "source": file_path.name,
+            "hash": content_hash(content),
+        }
+
+
+def classify_document(doc: dict, previous_files: dict) -> str:
+    """Return 'new', 'modified' or 'unchanged' for a loaded document."""
+    entry = previous_files.get(doc["source"])
+    if entry is None:
+        return "new"
+    if entry["hash"] != doc["hash"]:
+        return "modified"
+    return "unchanged"
 
 
-def split_documents(documents: list[dict]) -> list[dict]:
+def chunk_id(source: str, file_hash: str, index: int) -> str:
+    """Deterministic chunk ID from the file, its content and chunk position."""
+    return f"{source}:{file_hash[:16]}:{index}"
+
+
+def split_documents(documents: Iterable[dict]) -> Iterator[dict]:
     """
     Split documents into smaller chunks (for better retrieval)
+
+    The last chunk of each document is flagged with 'last' so the pipeline
+    knows when a file is fully written.
     """
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=settings.chunk_size,
-        chunk_overlap=settings.chunk_overlap,
-        separators=["\n\n", "\n", ". ", " ", ""],
-    )
+    count_tokens = get_token_counter()
 
-    chunks = []
     for doc in documents:
-        splits = splitter.split_text(doc["content"])
+        splits = chunk_document(
+            doc["content"], count_tokens, settings.chunk_size, settings.chunk_overlap
+        )
         for i, chunk in enumerate(splits):
-            chunks.append(
-                {
-                    "content": chunk,
-                    "metadata": {
-                        "source": doc["source"],
-                        "chunk_id": i,
-                    },
-                }
-            )
-    return chunks
+            metadata = {
+                "source": doc["source"],
+                "chunk_id": i,
+                "token_count": chunk["token_count"],
+                "overlap_tokens": chunk["overlap_tokens"],
+            }
+            # Chroma metadata values cannot be None
+            if chunk["section"] is not None:
+                metadata["section"] = chunk["section"]
+            yield {
+                "id": chunk_id(doc["source"], doc["hash"], i),
+                "content": chunk["content"],
+                "metadata": metadata,
+                "hash": doc["hash"],
+                "last": i == len(splits) - 1,
+            }
 
 
-def ingest_to_chroma(chunks: list[dict]) -> int:
+def remove_sources(sources: list[str]) -> int:
     """
-    Store document chunks in ChromaDB
+    Delete every chunk of the given source files from ChromaDB.
+
+    Deletes by 'source' metadata, so chunks written before the manifest
+    existed (with random IDs) are removed too.
 
     Returns:
-        Number of chunks ingested
+        Number of chunks removed
     """
+    if not sources:
+        return 0
+
     vector_store = get_vector_store()
+    existing = vector_store.get(where={"source": {"$in": sources}}, include=[])
+    ids = existing["ids"]
+    if ids:
+        vector_store.delete(ids=ids)
+    return len(ids)
 
-    texts = [chunk["content"] for chunk in chunks]
-    metadatas = [chunk["metadata"] for chunk in chunks]
 
-    vector_store.add_texts(texts=texts, metadatas=metadatas)
+def embed_batch(batch: tuple[dict, ...]) -> list[list[float]]:
+    """Embed the texts of one batch of chunks."""
+    embeddings = get_vector_store().embeddings
+    return embeddings.embed_documents([chunk["content"] for chunk in batch])
 
-    return len(chunks)
 
+def write_batch(batch: tuple[dict, ...], vectors: list[list[float]]) -> None:
+    """Upsert one embedded batch of chunks into ChromaDB."""
+    get_vector_store()._collection.upsert(
+        ids=[chunk["id"] for chunk in batch],
+        embeddings=vectors,
+        documents=[chunk["content"] for chunk in batch],
+        metadatas=[chunk["metadata"] for chunk in batch],
+    )
 
-def main(docs_path: str):
-    """Main ingestion pipeline"""
+
+def ingest_to_chroma(
+    chunks: Iterable[dict],
+    manifest: dict,
+    batch_size: int | None = None,
+    workers: int | None = None,
+) -> int:
+    """
+    Embed and store document chunks in ChromaDB, batch by batch.
+
+    Batches are embedded concurrently but written in order; once the last
+    chunk of a file is written the file is recorded in the manifest.
+
+    Returns:
+        Number of chunks ingested
+    """
+    batch_size = batch_size or settings.ingest_batch_size
+    workers = workers or settings.ingest_workers
+
+    count = 0
+    started = last_save = time.perf_counter()
+    pending: deque[tuple[tuple[dict, ...], Future]] = deque()
+
+    def drain_one() -> None:
+        nonlocal count, last_save
+        batch, future = pending.popleft()
+        write_batch(batch, future.result())
+        count += len(batch)
+
+        for chunk in batch:
+            if chunk["last"]:
+                manifest["files"][chunk["metadata"]["source"]] = {
+                    "hash": chunk["hash"],
+                    "chunks": chunk["metadata"]["chunk_id"] + 1,
+                }
+
+        now = time.perf_counter()
+        if now - last_save >= MANIFEST_SAVE_INTERVAL:
+            save_manifest(manifest)
+            last_save = now
+        print(f"  {count} chunks ({count / (now - started):.1f} chunks/s)")
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch in batched(chunks, batch_size):
+                pending.append((batch, executor.submit(embed_batch, batch)))
+                # bound memory: at most two batches per worker in flight
+                if len(pending) >= workers * 2:
+                    drain_one()
+            while pending:
+                drain_one()
+    finally:
+        # keep progress of fully written files if the run is interrupted
+        save_manifest(manifest)
+
+    return count
+
+
+def main(docs_path: str) -> dict:
+    """
+    Main ingestion pipeline
+
+    Returns:
+        Summary with counts of new, modified, unchanged and deleted files,
+        removed and ingested chunks, and throughput.
+    """
     path = Path(docs_path)
 
     if not path.exists():
@@ -94,25 +280,100 @@ def main(docs_path: str):
     print(f"\n--- DOCUMENT INGESTION ---")
     print(f"Source: {path}")
     print(f"Embedding model: {settings.embedding_model}")
-    print(f"Chink size: {settings.chunk_size}, overlap: {settings.chunk_overlap}")
+    print(
+        f"Chink size: {settings.chunk_size} tokens, "
+        f"overlap: {settings.chunk_overlap} tokens"
+    )
+    print(
+        f"Batch size: {settings.ingest_batch_size}, workers: {settings.ingest_workers}"
+    )
+
+    summary = {"new": 0, "modified": 0, "unchanged": 0, "deleted": 0, "removed": 0}
+
+    # Step 1: Compare the directory with the manifest
+    print(f"\n[1/2] Checking for changes...")
+    previous = load_manifest()
+    same_params = previous["params"] == chunking_params()
+    previous_files = previous["files"] if same_params else {}
+    manifest = {"params": chunking_params(), "files": dict(previous_files)}
+
+    current = {file_path.name for file_path in path.glob("*.txt")}
+    deleted = sorted(set(previous["files"]) - current)
+    summary["deleted"] = len(deleted)
+    summary["removed"] += remove_sources(deleted)
+    for source in deleted:
+        manifest["files"].pop(source, None)
+
+    def changed_documents() -> Iterator[dict]:
+        for doc in load_documents(path):
+            status = classify_document(doc, previous_files)
+            summary[status] += 1
+            if status == "unchanged":
+                continue
+            print(f"{status.capitalize()}: {doc['source']}")
+            # drop the file's old chunks before writing the new ones
+            manifest["files"].pop(doc["source"], None)
+            summary["removed"] += remove_sources([doc["source"]])
+            if not split_sections(doc["content"]):
+                # no chunks, so ingest_to_chroma would never record the file
+                manifest["files"][doc["source"]] = {"hash": doc["hash"], "chunks": 0}
+                continue
+            yield doc
 
-    # Step 1: Load documents
-    print(f"\n[1/3] Loading documents...")
-    documents = load_documents(path)
-    print(f"  Total documents: {len(documents)}")
+    # Step 2: Split, embed and store changed documents
+    print(f"\n[2/2] Embedding and ingesting to ChromaDB...")
+    started = time.perf_counter()
+    count = ingest_to_chroma(split_documents(changed_documents()), manifest)
+    elapsed = time.perf_counter() - started
 
-    # Step 2: Split into chunks
-    print(f"\n[2/3] Splitting into chunks...")
-    chunks = split_documents(documents)
-    print(f"  Total chunks: {len(chunks)}")
+    summary["ingested"] = count
+    summary["chunks_per_second"] = count / elapsed if count else 0.0
+
+    print(
+        f"  New: {summary['new']}, modified: {summary['modified']}, "
+        f"unchanged (skipped): {summary['unchanged']}, "
+        f"deleted: {summary['deleted']}"
+    )
+    print(f"  Removed: {summary['removed']} stale chunks")
+    print(
+        f"  Ingested: {count} chunks in {elapsed:.1f}s "
+        f"({summary['chunks_per_second']:.1f} chunks/s)"
+    )
+
+    changed = bool(summary["removed"] or count)
+    if changed or not bm25_index_path().exists():
+        indexed = write_bm25_index(get_vector_store()._collection, bm25_index_path())
+        print(f"  BM25 index: {indexed} chunks at {bm25_index_path()}")
+        changed = True
+
+    if settings.retrieval_backend == "numpy" and (
+        changed or not numpy_index_complete(numpy_index_path())
+    ):
+        indexed = write_numpy_index(
+            get_vector_store()._collection,
+            numpy_index_path(),
+            settings.embedding_model,
+        )
+        print(f"  NumPy index: {indexed} chunks at {numpy_index_path()}")
+        changed = True
+
+    questions, updated = update_faq_index(
+        faq_index_path(),
+        load_documents(path),
+        get_vector_store().embeddings,
+        settings.embedding_model,
+    )
+    if updated:
+        print(f"  FAQ index: {questions} questions at {faq_index_path()}")
+        changed = True
 
-    # Step 3: Ingest to ChromaDB
-    print(f"\n[3/3] Ingesting to ChromaDB...")
-    count = ingest_to_chroma(chunks)
-    print(f"  Ingested: {count} chunks")
+    if changed:
+        # invalidates answers cached (and indexes loaded) by running API processes
+        bump_collection_version()
 
     print(f"\n--- Done ---")
     print(f"Vector store location: {settings.chroma_persist_directory}")
+    return summary
 
 
 if __name__ == "__main__":
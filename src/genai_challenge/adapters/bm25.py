@@ -0,0 +1,205 @@
+"""
+BM25 keyword index
+
+Inverted index over the chunks of the Chroma collection, scored with Okapi
+BM25. Complements the embeddings on exact terms ("SOC 2", "Net 30", version
+numbers) that a small embedding model retrieves poorly.
+
+The index (postings, chunk lengths and texts) is built from the collection
+by `write_bm25_index`, which ingestion runs whenever the collection changes,
+and stored as JSON next to the vector store. API processes load it on first
+use and reload it when the collection version changes.
+"""
+
+import heapq
+import json
+import math
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+from genai_challenge.adapters.chroma import get_collection_version
+from genai_challenge.config import settings
+from genai_challenge.core.metrics import span
+
+BM25_INDEX_FILE = "bm25_index.json"
+# rows read from Chroma per request while building the index
+BUILD_PAGE_SIZE = 5000
+
+# words, numbers and dotted versions ("4.5.0")
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[a-z0-9]+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word / number tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index (term -> [[chunk, term frequency]]).
+    """
+
+    def __init__(
+        self,
+        ids: list[str],
+        documents: list[str],
+        metadatas: list[dict],
+        postings: dict[str, list[list[int]]],
+        lengths: list[int],
+        k1: float = 1.5,
+        b: float = 0.75,
+        version: str = "",
+    ):
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.postings = postings
+        self.lengths = lengths
+        self.k1 = k1
+        self.b = b
+        self.version = version
+        self.avg_length = sum(lengths) / len(lengths) if lengths else 0
+
+    @classmethod
+    def build(
+        cls, ids: list[str], documents: list[str], metadatas: list[dict]
+    ) -> "BM25Index":
+        """Tokenize the chunks and build the postings lists."""
+        postings: dict[str, list[list[int]]] = {}
+        lengths = []
+        for i, document in enumerate(documents):
+            terms = Counter(tokenize(document))
+            lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                postings.setdefault(term, []).append([i, tf])
+        return cls(ids, documents, metadatas, postings, lengths)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log((len(self.ids) - df + 0.5) / (df + 0.5) + 1)
+
+    def search(self, query: str, k: int) -> list[dict]:
+        """
+        Return the k best-scoring chunks for a query, best first.
+
+        Returns:
+            List of dicts with 'id', 'content', 'metadata' and 'bm25_score'
+            keys
+        """
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for i, tf in postings:
+                length_ratio = self.lengths[i] / self.avg_length
+                norm = self.k1 * (1 - self.b + self.b * length_ratio)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [
+            {
+                "id": self.ids[i],
+                "content": self.documents[i],
+                "metadata": self.metadatas[i] or {},
+                "bm25_score": score,
+            }
+            for i, score in top
+        ]
+
+    @classmethod
+    def load(cls, path: Path, version: str = "") -> "BM25Index":
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(
+                f"No BM25 index at {path}; run ingestion to build it"
+            )
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls(**data, version=version)
+
+    def save(self, path: Path) -> None:
+        """Write the index as JSON, replacing any previous file atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "ids": self.ids,
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+            "postings": self.postings,
+            "lengths": self.lengths,
+            "k1": self.k1,
+            "b": self.b,
+        }
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        tmp_path.replace(path)
+
+
+def write_bm25_index(collection: Any, path: Path) -> int:
+    """
+    Build the BM25 index from a Chroma collection and save it.
+
+    Args:
+        collection: Chroma collection to index
+        path: Where to write the index file
+
+    Returns:
+        Number of chunks in the index
+    """
+    ids, documents, metadatas = [], [], []
+    total = collection.count()
+    for offset in range(0, total, BUILD_PAGE_SIZE):
+        page = collection.get(
+            include=["documents", "metadatas"], limit=BUILD_PAGE_SIZE, offset=offset
+        )
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+
+    BM25Index.build(ids, documents, metadatas).save(path)
+    return len(ids)
+
+
+def bm25_index_path() -> Path:
+    return Path(settings.chroma_persist_directory) / BM25_INDEX_FILE
+
+
+_index: BM25Index | None = None
+_lock = threading.Lock()
+
+
+def get_bm25_index() -> BM25Index:
+    """Get the shared BM25 index, reloaded when the collection changes."""
+    global _index
+
+    version = get_collection_version()
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = BM25Index.load(bm25_index_path(), version)
+            index = _index
+    return index
+
+
+def keyword_search(query: str, top_k: int | None = None) -> list[dict]:
+    """
+    Search the BM25 index.
+
+    Args:
+        query: The search query
+        top_k: Number of results to return (default from settings)
+
+    Returns:
+        List of dicts with 'id', 'content', 'metadata' and 'bm25_score' keys
+    """
+    index = get_bm25_index()
+    with span("keyword_search"):
+        return index.search(query, top_k or settings.default_top_k)
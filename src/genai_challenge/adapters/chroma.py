@@ -2,14 +2,54 @@
 ChormaDB adapter for vector storage and retrieval
 
 Uses LangChain's Chroma integration with local sentence-transformers embeddings.
+
+The embedding model and the Chroma client are expensive to build (model weights
+are loaded from disk, the client opens the persistent store), so both are created
+once per process and shared by every request. `warm_up()` and `shutdown()` are
+hooked into the FastAPI lifespan in `main.py`.
+
+Searches go through a retriever (`adapters/retrievers.py`): the Chroma
+collection itself, or an exact-search NumPy index exported from it,
+selected with `RETRIEVAL_BACKEND`. The NumPy index can also be searched
+through quantized codes first (`RETRIEVAL_QUANTIZATION`).
+
+Searches are blocking (CPU-bound embedding plus disk I/O), so async callers
+run them through `run_retrieval`, which uses a dedicated, sized thread pool
+and rejects work with `RetrievalBusyError` when the pool is saturated.
 """
 
+import asyncio
+import contextvars
+import threading
+import uuid
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Any
 
 from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
 
+from genai_challenge.adapters.embedding_cache import embedding_cache
+from genai_challenge.adapters.retrievers import (
+    BaseRetriever,
+    ChromaRetriever,
+    NumpyRetriever,
+    QuantizedRetriever,
+)
 from genai_challenge.config import settings
+from genai_challenge.core.metrics import span
+
+COLLECTION_NAME = "acme_docs"
+# written by ingestion whenever the collection changes
+VERSION_FILE = "collection_version"
+NUMPY_INDEX_DIR = "numpy_index"
+
+# process-wide instances, guarded by _lock on creation
+_embeddings: HuggingFaceEmbeddings | None = None
+_vector_store: Chroma | None = None
+_retriever: BaseRetriever | None = None
+_lock = threading.Lock()
 
 
 def get_embeddings() -> HuggingFaceEmbeddings:
@@ -17,12 +57,41 @@ def get_embeddings() -> HuggingFaceEmbeddings:
     Get the embedding model for vectorizing text.
 
     Uses sentence-transformers model specified in settings.
-    Runs locally, no API calls needed.
+    Runs locally, no API calls needed. The model is loaded on first use
+    and reused afterwards.
     """
-    return HuggingFaceEmbeddings(
-        model_name=settings.embedding_model,
-        model_kwargs={"device": "cpu"},  # Use cuda if gpu available
-    )
+    global _embeddings
+
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                _embeddings = HuggingFaceEmbeddings(
+                    model_name=settings.embedding_model,
+                    model_kwargs={"device": "cpu"},  # Use cuda if gpu available
+                )
+    return _embeddings
+
+
+def get_token_counter() -> Callable[[str], int]:
+    """Count tokens with the tokenizer of the embedding model."""
+    # HuggingFaceEmbeddings wraps a SentenceTransformer model
+    tokenizer = get_embeddings()._client.tokenizer
+
+    def count_tokens(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    return count_tokens
+
+
+def embeddings_uncased() -> bool:
+    """
+    Whether the embedding model's tokenizer lowercases its input.
+
+    Query case does not change the embeddings of such (uncased) models, so
+    the embedding cache can ignore it.
+    """
+    tokenizer = get_embeddings()._client.tokenizer
+    return getattr(tokenizer, "do_lower_case", False) is True
 
 
 def get_vector_store() -> Chroma:
@@ -30,17 +99,257 @@ def get_vector_store() -> Chroma:
     Get or create the ChromaDB vector store
 
     Returns:
-        Chroma instance connected to persistent storage.
+        Shared Chroma instance connected to persistent storage.
+    """
+    global _vector_store
+
+    if _vector_store is None:
+        embeddings = get_embeddings()
+        with _lock:
+            if _vector_store is None:
+                # ensure persist directory exists
+                persist_dir = Path(settings.chroma_persist_directory)
+                persist_dir.mkdir(parents=True, exist_ok=True)
+
+                _vector_store = Chroma(
+                    collection_name=COLLECTION_NAME,
+                    embedding_function=embeddings,
+                    persist_directory=str(persist_dir),
+                )
+    return _vector_store
+
+
+class RetrievalBusyError(Exception):
+    """Raised when the retrieval executor is saturated."""
+
+
+class RetrievalExecutor:
+    """
+    Dedicated thread pool for blocking retrieval calls with backpressure.
+
+    At most `workers` calls run at once. Further calls wait for a free
+    worker, but only up to `max_queue` of them and for at most
+    `queue_timeout` seconds; otherwise `RetrievalBusyError` is raised.
     """
-    # ensure persist directory exists
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        max_queue: int | None = None,
+        queue_timeout: float | None = None,
+    ):
+        self.workers = workers or settings.retrieval_workers
+        self.max_queue = (
+            max_queue if max_queue is not None else settings.retrieval_max_queue
+        )
+        self.queue_timeout = (
+            queue_timeout
+            if queue_timeout is not None
+            else settings.retrieval_queue_timeout
+        )
+        self._executor: ThreadPoolExecutor | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.waiting = 0
+        self.rejected = 0
+
+    def _bind_loop(self) -> None:
+        # asyncio primitives belong to the loop that created them
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.workers)
+            self._loop = loop
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="retrieval"
+            )
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking function on the pool without blocking the event loop."""
+        self._bind_loop()
+
+        if not self._semaphore.locked():
+            # a free worker: acquired without waiting, even with no timeout
+            await self._semaphore.acquire()
+        elif self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise RetrievalBusyError("Retrieval queue is full")
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except TimeoutError:
+                self.rejected += 1
+                raise RetrievalBusyError("Timed out waiting for retrieval") from None
+            finally:
+                self.waiting -= 1
+
+        # run in a copy of the caller's context so timing spans are recorded
+        ctx = contextvars.copy_context()
+        try:
+            return await self._loop.run_in_executor(
+                self._executor, lambda: ctx.run(fn, *args, **kwargs)
+            )
+        finally:
+            self._semaphore.release()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._semaphore = None
+        self._loop = None
+
+
+# singleton executor for the app
+retrieval_executor = RetrievalExecutor()
+
+
+async def run_retrieval(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking retrieval call on the shared retrieval executor."""
+    return await retrieval_executor.run(fn, *args, **kwargs)
+
+
+def warm_up() -> None:
+    """
+    Load the embedding model and open the vector store ahead of the first query.
+
+    A throwaway query is embedded so lazy initialization inside the model
+    (tokenizer, first forward pass) is paid at startup instead of by a user.
+    """
+    get_vector_store()
+    get_retriever()
+    get_embeddings().embed_query("warm up")
+
+
+def shutdown() -> None:
+    """Close the Chroma client and drop the shared instances."""
+    global _embeddings, _vector_store, _retriever
+
+    retrieval_executor.shutdown()
+    with _lock:
+        if _vector_store is not None:
+            client = getattr(_vector_store, "_client", None)
+            close = getattr(client, "close", None)
+            if callable(close):
+                close()
+        _vector_store = None
+        _embeddings = None
+        _retriever = None
+
+
+def embed_query(query: str) -> list[float]:
+    """
+    Embed a query string with the shared embedding model.
+
+    Embeddings are served from the query embedding cache when possible.
+    """
+    lowercase = embeddings_uncased()
+    cached = embedding_cache.get(query, settings.embedding_model, lowercase)
+    if cached is not None:
+        return cached.tolist()
+
+    with span("embed"):
+        embedding = get_embeddings().embed_query(query)
+    embedding_cache.put(query, settings.embedding_model, embedding, lowercase)
+    return embedding
+
+
+def embed_queries(queries: list[str]) -> list[list[float]]:
+    """
+    Embed several query strings, encoding all cache misses in one batch.
+
+    Args:
+        queries: The query strings
+
+    Returns:
+        One embedding per query, in order
+    """
+    model = settings.embedding_model
+    lowercase = embeddings_uncased()
+    embeddings: list[list[float] | None] = []
+    misses: dict[str, list[int]] = {}
+    for i, query in enumerate(queries):
+        cached = embedding_cache.get(query, model, lowercase)
+        embeddings.append(cached.tolist() if cached is not None else None)
+        if cached is None:
+            misses.setdefault(query, []).append(i)
+
+    if misses:
+        texts = list(misses)
+        with span("embed"):
+            vectors = get_embeddings().embed_documents(texts)
+        for text, embedding in zip(texts, vectors, strict=True):
+            embedding_cache.put(text, model, embedding, lowercase)
+            for i in misses[text]:
+                embeddings[i] = embedding
+    return embeddings
+
+
+def get_collection_version() -> str:
+    """
+    Return the current collection version stamp.
+
+    The stamp changes every time ingestion modifies the collection, so
+    in-process caches derived from the collection can detect staleness
+    even though ingestion runs in a separate process.
+    """
+    path = Path(settings.chroma_persist_directory) / VERSION_FILE
+    try:
+        return path.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return ""
+
+
+def bump_collection_version() -> str:
+    """Record that the collection changed. Returns the new version stamp."""
     persist_dir = Path(settings.chroma_persist_directory)
     persist_dir.mkdir(parents=True, exist_ok=True)
 
-    return Chroma(
-        collection_name="acme_docs",
-        embedding_function=get_embeddings(),
-        persist_directory=str(persist_dir),
-    )
+    version = uuid.uuid4().hex
+    (persist_dir / VERSION_FILE).write_text(version, encoding="utf-8")
+    return version
+
+
+def numpy_index_path() -> Path:
+    return Path(settings.chroma_persist_directory) / NUMPY_INDEX_DIR
+
+
+def create_retriever(version: str = "") -> BaseRetriever:
+    """Build the retriever selected by `settings.retrieval_backend`."""
+    if settings.retrieval_backend == "chroma":
+        return ChromaRetriever(get_vector_store()._collection)
+    if settings.retrieval_backend == "numpy" and settings.retrieval_quantization:
+        return QuantizedRetriever(
+            numpy_index_path(),
+            settings.embedding_model,
+            version,
+            settings.retrieval_quantization,
+            settings.retrieval_rescore_multiplier,
+        )
+    if settings.retrieval_backend == "numpy":
+        return NumpyRetriever(numpy_index_path(), settings.embedding_model, version)
+    raise ValueError(f"Unknown retrieval backend: {settings.retrieval_backend}")
+
+
+def get_retriever() -> BaseRetriever:
+    """
+    Get the shared retriever.
+
+    The NumPy index is a snapshot of the collection, so it is reloaded when
+    ingestion bumps the collection version.
+    """
+    global _retriever
+
+    version = get_collection_version() if settings.retrieval_backend == "numpy" else ""
+    retriever = _retriever
+    if retriever is None or retriever.version != version:
+        # built outside _lock (the Chroma retriever takes it); a concurrent
+        # reload at most maps the index twice
+        retriever = create_retriever(version)
+        with _lock:
+            _retriever = retriever
+    return retriever
 
 
 def similarity_search(query: str, top_k: int | None = None) -> list[dict]:
@@ -52,17 +361,35 @@ def similarity_search(query: str, top_k: int | None = None) -> list[dict]:
         top_k: Number of results to return (default from settings)
 
     Returns:
-        List of dicts with 'content' and 'metadata' keys
+        List of dicts with 'id', 'content', 'metadata' and 'score'
+        (cosine similarity) keys, best first
     """
     k = top_k or settings.default_top_k
-    vector_store = get_vector_store()
+    embedding = embed_query(query)
+    with span("vector_search"):
+        return get_retriever().search([embedding], k)[0]
+
+
+def similarity_search_by_vectors(
+    embeddings: list[list[float]], top_k: int | None = None
+) -> list[list[dict]]:
+    """
+    Search for several query embeddings with a single retriever call.
+
+    Chunks retrieved by more than one query share their content and
+    metadata objects.
 
-    results = vector_store.similarity_search(query, k=k)
+    Args:
+        embeddings: Query embeddings
+        top_k: Number of results per query (default from settings)
 
-    return [
-        {
-            "content": doc.page_content,
-            "metadata": doc.metadata,
-        }
-        for doc in results
-    ]
+    Returns:
+        One list of dicts with 'id', 'content', 'metadata' and 'score' keys
+        per query
+    """
+    if not embeddings:
+        return []
+
+    k = top_k or settings.default_top_k
+    with span("vector_search"):
+        return get_retriever().search(embeddings, k)
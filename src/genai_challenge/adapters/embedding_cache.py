@@ -0,0 +1,111 @@
+"""
+In-process LRU cache of query embeddings.
+
+Sits between `similarity_search` and the embedding model so repeated
+questions skip the model forward pass. Keys are the normalized query text
+(lowercased only for uncased models) plus the embedding model name; values
+are stored as compact float32 arrays. The cache is bounded both by entry
+count and by total bytes.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from genai_challenge.config import settings
+
+
+def normalize_query(text: str, lowercase: bool = False) -> str:
+    """
+    Normalize query text for cache lookups.
+
+    Collapses whitespace. With `lowercase`, also lowercases the text, for
+    models whose tokenizer lowercases its input (uncased models such as the
+    default all-MiniLM-L6-v2), where case does not change the output.
+    """
+    text = " ".join(text.split())
+    return text.lower() if lowercase else text
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU cache of query embeddings.
+    """
+
+    def __init__(self, max_entries: int | None = None, max_bytes: int | None = None):
+        self.max_entries = max_entries or settings.embedding_cache_max_entries
+        self.max_bytes = max_bytes or settings.embedding_cache_max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], np.ndarray] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(
+        self, text: str, model_name: str, lowercase: bool = False
+    ) -> np.ndarray | None:
+        """
+        Return the cached embedding, or None on a miss.
+
+        `lowercase` makes the lookup ignore case; pass it for uncased models.
+        """
+        key = (normalize_query(text, lowercase), model_name)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return vector
+
+    def put(
+        self,
+        text: str,
+        model_name: str,
+        embedding: list[float],
+        lowercase: bool = False,
+    ) -> np.ndarray:
+        """Store an embedding and return its float32 copy."""
+        key = (normalize_query(text, lowercase), model_name)
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector.setflags(write=False)
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[key] = vector
+            self._bytes += vector.nbytes
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+        return vector
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Snapshot of cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+# singleton instance for the app
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,259 @@
+"""
+FAQ answer index
+
+Question/answer pairs found in the documents ("Q: ..." lines followed by
+"A: ..." lines, as in `faq.txt`) are extracted at ingestion and stored with
+the embedding of each question. A query whose embedding is at least
+`faq_similarity_threshold` similar to an FAQ question is answered with the
+stored answer, skipping retrieval and generation.
+
+The index is stored as JSON next to the vector store and records the
+content hash of every file it was extracted from, so `update_faq_index`
+only re-extracts (and re-embeds) files that changed. API processes load it
+on first use and reload it when the collection version changes; without an
+index no query matches.
+"""
+
+import json
+import re
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from genai_challenge.adapters.chroma import get_collection_version
+from genai_challenge.config import settings
+from genai_challenge.core.chunking import split_sections
+from genai_challenge.core.metrics import span
+
+FAQ_INDEX_FILE = "faq_index.json"
+
+_QUESTION = re.compile(r"^Q:\s*(.*)$")
+_ANSWER = re.compile(r"^A:\s*(.*)$")
+
+
+def extract_qa_pairs(text: str, source: str) -> list[dict]:
+    """
+    Question/answer pairs of a document.
+
+    A pair starts at a "Q:" line and its answer at the next "A:" line; both
+    may continue on the following lines, up to a blank line or the next
+    "Q:". Questions without an answer are skipped.
+
+    Returns:
+        Dicts with 'question', 'answer', 'source' and 'section' keys
+    """
+    pairs = []
+    for title, _, body in split_sections(text):
+        question, answer = None, None
+        for line in [*body.splitlines(), ""]:
+            line = line.strip()
+            if match := _QUESTION.match(line):
+                if question and answer:
+                    pairs.append((title, question, answer))
+                question, answer = [match.group(1)], None
+            elif question and (match := _ANSWER.match(line)):
+                answer = [match.group(1)]
+            elif line and question:
+                (answer or question).append(line)
+            elif not line:
+                if question and answer:
+                    pairs.append((title, question, answer))
+                question, answer = None, None
+    return [
+        {
+            "question": " ".join(question),
+            "answer": " ".join(answer),
+            "source": source,
+            "section": title,
+        }
+        for title, question, answer in pairs
+    ]
+
+
+class FAQIndex:
+    """
+    FAQ entries with the normalized embeddings of their questions.
+    """
+
+    def __init__(
+        self,
+        entries: list[dict],
+        embeddings: np.ndarray,
+        embedding_model: str,
+        sources: dict[str, str],
+        version: str = "",
+    ):
+        self.entries = entries
+        self.embeddings = embeddings
+        self.embedding_model = embedding_model
+        # source file -> content hash the entries were extracted from
+        self.sources = sources
+        self.version = version
+
+    @classmethod
+    def empty(cls, embedding_model: str, version: str = "") -> "FAQIndex":
+        return cls([], np.zeros((0, 0), dtype=np.float32), embedding_model, {}, version)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def match(
+        self, embeddings: list[list[float]], threshold: float
+    ) -> list[dict | None]:
+        """
+        Best FAQ entry for each query embedding.
+
+        Returns:
+            Per query, the entry with a 'score' (cosine similarity of the
+            questions), or None if no question scores at least `threshold`
+        """
+        if not self.entries:
+            return [None for _ in embeddings]
+        queries = np.asarray(embeddings, dtype=np.float32)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        scores = queries @ self.embeddings.T
+        best = scores.argmax(axis=1)
+        return [
+            {**self.entries[i], "score": float(row[i])} if row[i] >= threshold else None
+            for i, row in zip(best, scores, strict=True)
+        ]
+
+    @classmethod
+    def load(cls, path: Path, version: str = "") -> "FAQIndex":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        embeddings = np.asarray(data["embeddings"], dtype=np.float32)
+        return cls(
+            data["entries"],
+            embeddings if len(embeddings) else np.zeros((0, 0), dtype=np.float32),
+            data["embedding_model"],
+            data["sources"],
+            version,
+        )
+
+    def save(self, path: Path) -> None:
+        """Write the index as JSON, replacing any previous file atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "embedding_model": self.embedding_model,
+            "sources": self.sources,
+            "entries": self.entries,
+            "embeddings": self.embeddings.tolist(),
+        }
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        tmp_path.replace(path)
+
+
+def update_faq_index(
+    path: Path, documents: Iterable[dict], embeddings: Any, embedding_model: str
+) -> tuple[int, int]:
+    """
+    Bring the FAQ index up to date with the documents and save it.
+
+    Files whose content hash differs from the one recorded in the index are
+    re-extracted, and their questions embedded; files no longer present are
+    dropped. The index is rebuilt from scratch for another embedding model.
+
+    Args:
+        path: Where the index file is (or will be) stored
+        documents: Every current document, as dicts with 'content', 'source'
+            and 'hash' keys
+        embeddings: Embedding model (`embed_documents`) for the questions
+        embedding_model: Name of that model
+
+    Returns:
+        Tuple of (questions in the index, files updated or removed)
+    """
+    path = Path(path)
+    index = FAQIndex.empty(embedding_model)
+    if path.exists():
+        stored = FAQIndex.load(path)
+        if stored.embedding_model == embedding_model:
+            index = stored
+
+    current, changed = set(), {}
+    for doc in documents:
+        current.add(doc["source"])
+        if index.sources.get(doc["source"]) != doc["hash"]:
+            changed[doc["source"]] = (
+                doc["hash"],
+                extract_qa_pairs(doc["content"], doc["source"]),
+            )
+    removed = set(index.sources) - current
+    if not changed and not removed:
+        return len(index), 0
+
+    keep = [
+        i
+        for i, entry in enumerate(index.entries)
+        if entry["source"] not in changed and entry["source"] not in removed
+    ]
+    entries = [index.entries[i] for i in keep]
+    vectors = [index.embeddings[keep]] if keep else []
+    added = [pair for _, pairs in changed.values() for pair in pairs]
+    if added:
+        new = np.asarray(
+            embeddings.embed_documents([pair["question"] for pair in added]),
+            dtype=np.float32,
+        )
+        new /= np.maximum(np.linalg.norm(new, axis=1, keepdims=True), 1e-12)
+        entries.extend(added)
+        vectors.append(new)
+
+    sources = {
+        source: file_hash
+        for source, file_hash in index.sources.items()
+        if source not in removed
+    }
+    sources.update({source: file_hash for source, (file_hash, _) in changed.items()})
+    matrix = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+    FAQIndex(entries, matrix, embedding_model, sources).save(path)
+    return len(entries), len(changed) + len(removed)
+
+
+def faq_index_path() -> Path:
+    return Path(settings.chroma_persist_directory) / FAQ_INDEX_FILE
+
+
+_index: FAQIndex | None = None
+_lock = threading.Lock()
+
+
+def get_faq_index() -> FAQIndex:
+    """Get the shared FAQ index, reloaded when the collection changes."""
+    global _index
+
+    version = get_collection_version()
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                path = faq_index_path()
+                if path.exists():
+                    _index = FAQIndex.load(path, version)
+                else:
+                    _index = FAQIndex.empty(settings.embedding_model, version)
+            index = _index
+    return index
+
+
+def match_faq(embeddings: list[list[float]]) -> list[dict | None]:
+    """
+    Find the FAQ entry answering each query.
+
+    Args:
+        embeddings: Query embeddings
+
+    Returns:
+        Per query, a dict with 'question', 'answer', 'source', 'section' and
+        'score' keys, or None if no FAQ question is similar enough
+    """
+    index = get_faq_index()
+    if index.embedding_model != settings.embedding_model:
+        return [None for _ in embeddings]
+    with span("faq_lookup"):
+        return index.match(embeddings, settings.faq_similarity_threshold)
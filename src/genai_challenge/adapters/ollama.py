@@ -3,32 +3,360 @@ Ollama adapter usings LangChain ChatOllama.
 
 This module wraps LangCHain's ChatOllama to keep the arquitecture clean.
 Upper layers (services) interact with this adapter, not directly with LangChain.
+
+ChatOllama instances are pooled per backend and model name, so the underlying
+HTTP client (and its keep-alive connections) is reused across requests instead
+of being rebuilt on every turn. With several Ollama hosts (`OLLAMA_BASE_URLS`),
+generations are routed to the least busy healthy host, fail over to another
+host when one is down, and stick to one host per session.
+
+Generations are admitted by a `GenerationScheduler` (`adapters/scheduler.py`),
+which caps how many run at once and orders the waiting ones by priority class
+and session.
 """
 
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import httpx
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_ollama import ChatOllama
 
+from genai_challenge.adapters.scheduler import INTERACTIVE, GenerationScheduler
 from genai_challenge.config import settings
+from genai_challenge.core.metrics import metrics, span
+
+llm_tokens = metrics.counter(
+    "genai_llm_tokens_total", "Prompt (in) and generated (out) LLM tokens"
+)
+time_to_first_token = metrics.histogram(
+    "genai_llm_time_to_first_token_seconds",
+    "Time from sending a streamed generation to its first token",
+)
+backend_outstanding = metrics.gauge(
+    "genai_llm_backend_outstanding", "Generations in progress per Ollama backend"
+)
+backend_available = metrics.gauge(
+    "genai_llm_backend_available", "1 if the backend is healthy with a closed circuit"
+)
+backend_failures = metrics.counter(
+    "genai_llm_backend_failures_total", "Failed generations per Ollama backend"
+)
+
+# seconds a health probe may take
+PROBE_TIMEOUT = 2.0
+
+
+class OllamaBackend:
+    """
+    One Ollama host with its load and health state.
+
+    The circuit opens after `failure_threshold` consecutive failed
+    generations: the host gets no traffic for `circuit_reset_seconds`, then
+    one more failure opens it again while a success closes it.
+    """
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.healthy = True
+        self.open_until = 0.0
+
+    def available(self) -> bool:
+        """Healthy on the last probe and circuit closed (or half-open)."""
+        return self.healthy and time.monotonic() >= self.open_until
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= settings.ollama_failure_threshold:
+            self.open_until = time.monotonic() + settings.ollama_circuit_reset_seconds
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "healthy": self.healthy,
+            "circuit_open": time.monotonic() < self.open_until,
+        }
+
+
+def is_backend_failure(exc: Exception) -> bool:
+    """Whether an error means the host failed (rather than the request)."""
+    if isinstance(exc, (httpx.TransportError, ConnectionError)):
+        return True
+    return getattr(exc, "status_code", 0) >= 500
+
+
+class ChatModelPool:
+    """
+    Pool of ChatOllama clients over one or more Ollama backends.
+
+    One client is kept per (backend, model); its httpx connection pool keeps
+    connections to Ollama alive between requests. A scheduler bounds how
+    many generations run at the same time, `max_concurrency` per backend.
+
+    Generations go to the available backend with the fewest outstanding
+    requests. A session sticks to the backend that served it, so its
+    conversation prefix stays in that host's KV cache, while that backend is
+    available and has fewer than `max_concurrency` generations in flight.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int | None = None,
+        keepalive_expiry: float | None = None,
+        queue_timeout: float | None = None,
+        base_urls: list[str] | None = None,
+    ):
+        self._max_concurrency = max_concurrency or settings.ollama_max_concurrency
+        self._keepalive_expiry = (
+            keepalive_expiry
+            if keepalive_expiry is not None
+            else settings.ollama_keepalive_expiry
+        )
+        urls = base_urls or settings.ollama_base_urls or [settings.ollama_base_url]
+        self.backends = [OllamaBackend(url) for url in urls]
+        self._models: dict[tuple[str, str], ChatOllama] = {}
+        # session_id -> backend it was last served by, least recent first
+        self._sessions: OrderedDict[str, OllamaBackend] = OrderedDict()
+        self.scheduler = GenerationScheduler(
+            self._max_concurrency * len(self.backends), queue_timeout
+        )
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._created = 0
+        self._reused = 0
+        self._requests = 0
+
+    def _build(self, backend: OllamaBackend, model: str) -> ChatOllama:
+        limits = httpx.Limits(
+            max_connections=self._max_concurrency,
+            max_keepalive_connections=self._max_concurrency,
+            keepalive_expiry=self._keepalive_expiry,
+        )
+        # only override the server defaults that are configured
+        options = {
+            key: value
+            for key, value in (
+                ("keep_alive", settings.ollama_keep_alive),
+                ("num_ctx", settings.ollama_num_ctx),
+            )
+            if value is not None
+        }
+        return ChatOllama(
+            base_url=backend.url,
+            model=model,
+            async_client_kwargs={"limits": limits},
+            **options,
+        )
+
+    def _bind_loop(self) -> None:
+        """
+        Bind the pool to the running event loop.
+
+        httpx async connections belong to the loop that created them; if the
+        loop changes (e.g. a new test loop), the clients are rebuilt rather
+        than reused across loops.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._models.clear()
+            self._loop = loop
+
+    def choose(
+        self, session_id: str | None = None, exclude: list[OllamaBackend] = ()
+    ) -> OllamaBackend:
+        """
+        Pick the backend for a generation.
+
+        Args:
+            session_id: Conversation to keep on the same backend
+            exclude: Backends that already failed this generation
+        """
+        candidates = [b for b in self.backends if b not in exclude]
+        sticky = self._sessions.get(session_id) if session_id else None
+        available = [b for b in candidates if b.available()]
+        if sticky in available and sticky.outstanding < self._max_concurrency:
+            backend = sticky
+        elif available:
+            # ties go to the session's backend, then to the one that served
+            # fewer requests
+            backend = min(
+                available, key=lambda b: (b.outstanding, b is not sticky, b.requests)
+            )
+        else:
+            # every host is failing: try the one expected to recover first
+            backend = min(candidates, key=lambda b: (not b.healthy, b.open_until))
+
+        if session_id:
+            self._sessions[session_id] = backend
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > settings.ollama_sticky_max_sessions:
+                self._sessions.popitem(last=False)
+        return backend
+
+    def get(
+        self, model_name: str | None = None, backend: OllamaBackend | None = None
+    ) -> ChatOllama:
+        """Return the pooled client for a model, creating it on first use."""
+        model = model_name or settings.ollama_model
+        backend = backend or self.choose()
+        chat_model = self._models.get((backend.url, model))
+        if chat_model is None:
+            chat_model = self._build(backend, model)
+            self._models[backend.url, model] = chat_model
+            self._created += 1
+        else:
+            self._reused += 1
+        return chat_model
+
+    @asynccontextmanager
+    async def slot(
+        self, priority: str = INTERACTIVE, session_id: str | None = None
+    ) -> AsyncIterator[None]:
+        """
+        Wait for a generation slot.
+
+        Raises:
+            LLMBusyError: No slot freed up within the queue timeout
+        """
+        self._bind_loop()
+        async with self.scheduler.slot(priority, session_id):
+            yield
+
+    @asynccontextmanager
+    async def connect(
+        self, backend: OllamaBackend, model_name: str | None = None
+    ) -> AsyncIterator[ChatOllama]:
+        """Borrow a backend's client for one attempt and record its outcome."""
+        backend.outstanding += 1
+        backend.requests += 1
+        self._requests += 1
+        _update_backend_metrics(backend)
+        try:
+            yield self.get(model_name, backend)
+        except Exception as e:
+            if is_backend_failure(e):
+                backend.record_failure()
+                if settings.metrics_enabled:
+                    backend_failures.inc(backend=backend.url)
+            raise
+        else:
+            backend.record_success()
+        finally:
+            backend.outstanding -= 1
+            _update_backend_metrics(backend)
+
+    def can_fail_over(self, exc: Exception, tried: list[OllamaBackend]) -> bool:
+        """Whether a failed attempt should be retried on another backend."""
+        return is_backend_failure(exc) and len(tried) < len(self.backends)
+
+    async def _probe(self, client: httpx.AsyncClient, backend: OllamaBackend) -> None:
+        try:
+            response = await client.get(f"{backend.url}/api/tags")
+            backend.healthy = response.status_code == 200
+        except httpx.HTTPError:
+            backend.healthy = False
+        _update_backend_metrics(backend)
+
+    async def check_health(self) -> None:
+        """Probe every backend and mark it healthy or not."""
+        async with httpx.AsyncClient(timeout=PROBE_TIMEOUT) as client:
+            await asyncio.gather(*(self._probe(client, b) for b in self.backends))
+
+    async def run_health_checks(self, interval: float | None = None) -> None:
+        """Probe the backends every `interval` seconds, until cancelled."""
+        interval = interval or settings.ollama_health_interval
+        while True:
+            await self.check_health()
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        """Snapshot of pool usage counters."""
+        return {
+            "models": sorted({model for _, model in self._models}),
+            "clients_created": self._created,
+            "clients_reused": self._reused,
+            "requests": self._requests,
+            "in_flight": self.scheduler.in_flight,
+            "waiting": self.scheduler.waiting(),
+            "max_concurrency": self._max_concurrency,
+            "backends": [backend.stats() for backend in self.backends],
+        }
+
+    async def aclose(self) -> None:
+        """Close pooled HTTP clients and forget them."""
+        for chat_model in self._models.values():
+            async_client = getattr(chat_model, "_async_client", None)
+            http_client = getattr(async_client, "_client", None)
+            if http_client is not None:
+                await http_client.aclose()
+        self._models.clear()
+        self._loop = None
+
+
+def _update_backend_metrics(backend: OllamaBackend) -> None:
+    if settings.metrics_enabled:
+        backend_outstanding.set(backend.outstanding, backend=backend.url)
+        backend_available.set(float(backend.available()), backend=backend.url)
+
+
+# singleton pool for the app
+chat_model_pool = ChatModelPool()
 
 
 def get_chat_model(model_name: str | None = None) -> ChatOllama:
     """
-    Factory function. Creates a ChatOllama instance
+    Return the pooled ChatOllama instance for a model.
 
     Args:
         model_name: Optional model override. Uses default if not provided.
     Returns:
-        Configured ChatOllama instance.
+        Configured ChatOllama instance, shared across calls.
     """
-    return ChatOllama(
-        base_url=settings.ollama_base_url,
-        model=model_name or settings.ollama_model,
-    )
+    return chat_model_pool.get(model_name)
+
+
+def _record_usage(message) -> None:
+    """Count the tokens Ollama reports for a generation."""
+    usage = getattr(message, "usage_metadata", None)
+    if not settings.metrics_enabled or not usage:
+        return
+    llm_tokens.inc(usage.get("input_tokens", 0), direction="in")
+    llm_tokens.inc(usage.get("output_tokens", 0), direction="out")
+
+
+def _to_langchain_messages(messages: list[dict[str, str]]) -> list:
+    """Convert role/content dicts to Langchain message objects."""
+    langchain_messages = []
+    for msg in messages:
+        role = msg["role"]
+        content = msg["content"]
+
+        if role == "system":
+            langchain_messages.append(SystemMessage(content=content))
+        elif role == "user":
+            langchain_messages.append(HumanMessage(content=content))
+        elif role == "assistant":
+            langchain_messages.append(AIMessage(content=content))
+    return langchain_messages
 
 
 async def generate_response(
     messages: list[dict[str, str]],
     model_name: str | None = None,
+    priority: str = INTERACTIVE,
+    session_id: str | None = None,
 ) -> str:
     """
     Generate a response from Ollama given a list of messages.
@@ -37,24 +365,73 @@ async def generate_response(
         messages: list of message dicts with 'role' and 'content' keys.
                 Roles: 'system', 'user', 'assistant'
         model_name: Optional model override.
+        priority: Scheduling class, "interactive" or "batch".
+        session_id: Conversation the request belongs to, for fair queuing.
     Returns:
         The assistant's response text (LLM).
     """
-    chat_model = get_chat_model(model_name)
-
-    # Convert dicts to Langchain message objects
-    langchain_messages = []
-    for msg in messages:
-        role = msg["role"]
-        content = msg["content"]
+    langchain_messages = _to_langchain_messages(messages)
 
-        if role == "system":
-            langchain_messages.append(SystemMessage(content=content))
-        elif role == "user":
-            langchain_messages.append(HumanMessage(content=content))
-        elif role == "assistant":
-            langchain_messages.append(AIMessage(content=content))
-    # Call Ollama via Langchain
-    response = await chat_model.ainvoke(langchain_messages)
+    # Call Ollama via Langchain, failing over to another backend if needed
+    async with chat_model_pool.slot(priority, session_id):
+        tried = []
+        while True:
+            backend = chat_model_pool.choose(session_id, exclude=tried)
+            tried.append(backend)
+            try:
+                async with chat_model_pool.connect(backend, model_name) as chat_model:
+                    with span("llm"):
+                        response = await chat_model.ainvoke(langchain_messages)
+                break
+            except Exception as e:
+                if not chat_model_pool.can_fail_over(e, tried):
+                    raise
 
+    _record_usage(response)
     return response.content
+
+
+async def stream_response(
+    messages: list[dict[str, str]],
+    model_name: str | None = None,
+    priority: str = INTERACTIVE,
+    session_id: str | None = None,
+) -> AsyncIterator[str]:
+    """
+    Stream a response from Ollama token by token.
+
+    Args:
+        messages: list of message dicts with 'role' and 'content' keys.
+        model_name: Optional model override.
+        priority: Scheduling class, "interactive" or "batch".
+        session_id: Conversation the request belongs to, for fair queuing.
+    Yields:
+        Text chunks of the assistant's response as they are generated.
+    """
+    langchain_messages = _to_langchain_messages(messages)
+
+    async with chat_model_pool.slot(priority, session_id):
+        tried = []
+        while True:
+            backend = chat_model_pool.choose(session_id, exclude=tried)
+            tried.append(backend)
+            streaming = False
+            try:
+                async with chat_model_pool.connect(backend, model_name) as chat_model:
+                    with span("llm"):
+                        started = time.perf_counter()
+                        async for chunk in chat_model.astream(langchain_messages):
+                            # token counts arrive with the final, empty chunk
+                            _record_usage(chunk)
+                            if chunk.content:
+                                if not streaming and settings.metrics_enabled:
+                                    time_to_first_token.observe(
+                                        time.perf_counter() - started
+                                    )
+                                streaming = True
+                                yield chunk.content
+                return
+            except Exception as e:
+                # once tokens went out, a retry would repeat them
+                if streaming or not chat_model_pool.can_fail_over(e, tried):
+                    raise
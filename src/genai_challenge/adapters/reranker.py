@@ -0,0 +1,232 @@
+"""
+Cross-encoder re-ranking of retrieved chunks.
+
+The bi-encoder ranks chunks by comparing embeddings computed separately for
+the query and each chunk. A cross-encoder reads the query and a chunk
+together and judges their relevance much better, but needs one forward pass
+per pair, so it only re-orders a short candidate list: the RAG pipeline
+retrieves `rerank_candidates` chunks, scores them in one batched call and
+keeps the best `top_k`.
+
+Pair scores are kept in an LRU cache keyed by model, normalized query and
+chunk text (the query is lowercased only for uncased models), so repeated
+questions over the same chunks score only new pairs. Scoring that is
+expected to take longer than `rerank_budget_seconds` is skipped and the
+retrieval order kept. The expectation is a moving average of the measured
+time per pair.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from genai_challenge.adapters.embedding_cache import normalize_query
+from genai_challenge.config import settings
+from genai_challenge.core.metrics import metrics
+
+# weight of the latest measurement in the per-pair time average
+COST_SMOOTHING = 0.2
+
+reranks = metrics.counter("genai_rerank_total", "Re-ranked candidate lists, by result")
+rerank_pairs = metrics.counter(
+    "genai_rerank_pairs_total", "Query-chunk pairs, scored or read from the cache"
+)
+
+
+class PairScoreCache:
+    """
+    Thread-safe LRU cache of cross-encoder scores of (query, chunk) pairs.
+    """
+
+    def __init__(self, max_entries: int | None = None):
+        self.max_entries = max_entries or settings.rerank_cache_max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str, str], float] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(
+        self, model_name: str, query: str, texts: list[str], lowercase: bool = False
+    ) -> list[float | None]:
+        """
+        Cached score of each text against the query; None on a miss.
+
+        `lowercase` makes the lookup ignore the query's case; pass it for
+        uncased models.
+        """
+        query = normalize_query(query, lowercase)
+        scores = []
+        with self._lock:
+            for text in texts:
+                key = (model_name, query, text)
+                score = self._entries.get(key)
+                if score is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                scores.append(score)
+        return scores
+
+    def put_many(
+        self,
+        model_name: str,
+        query: str,
+        texts: list[str],
+        scores: list[float],
+        lowercase: bool = False,
+    ) -> None:
+        query = normalize_query(query, lowercase)
+        with self._lock:
+            for text, score in zip(texts, scores, strict=True):
+                key = (model_name, query, text)
+                self._entries[key] = score
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Snapshot of cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+class Reranker:
+    """
+    Re-orders retrieved chunks by cross-encoder score.
+
+    The model is loaded on first use, or at startup by `warm_up`. Scoring is
+    blocking, so async callers run `rerank` through `run_retrieval`.
+    """
+
+    def __init__(
+        self,
+        model_name: str | None = None,
+        budget_seconds: float | None = None,
+        cache: PairScoreCache | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.model_name = model_name or settings.rerank_model
+        self.budget_seconds = budget_seconds or settings.rerank_budget_seconds
+        self.cache = cache or PairScoreCache()
+        self._clock = clock
+        self._model: Any = None
+        self._lock = threading.Lock()
+        # moving average of scoring time per pair; 0 until the first call
+        self.seconds_per_pair = 0.0
+
+    def _get_model(self) -> Any:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    # imported here: the model is only needed with re-ranking on
+                    from sentence_transformers import CrossEncoder
+
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    @property
+    def uncased(self) -> bool:
+        """Whether the model's tokenizer lowercases its input."""
+        tokenizer = getattr(self._get_model(), "tokenizer", None)
+        return getattr(tokenizer, "do_lower_case", False) is True
+
+    def warm_up(self) -> None:
+        """
+        Load the model and score a throwaway pair ahead of the first query.
+
+        The pair is not timed: the first forward pass is much slower than
+        the rest and would make the budget check skip scoring.
+        """
+        self._get_model().predict(
+            [("warm up", "warm up")], batch_size=1, show_progress_bar=False
+        )
+
+    def _score(self, query: str, texts: list[str]) -> list[float]:
+        """Score every pair in one batched forward pass."""
+        model = self._get_model()
+        started = self._clock()
+        scores = model.predict(
+            [(query, text) for text in texts],
+            batch_size=len(texts),
+            show_progress_bar=False,
+        )
+        per_pair = (self._clock() - started) / len(texts)
+        with self._lock:
+            if self.seconds_per_pair:
+                per_pair = (
+                    COST_SMOOTHING * per_pair
+                    + (1 - COST_SMOOTHING) * self.seconds_per_pair
+                )
+            self.seconds_per_pair = per_pair
+        return [float(score) for score in scores]
+
+    def _over_budget(self, pairs: int) -> bool:
+        """Whether scoring `pairs` pairs is expected to exceed the budget."""
+        if self.budget_seconds is None:
+            return False
+        with self._lock:
+            if pairs * self.seconds_per_pair <= self.budget_seconds:
+                return False
+            # skipped calls measure nothing, so let the estimate decay until
+            # scoring is tried again, instead of skipping forever after a
+            # single slow call
+            self.seconds_per_pair *= 1 - COST_SMOOTHING
+            return True
+
+    def rerank(self, query: str, docs: list[dict], top_n: int) -> list[dict]:
+        """
+        Keep the `top_n` chunks that score best against the query.
+
+        Re-ranked chunks get a 'rerank_score'; their similarity 'score' is
+        left as is. When scoring is skipped for the time budget, the first
+        `top_n` chunks are returned in retrieval order.
+        """
+        if len(docs) < 2:
+            return docs[:top_n]
+
+        texts = [doc["content"] for doc in docs]
+        lowercase = self.uncased
+        scores = self.cache.get_many(self.model_name, query, texts, lowercase)
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if settings.metrics_enabled:
+            rerank_pairs.inc(len(docs) - len(missing), source="cache")
+
+        if missing:
+            if self._over_budget(len(missing)):
+                if settings.metrics_enabled:
+                    reranks.inc(result="skipped")
+                return docs[:top_n]
+            missing_texts = [texts[i] for i in missing]
+            scored = self._score(query, missing_texts)
+            self.cache.put_many(
+                self.model_name, query, missing_texts, scored, lowercase
+            )
+            if settings.metrics_enabled:
+                rerank_pairs.inc(len(missing), source="model")
+            for i, score in zip(missing, scored, strict=True):
+                scores[i] = score
+
+        if settings.metrics_enabled:
+            reranks.inc(result="scored" if missing else "cached")
+        best = sorted(range(len(docs)), key=scores.__getitem__, reverse=True)
+        return [{**docs[i], "rerank_score": scores[i]} for i in best[:top_n]]
+
+
+# singleton instance for the app
+reranker = Reranker()
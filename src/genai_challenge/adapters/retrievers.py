@@ -0,0 +1,441 @@
+"""
+Vector retrieval backends
+
+The backends take query embeddings and return the top-k chunks as dicts
+with 'id', 'content', 'metadata' and 'score' (cosine similarity) keys:
+- `ChromaRetriever`: queries the persistent Chroma collection (HNSW index
+  behind SQLite), the default.
+- `NumpyRetriever`: exact search over a memory-mapped float32 matrix of
+  normalized embeddings plus a JSON metadata sidecar. Suited to corpora that
+  fit in RAM: a query is one matrix-vector product and an `argpartition`.
+- `QuantizedRetriever`: the NumPy index searched in two passes. A compact
+  copy of the vectors held in RAM (int8 scalar codes, 4x smaller, or sign
+  bits compared by Hamming distance, 32x smaller) selects
+  `k * rescore_multiplier` candidates, which are re-scored with their
+  full-precision rows read from the memory-mapped matrix.
+
+Select the backend with `RETRIEVAL_BACKEND` ("chroma" or "numpy") and, for
+the NumPy backend, `RETRIEVAL_QUANTIZATION` (unset, "int8" or "binary"). The
+NumPy index and its quantized codes are built from the Chroma collection by
+`write_numpy_index`, which ingestion runs whenever the collection changes.
+"""
+
+import json
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+MATRIX_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.json"
+INT8_FILE = "embeddings_int8.npy"
+INT8_SCALES_FILE = "int8_scales.npy"
+BINARY_FILE = "embeddings_binary.npy"
+QUANTIZATIONS = ("int8", "binary")
+# vector files of a non-empty index; an empty index has only the metadata
+VECTOR_FILES = (MATRIX_FILE, INT8_FILE, INT8_SCALES_FILE, BINARY_FILE)
+# rows read from Chroma per request while building the index
+BUILD_PAGE_SIZE = 5000
+# rows quantized per step while writing codes, bounding the float32 temporaries
+BLOCK_ROWS = 65536
+# rows scored per step by the first pass; small enough for the decoded block
+# to stay in CPU cache, which is several times faster than large blocks
+SCORE_BLOCK_ROWS = 2048
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length (zero rows are left as they are)."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Column indices and values of the k highest scores of each row, best first."""
+    n = scores.shape[1]
+    if k < n:
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(n), scores.shape)
+    # argpartition leaves the top k unordered
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return (
+        np.take_along_axis(top, order, axis=1),
+        np.take_along_axis(top_scores, order, axis=1),
+    )
+
+
+def quantize_int8(vectors: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Symmetric per-dimension int8 codes: `vectors ~ codes * scales`."""
+    return np.clip(np.rint(vectors / scales), -127, 127).astype(np.int8)
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """
+    Sign bits of each vector, packed into uint64 words.
+
+    Rows are zero-padded to whole words, which adds nothing to the Hamming
+    distance between two codes.
+    """
+    packed = np.packbits(vectors > 0, axis=1)
+    padding = -packed.shape[1] % 8
+    if padding:
+        packed = np.pad(packed, ((0, 0), (0, padding)))
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+
+class BaseRetriever(ABC):
+    """
+    Search interface shared by the retrieval backends.
+    """
+
+    # collection version the backend was loaded for ("" if it reads live data)
+    version = ""
+
+    @abstractmethod
+    def search(self, embeddings: list[list[float]], k: int) -> list[list[dict]]:
+        """
+        Return the k nearest chunks of each query embedding, best first.
+
+        Chunks retrieved by more than one query share their content and
+        metadata objects; only the per-query result dicts are distinct.
+        """
+
+
+class ChromaRetriever(BaseRetriever):
+    """
+    Retrieval through a Chroma collection, one multi-query call per search.
+    """
+
+    def __init__(self, collection: Any):
+        self._collection = collection
+
+    def _similarity(self, distance: float) -> float:
+        """Convert a Chroma distance to cosine similarity."""
+        space = (getattr(self._collection, "metadata", None) or {}).get("hnsw:space")
+        if space in ("cosine", "ip"):
+            return 1.0 - distance
+        # default "l2" is squared euclidean; embeddings are normalized
+        return 1.0 - distance / 2
+
+    def search(self, embeddings: list[list[float]], k: int) -> list[list[dict]]:
+        results = self._collection.query(
+            query_embeddings=embeddings,
+            n_results=k,
+            include=["documents", "metadatas", "distances"],
+        )
+
+        chunks: dict[str, tuple[str, dict]] = {}
+        batches = []
+        for ids, documents, metadatas, distances in zip(
+            results["ids"],
+            results["documents"],
+            results["metadatas"],
+            results["distances"],
+            strict=True,
+        ):
+            batch = []
+            for chunk_id, content, metadata, distance in zip(
+                ids, documents, metadatas, distances, strict=True
+            ):
+                content, metadata = chunks.setdefault(
+                    chunk_id, (content, metadata or {})
+                )
+                batch.append(
+                    {
+                        "id": chunk_id,
+                        "content": content,
+                        "metadata": metadata,
+                        "score": self._similarity(distance),
+                    }
+                )
+            batches.append(batch)
+        return batches
+
+
+class NumpyRetriever(BaseRetriever):
+    """
+    Exact cosine search over a memory-mapped embedding matrix.
+
+    Rows are stored normalized, so the dot product with a normalized query
+    is the cosine similarity. The matrix is opened read-only with `mmap`:
+    the OS page cache holds it and worker processes share the pages.
+    """
+
+    def __init__(self, directory: Path, embedding_model: str, version: str = ""):
+        directory = Path(directory)
+        if not (directory / METADATA_FILE).exists():
+            raise FileNotFoundError(
+                f"No NumPy index in {directory}; run ingestion with "
+                "RETRIEVAL_BACKEND=numpy to build it"
+            )
+
+        sidecar = json.loads((directory / METADATA_FILE).read_text(encoding="utf-8"))
+        if sidecar["embedding_model"] != embedding_model:
+            raise ValueError(
+                f"NumPy index was built with {sidecar['embedding_model']!r}, "
+                f"not {embedding_model!r}; re-run ingestion to rebuild it"
+            )
+
+        self.version = version
+        self._ids: list[str] = sidecar["ids"]
+        self._documents: list[str] = sidecar["documents"]
+        self._metadatas: list[dict] = sidecar["metadatas"]
+        if self._ids:
+            self._matrix = np.load(directory / MATRIX_FILE, mmap_mode="r")
+        else:
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+        if len(self._matrix) != len(self._ids):
+            raise ValueError(f"NumPy index in {directory} is inconsistent")
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def search(self, embeddings: list[list[float]], k: int) -> list[list[dict]]:
+        if not embeddings:
+            return []
+        n = len(self._ids)
+        k = min(k, n)
+        if k == 0:
+            return [[] for _ in embeddings]
+
+        queries = _normalize(np.asarray(embeddings, dtype=np.float32))
+        # (queries, rows) cosine similarities in one product
+        scores = queries @ self._matrix.T
+        return self._results(*_top_k(scores, k))
+
+    def _results(self, top: np.ndarray, top_scores: np.ndarray) -> list[list[dict]]:
+        """Result dicts of the selected rows of each query."""
+        return [
+            [
+                {
+                    "id": self._ids[i],
+                    "content": self._documents[i],
+                    "metadata": self._metadatas[i] or {},
+                    "score": score,
+                }
+                for i, score in zip(row, row_scores, strict=True)
+            ]
+            for row, row_scores in zip(top.tolist(), top_scores.tolist(), strict=True)
+        ]
+
+
+class QuantizedRetriever(NumpyRetriever):
+    """
+    Two-pass search: quantized candidates, full-precision re-scoring.
+
+    The quantized codes are loaded into RAM; the float32 matrix stays
+    memory-mapped and only the candidate rows are read from it.
+
+    Args:
+        directory: NumPy index directory, with the quantized codes
+        embedding_model: Model the query embeddings come from
+        version: Collection version the index was loaded for
+        quantization: "int8" or "binary"
+        rescore_multiplier: Candidates re-scored per result
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        embedding_model: str,
+        version: str = "",
+        quantization: str = "int8",
+        rescore_multiplier: int = 10,
+    ):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        super().__init__(directory, embedding_model, version)
+        directory = Path(directory)
+        self.quantization = quantization
+        self.rescore_multiplier = rescore_multiplier
+
+        self._scales = None
+        if not self._ids:
+            self._codes = np.zeros((0, 0), dtype=np.int8)
+            return
+        path = directory / (INT8_FILE if quantization == "int8" else BINARY_FILE)
+        if not path.exists():
+            raise FileNotFoundError(
+                f"No {quantization} codes in {directory}; re-run ingestion to "
+                "rebuild the NumPy index"
+            )
+        self._codes = np.load(path)
+        if quantization == "int8":
+            self._scales = np.load(directory / INT8_SCALES_FILE)
+        if len(self._codes) != len(self._ids):
+            raise ValueError(f"Quantized codes in {directory} are inconsistent")
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the in-memory codes scanned by the first pass."""
+        return self._codes.nbytes
+
+    def _approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        """(queries, rows) scores from the codes; higher is closer."""
+        scores = np.empty((len(queries), len(self._codes)), dtype=np.float32)
+        if self.quantization == "int8":
+            # q . x ~ (q * scales) . codes
+            scaled = queries * self._scales
+            for start in range(0, len(self._codes), SCORE_BLOCK_ROWS):
+                block = self._codes[start : start + SCORE_BLOCK_ROWS].astype(np.float32)
+                scores[:, start : start + len(block)] = scaled @ block.T
+        else:
+            bits = quantize_binary(queries)
+            for start in range(0, len(self._codes), SCORE_BLOCK_ROWS):
+                block = self._codes[start : start + SCORE_BLOCK_ROWS]
+                # negative Hamming distance
+                differing = np.bitwise_count(block[None, :, :] ^ bits[:, None, :])
+                scores[:, start : start + len(block)] = -differing.sum(
+                    axis=2, dtype=np.int32
+                )
+        return scores
+
+    def search(self, embeddings: list[list[float]], k: int) -> list[list[dict]]:
+        if not embeddings:
+            return []
+        n = len(self._ids)
+        k = min(k, n)
+        if k == 0:
+            return [[] for _ in embeddings]
+
+        queries = _normalize(np.asarray(embeddings, dtype=np.float32))
+        approximate = self._approximate_scores(queries)
+        candidates, _ = _top_k(approximate, min(n, k * self.rescore_multiplier))
+
+        # read each candidate row once, in file order
+        rows = np.unique(candidates)
+        exact = queries @ np.asarray(self._matrix[rows]).T
+        scores = np.take_along_axis(exact, np.searchsorted(rows, candidates), axis=1)
+        top, top_scores = _top_k(scores, k)
+        return self._results(np.take_along_axis(candidates, top, axis=1), top_scores)
+
+
+def _stage_quantized_codes(matrix: np.ndarray, directory: Path) -> dict[str, Path]:
+    """
+    Write the int8 and binary codes of `matrix` to temporary files.
+
+    The matrix is read in blocks of `BLOCK_ROWS` rows. The int8 scale of
+    each dimension maps its largest absolute value to 127.
+
+    Returns:
+        Temporary path of each code file, by the file name it replaces
+    """
+    n, dim = matrix.shape
+    peak = np.zeros(dim, dtype=np.float32)
+    for start in range(0, n, BLOCK_ROWS):
+        block = np.abs(matrix[start : start + BLOCK_ROWS])
+        peak = np.maximum(peak, block.max(axis=0))
+    scales = np.where(peak > 0, peak / 127, 1.0).astype(np.float32)
+
+    codes = (INT8_FILE, INT8_SCALES_FILE, BINARY_FILE)
+    staged = {name: directory / f"{name}.tmp" for name in codes}
+    words = quantize_binary(np.zeros((1, dim), dtype=np.float32)).shape[1]
+    int8 = np.lib.format.open_memmap(
+        staged[INT8_FILE], mode="w+", dtype=np.int8, shape=(n, dim)
+    )
+    binary = np.lib.format.open_memmap(
+        staged[BINARY_FILE], mode="w+", dtype=np.uint64, shape=(n, words)
+    )
+    for start in range(0, n, BLOCK_ROWS):
+        block = np.asarray(matrix[start : start + BLOCK_ROWS])
+        int8[start : start + len(block)] = quantize_int8(block, scales)
+        binary[start : start + len(block)] = quantize_binary(block)
+    int8.flush()
+    binary.flush()
+    del int8, binary
+
+    # a file object, as np.save appends ".npy" to paths without it
+    with staged[INT8_SCALES_FILE].open("wb") as f:
+        np.save(f, scales)
+    return staged
+
+
+def write_quantized_codes(directory: Path) -> None:
+    """
+    Write the int8 and binary codes of the NumPy index in `directory`.
+    """
+    directory = Path(directory)
+    matrix = np.load(directory / MATRIX_FILE, mmap_mode="r")
+    for name, path in _stage_quantized_codes(matrix, directory).items():
+        path.replace(directory / name)
+
+
+def numpy_index_complete(directory: Path) -> bool:
+    """
+    Whether `directory` holds every file of the NumPy index.
+
+    False for a missing index, and for one written by an older version that
+    lacks files the retrievers now read (e.g. the quantized codes).
+    """
+    directory = Path(directory)
+    if not (directory / METADATA_FILE).exists():
+        return False
+    present = [(directory / name).exists() for name in VECTOR_FILES]
+    return all(present) or not any(present)
+
+
+def write_numpy_index(collection: Any, directory: Path, embedding_model: str) -> int:
+    """
+    Build the NumPy index from a Chroma collection.
+
+    Embeddings are read page by page into a memory-mapped matrix, so the
+    build never holds more than one page of Chroma results. Every file is
+    written to a temporary path first. The vector files are moved into place
+    before the metadata, which readers open first, so a reader never pairs
+    the new metadata with old vectors. An empty collection leaves only the
+    metadata: the vector files of the previous index are removed after it.
+
+    Args:
+        collection: Chroma collection to export
+        directory: Where to write the index
+        embedding_model: Name of the model that produced the embeddings
+
+    Returns:
+        Number of chunks in the index
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp_matrix = directory / f"{MATRIX_FILE}.tmp"
+    tmp_sidecar = directory / f"{METADATA_FILE}.tmp"
+
+    total = collection.count()
+    sidecar = {
+        "embedding_model": embedding_model,
+        "ids": [],
+        "documents": [],
+        "metadatas": [],
+    }
+    matrix = None
+    for offset in range(0, total, BUILD_PAGE_SIZE):
+        page = collection.get(
+            include=["embeddings", "documents", "metadatas"],
+            limit=BUILD_PAGE_SIZE,
+            offset=offset,
+        )
+        vectors = np.asarray(page["embeddings"], dtype=np.float32)
+        if matrix is None:
+            matrix = np.lib.format.open_memmap(
+                tmp_matrix, mode="w+", dtype=np.float32, shape=(total, vectors.shape[1])
+            )
+        matrix[offset : offset + len(vectors)] = _normalize(vectors)
+        sidecar["ids"].extend(page["ids"])
+        sidecar["documents"].extend(page["documents"])
+        sidecar["metadatas"].extend(page["metadatas"])
+
+    staged = {}
+    if matrix is not None:
+        matrix.flush()
+        staged = {MATRIX_FILE: tmp_matrix, **_stage_quantized_codes(matrix, directory)}
+        del matrix
+    tmp_sidecar.write_text(json.dumps(sidecar), encoding="utf-8")
+
+    for name, path in staged.items():
+        path.replace(directory / name)
+    tmp_sidecar.replace(directory / METADATA_FILE)
+    if not staged:
+        for name in VECTOR_FILES:
+            (directory / name).unlink(missing_ok=True)
+    return len(sidecar["ids"])
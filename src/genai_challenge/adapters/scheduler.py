@@ -0,0 +1,184 @@
+"""
+Admission scheduler for LLM generations
+
+A single Ollama instance slows down for everyone when it is sent more
+parallel generations than it can batch, so the adapter admits at most
+`max_in_flight` of them at a time and queues the rest:
+
+- Priority classes: queued interactive requests (chat) are always admitted
+  before batch requests (RAG and batch endpoints).
+- Fair queuing: within a class, waiting sessions are served round-robin, so
+  one session sending many requests cannot hold back the others. Requests
+  without a session are served in arrival order.
+- Queue timeout: a request that waits longer than `queue_timeout` seconds
+  fails with `LLMBusyError`, which the API maps to HTTP 503.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from genai_challenge.config import settings
+from genai_challenge.core.metrics import metrics
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+# admission order, highest priority first
+PRIORITIES = (INTERACTIVE, BATCH)
+
+queue_wait_seconds = metrics.histogram(
+    "genai_llm_queue_wait_seconds", "Time generations waited for admission"
+)
+queue_depth = metrics.gauge(
+    "genai_llm_queue_depth", "Generations waiting for admission"
+)
+queue_timeouts = metrics.counter(
+    "genai_llm_queue_timeouts_total", "Generations rejected after waiting too long"
+)
+
+
+class LLMBusyError(Exception):
+    """Raised when a generation waited too long for an LLM slot."""
+
+
+class GenerationScheduler:
+    """
+    Bounds in-flight generations and orders the ones waiting for a slot.
+
+    Args:
+        max_in_flight: Generations allowed to run at the same time
+        queue_timeout: Longest wait for a slot, in seconds
+    """
+
+    def __init__(
+        self, max_in_flight: int | None = None, queue_timeout: float | None = None
+    ):
+        self.max_in_flight = max_in_flight or settings.ollama_max_concurrency
+        self.queue_timeout = (
+            queue_timeout
+            if queue_timeout is not None
+            else settings.ollama_queue_timeout
+        )
+        # priority -> session key -> waiters of that session, in arrival order
+        self._queues: dict[str, OrderedDict[object, deque[asyncio.Future]]] = {
+            priority: OrderedDict() for priority in PRIORITIES
+        }
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.in_flight = 0
+        self.admitted = 0
+        self.timeouts = 0
+
+    def _bind_loop(self) -> None:
+        # futures belong to the loop that created them
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            for queue in self._queues.values():
+                queue.clear()
+            self.in_flight = 0
+            self._loop = loop
+
+    def waiting(self, priority: str | None = None) -> int:
+        """Number of queued generations, for one class or all of them."""
+        priorities = [priority] if priority else PRIORITIES
+        return sum(
+            len(waiters) for p in priorities for waiters in self._queues[p].values()
+        )
+
+    def _update_depth(self, priority: str) -> None:
+        if settings.metrics_enabled:
+            queue_depth.set(self.waiting(priority), priority=priority)
+
+    def _next_waiter(self) -> asyncio.Future | None:
+        """Pop the next waiter: highest class first, round-robin over sessions."""
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue:
+                key, waiters = next(iter(queue.items()))
+                future = waiters.popleft()
+                # the session goes to the back of the line
+                del queue[key]
+                if waiters:
+                    queue[key] = waiters
+                if not future.done():
+                    self._update_depth(priority)
+                    return future
+        return None
+
+    def _admit_waiters(self) -> None:
+        while self.in_flight < self.max_in_flight:
+            future = self._next_waiter()
+            if future is None:
+                return
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _remove(self, priority: str, key: object, future: asyncio.Future) -> None:
+        waiters = self._queues[priority].get(key)
+        if waiters is not None and future in waiters:
+            waiters.remove(future)
+            if not waiters:
+                del self._queues[priority][key]
+        self._update_depth(priority)
+
+    async def acquire(self, priority: str = INTERACTIVE, session_id: str | None = None):
+        """Wait for a generation slot."""
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority: {priority}")
+        self._bind_loop()
+
+        started = time.perf_counter()
+        if self.in_flight < self.max_in_flight and not self.waiting():
+            self.in_flight += 1
+        else:
+            future = self._loop.create_future()
+            key = session_id if session_id is not None else future
+            self._queues[priority].setdefault(key, deque()).append(future)
+            self._update_depth(priority)
+            try:
+                await asyncio.wait_for(future, self.queue_timeout)
+            except (TimeoutError, asyncio.CancelledError) as e:
+                if future.done() and not future.cancelled():
+                    # admitted just as the wait ended: pass the slot on
+                    self.release()
+                else:
+                    self._remove(priority, key, future)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                self.timeouts += 1
+                if settings.metrics_enabled:
+                    queue_timeouts.inc(priority=priority)
+                raise LLMBusyError(
+                    f"Timed out after {self.queue_timeout:g}s waiting for the LLM"
+                ) from None
+
+        self.admitted += 1
+        if settings.metrics_enabled:
+            queue_wait_seconds.observe(time.perf_counter() - started, priority=priority)
+
+    def release(self) -> None:
+        """Free a slot and admit the next waiter."""
+        self.in_flight -= 1
+        self._admit_waiters()
+
+    @asynccontextmanager
+    async def slot(
+        self, priority: str = INTERACTIVE, session_id: str | None = None
+    ) -> AsyncIterator[None]:
+        """Hold a generation slot for the duration of the block."""
+        await self.acquire(priority, session_id)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        """Snapshot of scheduler counters."""
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "admitted": self.admitted,
+            "timeouts": self.timeouts,
+            **{f"waiting_{p}": self.waiting(p) for p in PRIORITIES},
+        }
@@ -3,9 +3,17 @@ Chat endpoint - processes user messages through the LLM.
 """
 
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 
-from genai_challenge.api.schemas.chat import ChatRequest, ChatResponse
+from genai_challenge.api.schemas.chat import (
+    ChatBatchRequest,
+    ChatBatchResponse,
+    ChatRequest,
+    ChatResponse,
+)
+from genai_challenge.api.streaming import ndjson_response
 from genai_challenge.services.llm_service import chat as llm_chat
+from genai_challenge.services.llm_service import chat_batch, chat_stream
 
 router = APIRouter()
 
@@ -25,4 +33,35 @@ async def chat(request: ChatRequest) -> ChatResponse:
     return ChatResponse(
         response=response_text,
         session_id=session_id,
-    )
\ No newline at end of file
+    )
+
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest) -> StreamingResponse:
+    """
+    Streaming variant of /chat.
+
+    Returns NDJSON events: a `session` event, one `token` event per chunk
+    and a final `done` event. The reply is saved to memory once complete.
+    """
+    return ndjson_response(
+        chat_stream(
+            message=request.message,
+            session_id=request.session_id,
+        )
+    )
+
+
+@router.post("/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch_endpoint(request: ChatBatchRequest) -> ChatBatchResponse:
+    """
+    Process many chat messages in one request.
+
+    - Messages of the same session run in order, sessions run concurrently
+    - Returns one result per message, in order; failed messages carry an
+      `error` instead of a response
+    """
+    results = await chat_batch(
+        [(item.message, item.session_id) for item in request.messages]
+    )
+    return ChatBatchResponse(results=results)
@@ -0,0 +1,16 @@
+"""
+Metrics endpoint - exposes pipeline metrics for Prometheus scraping.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from genai_challenge.core.metrics import metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> PlainTextResponse:
+    """Counters and latency histograms in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
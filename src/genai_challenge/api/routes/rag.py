@@ -3,9 +3,20 @@ RAG endpoint - answers questions using retrieved documents.
 """
 
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 
-from genai_challenge.api.schemas.rag import RAGRequest, RAGResponse
-from genai_challenge.services.rag_service import rag_query
+from genai_challenge.api.schemas.rag import (
+    RAGBatchRequest,
+    RAGBatchResponse,
+    RAGRequest,
+    RAGResponse,
+)
+from genai_challenge.api.streaming import ndjson_response
+from genai_challenge.services.rag_service import (
+    rag_query,
+    rag_query_batch,
+    rag_query_stream,
+)
 
 router = APIRouter()
 
@@ -25,3 +36,37 @@ async def rag_query_endpoint(request: RAGRequest) -> RAGResponse:
     )
 
     return RAGResponse(**result)
+
+
+@router.post("/rag-query/stream")
+async def rag_query_stream_endpoint(request: RAGRequest) -> StreamingResponse:
+    """
+    Streaming variant of /rag-query.
+
+    Returns NDJSON events: a `sources` event before the first token, one
+    `token` event per chunk and a final `done` event.
+    """
+    return ndjson_response(
+        rag_query_stream(
+            query=request.query,
+            top_k=request.top_k,
+        )
+    )
+
+
+@router.post("/rag-query/batch", response_model=RAGBatchResponse)
+async def rag_query_batch_endpoint(request: RAGBatchRequest) -> RAGBatchResponse:
+    """
+    Answer many questions in one request.
+
+    - Embeds and retrieves documents for all questions at once
+    - Generates answers concurrently (bounded)
+    - Returns one result per question, in order; failed generations
+      carry an `error` instead of an answer
+    """
+    results = await rag_query_batch(
+        queries=request.queries,
+        top_k=request.top_k,
+    )
+
+    return RAGBatchResponse(results=results)
@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
 
+from genai_challenge.config import settings
+
 
 class ChatRequest(BaseModel):
     """Request model for chat endpoint."""
@@ -18,4 +20,34 @@ class ChatResponse(BaseModel):
     response: str = Field(..., description="Assistant response")
     session_id: str = Field(
         ..., description="Session ID for continuing the conversation"
-    )
\ No newline at end of file
+    )
+
+
+class ChatBatchRequest(BaseModel):
+    """Request model for the batch chat endpoint."""
+
+    messages: list[ChatRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.batch_max_items,
+        description="Messages to process. Messages sharing a session_id "
+        "are processed in order.",
+    )
+
+
+class ChatBatchResult(BaseModel):
+    """Result for one message of a batch."""
+
+    response: str | None = Field(..., description="Assistant response, if any")
+    session_id: str = Field(
+        ..., description="Session ID for continuing the conversation"
+    )
+    error: str | None = Field(default=None, description="Why no response was generated")
+
+
+class ChatBatchResponse(BaseModel):
+    """Response model for the batch chat endpoint."""
+
+    results: list[ChatBatchResult] = Field(
+        ..., description="One result per message, in request order"
+    )
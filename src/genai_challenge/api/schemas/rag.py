@@ -2,8 +2,12 @@
 Pydantic schemas for RAG endpoint
 """
 
+from typing import Annotated
+
 from pydantic import BaseModel, Field
 
+from genai_challenge.config import settings
+
 
 class RAGRequest(BaseModel):
     """Request body for RAG query endpoint."""
@@ -22,8 +26,69 @@ class SourceDocument(BaseModel):
     content_preview: str = Field(..., description="Preview of chunk content")
 
 
+class ContextMetadata(BaseModel):
+    """How the retrieved chunks were narrowed down to the prompt context."""
+
+    retrieved: int = Field(..., description="Chunks returned by retrieval")
+    reranked: bool = Field(
+        default=False, description="Whether a cross-encoder re-ordered the chunks"
+    )
+    below_relevance: int = Field(
+        ..., description="Chunks dropped for a low similarity score"
+    )
+    merged: int = Field(..., description="Chunks merged into an overlapping neighbor")
+    over_budget: int = Field(
+        ..., description="Chunks dropped to fit the context token budget"
+    )
+    context_chunks: int = Field(..., description="Chunks sent to the model")
+    context_tokens: int = Field(..., description="Estimated context size in tokens")
+    faq_score: float | None = Field(
+        default=None,
+        description="Similarity to the FAQ question whose stored answer was used",
+    )
+
+
 class RAGResponse(BaseModel):
     """Response from RAG query endpoint."""
 
     answer: str = Field(..., description="Generated answer based on documents")
     sources: list[SourceDocument] = Field(..., description="Source documents used")
+    metadata: ContextMetadata | None = Field(
+        default=None, description="Context selection details"
+    )
+
+
+class RAGBatchRequest(BaseModel):
+    """Request body for the batch RAG query endpoint."""
+
+    queries: list[Annotated[str, Field(min_length=1)]] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.batch_max_items,
+        description="Users' questions",
+    )
+    top_k: int | None = Field(
+        default=None,
+        ge=1,
+        le=10,
+        description="Number of documents to retrieve per question",
+    )
+
+
+class RAGBatchResult(BaseModel):
+    """Result for one question of a batch."""
+
+    answer: str | None = Field(..., description="Generated answer, if any")
+    sources: list[SourceDocument] = Field(..., description="Source documents used")
+    metadata: ContextMetadata | None = Field(
+        default=None, description="Context selection details"
+    )
+    error: str | None = Field(default=None, description="Why no answer was generated")
+
+
+class RAGBatchResponse(BaseModel):
+    """Response from the batch RAG query endpoint."""
+
+    results: list[RAGBatchResult] = Field(
+        ..., description="One result per question, in request order"
+    )
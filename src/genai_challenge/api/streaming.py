@@ -0,0 +1,27 @@
+"""
+Helpers for streaming endpoints.
+
+Events produced by the services are sent as newline-delimited JSON (NDJSON),
+one JSON object per line, so clients can render tokens as they arrive.
+"""
+
+import json
+from collections.abc import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def _encode(events: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    try:
+        async for event in events:
+            yield (json.dumps(event) + "\n").encode()
+    except Exception as e:
+        # headers are already sent, so errors are reported in-band
+        yield (json.dumps({"type": "error", "detail": str(e)}) + "\n").encode()
+
+
+def ndjson_response(events: AsyncIterator[dict]) -> StreamingResponse:
+    """Wrap a service event stream in an NDJSON streaming response."""
+    return StreamingResponse(_encode(events), media_type=NDJSON_MEDIA_TYPE)
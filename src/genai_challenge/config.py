@@ -15,21 +15,101 @@ class Settings(BaseSettings):
     api_port: int = 8000
     api_version: str = "v1"
     environment: str = "development"
+    warm_up_on_startup: bool = True
 
     # Ollama
     ollama_base_url: str = "http://localhost:11434"
+    # several hosts to balance across; overrides ollama_base_url when set
+    ollama_base_urls: list[str] = []
     ollama_model: str = "llama3.2:3b"
+    ollama_max_concurrency: int = 4
+    ollama_keepalive_expiry: float = 30.0
+    ollama_queue_timeout: float = 30.0
+    ollama_health_interval: float = 10.0
+    ollama_failure_threshold: int = 3
+    ollama_circuit_reset_seconds: float = 30.0
+    # sessions remembered to keep each on the backend that served it
+    ollama_sticky_max_sessions: int = 10000
+    # how long Ollama keeps the model (and its prompt cache) loaded, e.g. "30m"
+    ollama_keep_alive: str | None = None
+    # context window in tokens; None uses the model default
+    ollama_num_ctx: int | None = None
 
     # ChromaDB
     chroma_persist_directory: str = "./chroma_data"
 
+    # Retrieval
+    retrieval_backend: str = "chroma"  # "chroma" or "numpy"
+    # numpy backend: None (exact), "int8" or "binary" first pass
+    retrieval_quantization: str | None = None
+    retrieval_rescore_multiplier: int = 10
+    retrieval_mode: str = "vector"  # "vector", "bm25" or "hybrid"
+    hybrid_candidates: int = 10
+    rrf_k: int = 60
+    retrieval_workers: int = 4
+    retrieval_max_queue: int = 32
+    retrieval_queue_timeout: float = 5.0
+
     # Embeddings
     embedding_model: str = "all-MiniLM-L6-v2"
+    embedding_cache_max_entries: int = 10000
+    embedding_cache_max_bytes: int = 32 * 1024 * 1024
 
     # RAG
-    chunk_size: int = 500
-    chunk_overlap: int = 50
+    # in tokens of the embedding model's tokenizer
+    chunk_size: int = 128
+    chunk_overlap: int = 16
     default_top_k: int = 3
+    rag_min_relevance: float | None = None
+    rag_context_max_tokens: int | None = None
+    rag_merge_overlapping_chunks: bool = True
+    # re-rank `rerank_candidates` retrieved chunks with a cross-encoder and
+    # keep the best top_k
+    rerank_enabled: bool = False
+    rerank_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    rerank_candidates: int = 20
+    # skip re-ranking when scoring is expected to take longer; None = no limit
+    rerank_budget_seconds: float | None = 0.5
+    rerank_cache_max_entries: int = 50000
+    # answer queries similar to an FAQ question (extracted at ingestion)
+    # with its stored answer, skipping retrieval and generation
+    faq_enabled: bool = True
+    faq_similarity_threshold: float = 0.9
+
+    # Ingestion
+    ingest_batch_size: int = 64
+    ingest_workers: int = 2
+
+    # Batch endpoints
+    batch_max_items: int = 100
+    batch_max_concurrency: int = 2
+
+    # RAG answer cache
+    rag_cache_enabled: bool = True
+    rag_cache_similarity_threshold: float = 0.95
+    rag_cache_max_entries: int = 1024
+    rag_cache_ttl_seconds: float = 3600.0
+
+    # Conversation memory
+    memory_backend: str = "memory"  # "memory" or "sqlite"
+    memory_sqlite_path: str = "./conversations.db"
+    # seconds a write waits for another process's transaction before failing
+    memory_sqlite_timeout: float = 2.0
+    memory_max_sessions: int = 10000
+    memory_session_ttl_seconds: float = 86400.0
+    memory_max_turns: int = 100
+    memory_window_turns: int = 10
+    memory_window_tokens: int | None = None
+    # turns dropped at once when the window is full; None = half the window
+    memory_window_stride: int | None = None
+    # summarize older turns once a session's history exceeds the threshold
+    memory_summary_enabled: bool = False
+    memory_summary_threshold_tokens: int = 2000
+    memory_summary_keep_turns: int = 4
+
+    # Observability
+    metrics_enabled: bool = True
+    timing_header_enabled: bool = False
 
     # Logging
     log_level: str = "INFO"
@@ -0,0 +1,146 @@
+"""
+Document chunking
+
+Documents are split into sections at their headings, then each section into
+chunks of at most `chunk_size` tokens of the embedding model's tokenizer,
+with `chunk_overlap` tokens of overlap. Chunks never span two sections, and
+each records its section title and token count, so the RAG context can be
+budgeted from stored counts instead of re-tokenizing at query time.
+
+Documents are plain text, so headings are recognized by shape: Markdown
+headings (`# Title`), or single-line paragraphs of at most
+`MAX_HEADING_WORDS` words that are not list items and do not end like a
+sentence (`.`, `!`, `?`) or a label (`:`).
+"""
+
+import re
+from collections.abc import Callable
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+MAX_HEADING_WORDS = 10
+# shortest suffix/prefix match treated as splitter overlap between chunks
+MIN_OVERLAP_CHARS = 10
+SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+(.+)$")
+
+
+def heading_title(paragraph: str) -> str | None:
+    """Title of a paragraph that is a heading, None for any other paragraph."""
+    text = paragraph.strip()
+    if not text or "\n" in text:
+        return None
+    match = _MARKDOWN_HEADING.match(text)
+    if match:
+        return match.group(1).strip()
+    if (
+        len(text.split()) > MAX_HEADING_WORDS
+        or text.endswith((".", "!", "?", ":"))
+        or text.startswith(("-", "*", "•"))
+    ):
+        return None
+    return text
+
+
+def split_sections(text: str) -> list[tuple[str | None, str, str]]:
+    """
+    Split a document into sections at its headings.
+
+    Consecutive headings (e.g. a document title directly followed by a
+    chapter) start one section titled "Title > Chapter". Text before the
+    first heading forms a section without title.
+
+    Returns:
+        (title, heading text, body text) per section
+    """
+    # [title, heading paragraphs, body paragraphs]
+    sections: list[list] = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        title = heading_title(paragraph)
+        if title is None:
+            if not sections:
+                sections.append([None, [], []])
+            sections[-1][2].append(paragraph)
+        elif sections and not sections[-1][2]:
+            sections[-1][0] = f"{sections[-1][0]} > {title}"
+            sections[-1][1].append(paragraph)
+        else:
+            sections.append([title, [paragraph], []])
+    return [
+        (title, "\n\n".join(heading), "\n\n".join(body))
+        for title, heading, body in sections
+    ]
+
+
+def overlap_length(first: str, second: str) -> int:
+    """
+    Length of the longest end of `first` that `second` starts with.
+
+    Overlaps shorter than `MIN_OVERLAP_CHARS` are not counted (returns 0).
+    """
+    head = second[:MIN_OVERLAP_CHARS]
+    if len(head) < MIN_OVERLAP_CHARS:
+        return 0
+    # the overlap starts at an occurrence of `head`; the earliest is the longest
+    start = first.find(head, max(0, len(first) - len(second)))
+    while start != -1:
+        if second.startswith(first[start:]):
+            return len(first) - start
+        start = first.find(head, start + 1)
+    return 0
+
+
+def chunk_document(
+    text: str,
+    count_tokens: Callable[[str], int],
+    chunk_size: int,
+    chunk_overlap: int,
+) -> list[dict]:
+    """
+    Split a document into section-aligned chunks measured in tokens.
+
+    The section heading is the start of the section's first chunk, so it is
+    never left alone in a chunk of its own.
+
+    Args:
+        text: Document text
+        count_tokens: Token counter of the embedding model's tokenizer
+        chunk_size: Maximum tokens per chunk
+        chunk_overlap: Tokens shared by consecutive chunks of a section
+
+    Returns:
+        Dicts with 'content', 'section' (title or None), 'token_count' and
+        'overlap_tokens' (tokens shared with the previous chunk)
+    """
+    chunks = []
+    for title, heading, body in split_sections(text):
+        if heading:
+            heading += "\n\n"
+        # leave room for the heading in the first chunk
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=max(chunk_size - count_tokens(heading), chunk_overlap + 1),
+            chunk_overlap=chunk_overlap,
+            separators=SEPARATORS,
+            length_function=count_tokens,
+        )
+        contents = splitter.split_text(body) if body else [""]
+        contents[0] = (heading + contents[0]).strip()
+
+        previous = None
+        for content in contents:
+            overlap = overlap_length(previous, content) if previous else 0
+            chunks.append(
+                {
+                    "content": content,
+                    "section": title,
+                    "token_count": count_tokens(content),
+                    "overlap_tokens": count_tokens(content[:overlap]) if overlap else 0,
+                }
+            )
+            previous = content
+    return chunks
@@ -0,0 +1,214 @@
+"""
+Metrics and per-stage timing
+
+A small in-process metrics registry (counters and histograms with labels),
+rendered in the Prometheus text exposition format by `/api/v1/metrics`.
+Components that already keep their own counters (caches, pools) are exported
+through collectors evaluated at scrape time.
+
+`span(stage)` times one pipeline stage. Durations go to the
+`genai_stage_duration_seconds` histogram and, when the request asked for it,
+to the per-request breakdown returned in the `X-Timing` header. With both
+`metrics_enabled` and the timing header off, a span is a no-op.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from genai_challenge.config import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# (name, type, help, value) samples produced by a collector
+Sample = tuple[str, str, str, float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels)
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """Monotonic counter, one value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(labels)} {value}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down, one per label set."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label set."""
+
+    def __init__(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # label set -> [bucket counts..., +Inf count, sum]
+        self._series: dict[tuple, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(sorted(labels.items())))
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            all_series = [(key, list(series)) for key, series in self._series.items()]
+        for labels, series in all_series:
+            cumulative = 0.0
+            bounds = (*self.buckets, "+Inf")
+            for bound, count in zip(bounds, series[:-1], strict=True):
+                cumulative += count
+                bucket_labels = (*labels, ("le", str(bound)))
+                yield f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {series[-1]}"
+            yield f"{self.name}_count{_format_labels(labels)} {cumulative}"
+
+
+class MetricsRegistry:
+    """
+    Holds every metric of the process and renders them for scraping.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+        self._collectors: list[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str) -> Counter:
+        with self._lock:
+            return self._metrics.setdefault(name, Counter(name, help))
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        with self._lock:
+            return self._metrics.setdefault(name, Gauge(name, help))
+
+    def histogram(
+        self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS
+    ) -> Histogram:
+        with self._lock:
+            return self._metrics.setdefault(name, Histogram(name, help, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Add a function returning (name, type, help, value) samples."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: list[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, help, value in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# singleton registry for the app
+metrics = MetricsRegistry()
+
+stage_seconds = metrics.histogram(
+    "genai_stage_duration_seconds", "Time spent in each pipeline stage"
+)
+stage_errors = metrics.counter(
+    "genai_stage_errors_total", "Pipeline stages that raised an exception"
+)
+
+# per-request stage durations, set by the HTTP middleware when requested
+_timings: ContextVar[dict[str, float] | None] = ContextVar("timings", default=None)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a pipeline stage."""
+    timings = _timings.get()
+    if not settings.metrics_enabled and timings is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        if settings.metrics_enabled:
+            stage_errors.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        if settings.metrics_enabled:
+            stage_seconds.observe(elapsed, stage=stage)
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def collect_timings() -> Iterator[dict[str, float]]:
+    """Collect the stage durations of the current request into a dict."""
+    timings: dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def format_timings(timings: dict[str, float]) -> str:
+    """Render stage durations like a Server-Timing header value."""
+    return ", ".join(
+        f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()
+    )
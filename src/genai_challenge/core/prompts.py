@@ -20,12 +20,11 @@ Guidelines:
 """
 
 # Template for RAG responses 
+# The prompt is the same for every query, so the LLM backend can reuse its
+# KV cache for it; the retrieved context follows in its own message.
 RAG_SYSTEM_PROMPT = """You are a helpful assistant for ACME Coroporation.
 Answer questions based on the provided context from company documents.
 
-Context:
-{context}
-
 Guidelines:
 - Answer based ONLY on the provided context
 - If the context doesn't contain the answer, say "I don't have that information"
@@ -35,7 +34,43 @@ Guidelines:
 Remember: It's better to say "I don't know" than to make up an answer.
 """
 
-def format_rag_prompt(context: str) -> str:
-    """Format the RAG system prompt with retrieved context."""
-    return RAG_SYSTEM_PROMPT.format(context=context)
-    
\ No newline at end of file
+RAG_CONTEXT_TEMPLATE = """Context:
+{context}
+"""
+
+
+def format_rag_context(context: str) -> str:
+    """Format the retrieved context message that follows the RAG prompt."""
+    return RAG_CONTEXT_TEMPLATE.format(context=context)
+    
+
+
+# Prompt for compacting older chat turns into a summary
+SUMMARY_PROMPT = """You summarize chats between users and ACME Corporation's assistant.
+Write a short summary of the conversation you are given, in the third person.
+
+Guidelines:
+- Keep names, numbers, dates, decisions and open questions
+- Leave out greetings and small talk
+- If a previous summary is given, merge it into the new summary
+- Use at most one paragraph
+"""
+
+SUMMARY_CONTEXT_TEMPLATE = """Summary of the earlier conversation:
+{summary}
+"""
+
+
+def format_summary_request(previous: str | None, messages: list[dict]) -> str:
+    """Format the turns to summarize, after the previous summary if any."""
+    transcript = "\n".join(
+        f"{message['role'].capitalize()}: {message['content']}" for message in messages
+    )
+    if previous:
+        return f"Previous summary:\n{previous}\n\nConversation:\n{transcript}"
+    return f"Conversation:\n{transcript}"
+
+
+def format_summary_context(summary: str) -> str:
+    """Format the summary message sent before the recent history."""
+    return SUMMARY_CONTEXT_TEMPLATE.format(summary=summary)
@@ -1,6 +1,8 @@
 """Streamlit frontend for GenAI Challenge."""
 
+import json
 import os
+from collections.abc import Iterator
 
 import httpx
 import streamlit as st
@@ -50,39 +52,49 @@ if "rag_messages" not in st.session_state:
     st.session_state.rag_messages = []
 
 
-def call_chat_api(message: str, session_id: str | None = None) -> dict:
-    """Call the chat API endpoint."""
+def stream_api(path: str, payload: dict, state: dict) -> Iterator[str]:
+    """
+    Call a streaming API endpoint and yield answer tokens as they arrive.
+
+    Non-token events (session id, sources, errors) are stored in `state`.
+    """
     try:
-        payload = {"message": message}
-        if session_id:
-            payload["session_id"] = session_id
-        response = httpx.post(
-            f"{API_BASE_URL}/chat",
+        with httpx.stream(
+            "POST",
+            f"{API_BASE_URL}{path}",
             json=payload,
             timeout=60.0,
-        )
-        response.raise_for_status()
-        return response.json()
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["type"] == "token":
+                    yield event["content"]
+                elif event["type"] == "session":
+                    state["session_id"] = event["session_id"]
+                elif event["type"] == "sources":
+                    state["sources"] = event["sources"]
+                elif event["type"] == "error":
+                    state["error"] = f"API error: {event['detail']}"
     except httpx.HTTPStatusError as e:
-        return {"error": f"API error: {e.response.status_code}"}
+        state["error"] = f"API error: {e.response.status_code}"
     except Exception as e:
-        return {"error": f"Connection error: {str(e)}"}
+        state["error"] = f"Connection error: {str(e)}"
 
 
-def call_rag_api(query: str, top_k: int = 3) -> dict:
-    """Call the RAG query API endpoint."""
-    try:
-        response = httpx.post(
-            f"{API_BASE_URL}/rag-query",
-            json={"query": query, "top_k": top_k},
-            timeout=60.0,
-        )
-        response.raise_for_status()
-        return response.json()
-    except httpx.HTTPStatusError as e:
-        return {"error": f"API error: {e.response.status_code}"}
-    except Exception as e:
-        return {"error": f"Connection error: {str(e)}"}
+def stream_chat_api(message: str, session_id: str | None, state: dict) -> Iterator[str]:
+    """Stream a reply from the chat API endpoint."""
+    payload = {"message": message}
+    if session_id:
+        payload["session_id"] = session_id
+    return stream_api("/chat/stream", payload, state)
+
+
+def stream_rag_api(query: str, top_k: int, state: dict) -> Iterator[str]:
+    """Stream an answer from the RAG query API endpoint."""
+    return stream_api("/rag-query/stream", {"query": query, "top_k": top_k}, state)
 
 
 # Chat Mode
@@ -104,16 +116,16 @@ if mode == "💬 Chat":
 
         # Get response
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                result = call_chat_api(prompt, st.session_state.chat_session_id)
+            result = {}
+            reply = st.write_stream(
+                stream_chat_api(prompt, st.session_state.chat_session_id, result)
+            )
 
             if "error" in result:
                 st.error(result["error"])
                 st.caption("Make sure Ollama is running: `ollama serve`")
             else:
-                reply = result.get("response", "No response")
                 st.session_state.chat_session_id = result.get("session_id")
-                st.write(reply)
                 st.session_state.chat_messages.append(
                     {"role": "assistant", "content": reply}
                 )
@@ -156,18 +168,15 @@ else:
 
         # Get response
         with st.chat_message("assistant"):
-            with st.spinner("Searching documents and generating answer..."):
-                result = call_rag_api(query, top_k)
+            result = {}
+            answer = st.write_stream(stream_rag_api(query, top_k, result))
 
             if "error" in result:
                 st.error(result["error"])
                 st.caption("Make sure the backend is running and Ollama is available.")
             else:
-                answer = result.get("answer", "No answer generated")
                 sources = result.get("sources", [])
 
-                st.write(answer)
-
                 if sources:
                     with st.expander(f"📄 Sources ({len(sources)} documents)"):
                         for i, source in enumerate(sources, 1):
@@ -1,13 +1,182 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from genai_challenge.adapters import chroma, ollama
+from genai_challenge.adapters.embedding_cache import embedding_cache
+from genai_challenge.adapters.reranker import reranker
+from genai_challenge.adapters.scheduler import LLMBusyError
+from genai_challenge.api.routes import chat, health, metrics, rag
+from genai_challenge.config import settings
+from genai_challenge.core.metrics import collect_timings, format_timings
+from genai_challenge.core.metrics import metrics as registry
+from genai_challenge.services import llm_service
+from genai_challenge.services.answer_cache import answer_cache
+from genai_challenge.services.memory import conversation_store
+
+http_requests = registry.counter(
+    "genai_http_requests_total", "HTTP requests by method, route and status"
+)
+http_seconds = registry.histogram(
+    "genai_http_request_duration_seconds",
+    "Time to produce the response headers, by route",
+)
+
+
+def component_samples():
+    """Counters kept by the caches, pools and stores, read at scrape time."""
+    answers = answer_cache.stats()
+    embeddings = embedding_cache.stats()
+    pool = ollama.chat_model_pool.stats()
+    memory = conversation_store.stats()
+    executor = chroma.retrieval_executor
+    return [
+        (
+            "genai_answer_cache_hits_total",
+            "counter",
+            "Answer cache hits",
+            answers["hits"],
+        ),
+        (
+            "genai_answer_cache_misses_total",
+            "counter",
+            "Answer cache misses",
+            answers["misses"],
+        ),
+        (
+            "genai_embedding_cache_hits_total",
+            "counter",
+            "Embedding cache hits",
+            embeddings["hits"],
+        ),
+        (
+            "genai_embedding_cache_misses_total",
+            "counter",
+            "Embedding cache misses",
+            embeddings["misses"],
+        ),
+        (
+            "genai_embedding_cache_bytes",
+            "gauge",
+            "Embedding cache size in bytes",
+            embeddings["bytes"],
+        ),
+        (
+            "genai_llm_in_flight",
+            "gauge",
+            "LLM generations in progress",
+            pool["in_flight"],
+        ),
+        (
+            "genai_llm_waiting",
+            "gauge",
+            "LLM generations waiting for a slot",
+            pool["waiting"],
+        ),
+        (
+            "genai_retrieval_waiting",
+            "gauge",
+            "Retrievals waiting for a worker",
+            executor.waiting,
+        ),
+        (
+            "genai_retrieval_rejected_total",
+            "counter",
+            "Retrievals rejected as busy",
+            executor.rejected,
+        ),
+        (
+            "genai_memory_sessions",
+            "gauge",
+            "Conversation sessions in memory",
+            memory["sessions"],
+        ),
+    ]
+
+
+registry.register_collector(component_samples)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load shared resources on startup and release them on shutdown."""
+    if settings.warm_up_on_startup:
+        chroma.warm_up()
+        if settings.rerank_enabled:
+            reranker.warm_up()
+    health_checks = None
+    if len(ollama.chat_model_pool.backends) > 1 and settings.ollama_health_interval:
+        health_checks = asyncio.create_task(ollama.chat_model_pool.run_health_checks())
+    yield
+    if health_checks is not None:
+        health_checks.cancel()
+    await llm_service.cancel_compactions()
+    chroma.shutdown()
+    await ollama.chat_model_pool.aclose()
+    conversation_store.close()
 
-from genai_challenge.api.routes import chat, health, rag
 
 app = FastAPI(
     title="GenAI Challenge API",
     description="RAG-powered conversational assitant",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
+
+@app.exception_handler(chroma.RetrievalBusyError)
+async def retrieval_busy_handler(request: Request, exc: chroma.RetrievalBusyError):
+    """Tell clients to back off when retrieval is saturated."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(LLMBusyError)
+async def llm_busy_handler(request: Request, exc: LLMBusyError):
+    """Report an overloaded LLM backend as temporarily unavailable."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "5"},
+    )
+
+
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    """
+    Count and time requests, and add the `X-Timing` stage breakdown.
+
+    Streaming responses return once their headers are ready, so their
+    duration and `X-Timing` cover the work done before the first event.
+    """
+    if not settings.metrics_enabled and not settings.timing_header_enabled:
+        return await call_next(request)
+
+    started = time.perf_counter()
+    with collect_timings() as timings:
+        response = await call_next(request)
+    elapsed = time.perf_counter() - started
+
+    if settings.metrics_enabled:
+        # every route is static, so matched paths keep label cardinality low
+        path = request.url.path if "route" in request.scope else "unmatched"
+        http_requests.inc(
+            method=request.method, path=path, status=str(response.status_code)
+        )
+        http_seconds.observe(elapsed, path=path)
+    if settings.timing_header_enabled:
+        timings["total"] = elapsed
+        response.headers["X-Timing"] = format_timings(timings)
+    return response
+
+
 app.include_router(health.router, prefix="/api/v1", tags=["health"])
 app.include_router(chat.router, prefix="/api/v1", tags=["chat"])
 app.include_router(rag.router, prefix="/api/v1", tags=["rag"])
+app.include_router(metrics.router, prefix="/api/v1", tags=["metrics"])
@@ -0,0 +1,169 @@
+"""
+Semantic answer cache for RAG queries.
+
+Stores generated answers keyed on the query embedding, the IDs of the chunks
+retrieved for it and the model name. A later query hits the cache when it
+retrieved the same chunks for the same model and its embedding is within a
+cosine-similarity threshold of a cached query, so paraphrases of a common
+question skip LLM generation.
+
+Entries are evicted LRU-first past `max_entries` and expire after a TTL.
+The whole cache is dropped when the collection version changes (see
+`adapters.chroma.get_collection_version`).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+import numpy as np
+
+from genai_challenge.config import settings
+
+
+class SemanticAnswerCache:
+    """
+    LRU/TTL cache of RAG answers looked up by embedding similarity.
+    """
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        ttl_seconds: float | None = None,
+        similarity_threshold: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries or settings.rag_cache_max_entries
+        self.ttl_seconds = ttl_seconds or settings.rag_cache_ttl_seconds
+        self.similarity_threshold = (
+            similarity_threshold
+            if similarity_threshold is not None
+            else settings.rag_cache_similarity_threshold
+        )
+        self._clock = clock
+        self._lock = threading.Lock()
+        # entry_id -> entry dict, oldest first
+        self._entries: OrderedDict[int, dict] = OrderedDict()
+        # (model_name, chunk_ids) -> entry ids
+        self._buckets: dict[tuple, set[int]] = {}
+        self._next_id = 0
+        self._version = ""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _bucket_key(chunk_ids: list[str], model_name: str) -> tuple:
+        return (model_name, tuple(sorted(chunk_ids)))
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        bucket = self._buckets[entry["bucket"]]
+        bucket.discard(entry_id)
+        if not bucket:
+            del self._buckets[entry["bucket"]]
+
+    def _check_version(self, version: str) -> None:
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._buckets.clear()
+            self._version = version
+
+    def get(
+        self,
+        embedding: list[float],
+        chunk_ids: list[str],
+        model_name: str,
+        version: str = "",
+    ) -> str | None:
+        """
+        Look up a cached answer.
+
+        Returns:
+            The cached answer, or None on a miss.
+        """
+        query = self._normalize(embedding)
+        key = self._bucket_key(chunk_ids, model_name)
+        now = self._clock()
+
+        with self._lock:
+            self._check_version(version)
+
+            best_id, best_score = None, self.similarity_threshold
+            for entry_id in list(self._buckets.get(key, ())):
+                entry = self._entries[entry_id]
+                if now - entry["created_at"] > self.ttl_seconds:
+                    self._remove(entry_id)
+                    continue
+                score = float(np.dot(query, entry["embedding"]))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            return self._entries[best_id]["answer"]
+
+    def put(
+        self,
+        embedding: list[float],
+        chunk_ids: list[str],
+        model_name: str,
+        answer: str,
+        version: str = "",
+    ) -> None:
+        """Store a generated answer for later lookups."""
+        key = self._bucket_key(chunk_ids, model_name)
+
+        with self._lock:
+            self._check_version(version)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "embedding": self._normalize(embedding),
+                "bucket": key,
+                "answer": answer,
+                "created_at": self._clock(),
+            }
+            self._buckets.setdefault(key, set()).add(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all cached answers."""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> dict:
+        """Snapshot of cache counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# singleton instance for the app
+answer_cache = SemanticAnswerCache()
@@ -2,13 +2,155 @@
 LLM service - orchestrates chat interactions.
 
 Combines Ollama adapter with conversation memory for chat with history.
+
+With `memory_summary_enabled`, a session whose stored history grows past
+`memory_summary_threshold_tokens` is compacted after the reply is returned:
+all but the newest `memory_summary_keep_turns` turns are summarized by the
+LLM (at batch priority), and the summary is sent before the recent history
+from then on.
 """
 
+import asyncio
 import uuid
+from collections.abc import AsyncIterator
+
+from genai_challenge.adapters.ollama import generate_response, stream_response
+from genai_challenge.adapters.scheduler import BATCH
+from genai_challenge.config import settings
+from genai_challenge.core.metrics import metrics, span
+from genai_challenge.core.prompts import (
+    SUMMARY_PROMPT,
+    SYSTEM_PROMPT,
+    format_summary_context,
+    format_summary_request,
+)
+from genai_challenge.services.memory import conversation_store, estimate_tokens
+
+summary_tokens_saved = metrics.histogram(
+    "genai_memory_summary_tokens_saved",
+    "Prompt tokens saved per chat turn by sending a summary of older turns",
+    buckets=(0, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+)
+compactions = metrics.counter(
+    "genai_memory_compactions_total", "History compactions, by result"
+)
+
+# session_id -> compaction running in the background
+_compactions: dict[str, asyncio.Task] = {}
+
+
+def _tokens_saved(summary: dict, window: list[dict[str, str]]) -> int:
+    """
+    Prompt tokens saved by sending the summary with `window`.
+
+    Without the summary, the window would also hold the compacted turns in
+    'window_turn_tokens', as far as the `window_tokens` budget allows; every
+    other compacted turn would not have been sent anyway.
+    """
+    budget = conversation_store.window_tokens
+    if budget is not None:
+        budget -= sum(estimate_tokens(msg["content"]) for msg in window)
+    replaced = 0
+    for cost in reversed(summary["window_turn_tokens"]):
+        if budget is not None:
+            if cost > budget:
+                break
+            budget -= cost
+        replaced += cost
+    return replaced - estimate_tokens(summary["content"])
 
-from genai_challenge.adapters.ollama import generate_response
-from genai_challenge.core.prompts import SYSTEM_PROMPT
-from genai_challenge.services.memory import conversation_store
+
+def _summary_messages(
+    session_id: str, window: list[dict[str, str]]
+) -> list[dict[str, str]]:
+    """The summary of the compacted turns as a message, if there is one"""
+    summary = conversation_store.get_summary(session_id)
+    if summary is None:
+        return []
+
+    if settings.metrics_enabled:
+        summary_tokens_saved.observe(max(_tokens_saved(summary, window), 0))
+    return [{"role": "system", "content": format_summary_context(summary["content"])}]
+
+
+def _build_messages(session_id: str, message: str) -> list[dict[str, str]]:
+    """messages list: system + summary + recent history + current message"""
+    history = conversation_store.get_window(session_id)
+
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    messages.extend(_summary_messages(session_id, history))
+    messages.extend(history)
+    messages.append({"role": "user", "content": message})
+    return messages
+
+
+async def compact_history(session_id: str) -> bool:
+    """
+    Summarize the older turns of a session whose history is too long.
+
+    The summary replaces the older turns in the store, merged with the
+    previous summary of the session if there is one.
+
+    Return:
+        True if the history was compacted
+    """
+    history = await conversation_store.run(conversation_store.get_history, session_id)
+    keep = settings.memory_summary_keep_turns * 2
+    tokens = sum(estimate_tokens(msg["content"]) for msg in history)
+    if tokens <= settings.memory_summary_threshold_tokens or len(history) <= keep:
+        return False
+
+    older = history[: len(history) - keep]
+    previous = await conversation_store.run(conversation_store.get_summary, session_id)
+    messages = [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {
+            "role": "user",
+            "content": format_summary_request(
+                previous["content"] if previous else None, older
+            ),
+        },
+    ]
+    with span("summarize"):
+        summary = await generate_response(
+            messages, priority=BATCH, session_id=session_id
+        )
+
+    source_tokens = sum(estimate_tokens(msg["content"]) for msg in older)
+    if previous:
+        source_tokens += previous["source_tokens"]
+    compacted = await conversation_store.run(
+        conversation_store.compact, session_id, summary.strip(), older, source_tokens
+    )
+    if settings.metrics_enabled:
+        compactions.inc(result="compacted" if compacted else "conflict")
+    return compacted
+
+
+async def _run_compaction(session_id: str) -> None:
+    try:
+        await compact_history(session_id)
+    except Exception:
+        # the history stays as it is; the next turn tries again
+        if settings.metrics_enabled:
+            compactions.inc(result="error")
+    finally:
+        _compactions.pop(session_id, None)
+
+
+def schedule_compaction(session_id: str) -> None:
+    """Compact a session's history in the background, if enabled."""
+    if not settings.memory_summary_enabled or session_id in _compactions:
+        return
+    _compactions[session_id] = asyncio.create_task(_run_compaction(session_id))
+
+
+async def cancel_compactions() -> None:
+    """Cancel the compactions still running (on shutdown)."""
+    tasks = list(_compactions.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
 
 
 async def chat(
@@ -23,26 +165,146 @@ async def chat(
         session_id: Optional session ID for conversation continuity
                     If None, a new session is created and an ID is assignated
             model_name: Optional model override.
-    
-    Return: 
+
+    Return:
         Tuple of (response_text, session_id)
     """
 
     # Generate session_id if not provided
     if session_id is None:
         session_id = str(uuid.uuid4())
-    
-    history = conversation_store.get_history(session_id)
 
-    # messages list: system + history + current message
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-    messages.extend(history)
-    messages.append({"role": "user", "content": message})
+    with span("memory_read"):
+        messages = await conversation_store.run(_build_messages, session_id, message)
 
     # call ollama
-    response = await generate_response(messages, model_name)
+    response = await generate_response(messages, model_name, session_id=session_id)
 
     # Save interaction to memory
-    conversation_store.add_interaction(session_id, message, response)
+    with span("memory_write"):
+        await conversation_store.run(
+            conversation_store.add_interaction, session_id, message, response
+        )
+    schedule_compaction(session_id)
+
+    return response, session_id
+
+
+async def chat_batch(
+    requests: list[tuple[str, str | None]],
+    model_name: str | None = None,
+) -> list[dict]:
+    """
+    Process many chat messages, possibly for many sessions.
+
+    Turns of the same session run in request order, each seeing the
+    previous ones in its history; different sessions run concurrently, at
+    most `batch_max_concurrency` at a time. Memory is written once, in bulk,
+    after every session finished. If a turn fails, the later turns of its
+    session are skipped.
+
+    Args:
+        requests: (message, session_id) pairs. Each pair without a
+                  session_id starts its own new session.
+        model_name: Optional model override.
+
+    Return:
+        One dict per request, in order, with 'response', 'session_id' and
+        'error' keys
+    """
+    session_ids = [session_id or str(uuid.uuid4()) for _, session_id in requests]
+    turns: dict[str, list[int]] = {}
+    for i, session_id in enumerate(session_ids):
+        turns.setdefault(session_id, []).append(i)
+
+    results: list[dict] = [
+        {"response": None, "session_id": session_id, "error": None}
+        for session_id in session_ids
+    ]
+    interactions: list[tuple[str, str, str]] = []
+    semaphore = asyncio.Semaphore(settings.batch_max_concurrency)
+
+    def load_session(session_id: str):
+        turns = conversation_store.turn_count(session_id)
+        history = conversation_store.get_window(session_id)
+        return turns, history, _summary_messages(session_id, history)
+
+    async def run_session(session_id: str, indexes: list[int]) -> None:
+        async with semaphore:
+            turns, history, summary = await conversation_store.run(
+                load_session, session_id
+            )
+            for n, i in enumerate(indexes):
+                message = requests[i][0]
+                messages = [{"role": "system", "content": SYSTEM_PROMPT}, *summary]
+                messages.extend(conversation_store.fit_window(history, turns + n))
+                messages.append({"role": "user", "content": message})
+                try:
+                    response = await generate_response(
+                        messages, model_name, priority=BATCH, session_id=session_id
+                    )
+                except Exception as e:
+                    results[i]["error"] = str(e) or type(e).__name__
+                    for skipped in indexes[n + 1 :]:
+                        results[skipped]["error"] = (
+                            "Skipped: an earlier turn of this session failed"
+                        )
+                    return
+
+                results[i]["response"] = response
+                interactions.append((session_id, message, response))
+                history.extend(
+                    [
+                        {"role": "user", "content": message},
+                        {"role": "assistant", "content": response},
+                    ]
+                )
+
+    await asyncio.gather(
+        *(run_session(session_id, indexes) for session_id, indexes in turns.items())
+    )
+
+    # Save all interactions to memory at once
+    await conversation_store.run(conversation_store.add_interactions, interactions)
+    for session_id in {session_id for session_id, _, _ in interactions}:
+        schedule_compaction(session_id)
+
+    return results
+
+
+async def chat_stream(
+    message: str,
+    session_id: str | None = None,
+    model_name: str | None = None,
+) -> AsyncIterator[dict]:
+    """
+    Process a chat message and stream the assistant's response.
+
+    Yields events as dicts:
+        {"type": "session", "session_id": ...} first,
+        {"type": "token", "content": ...} per generated chunk,
+        {"type": "done", "session_id": ...} once the reply is complete.
+
+    The full reply is saved to memory only after the stream finishes, so an
+    interrupted stream leaves the conversation unchanged.
+    """
+    if session_id is None:
+        session_id = str(uuid.uuid4())
+
+    yield {"type": "session", "session_id": session_id}
+
+    with span("memory_read"):
+        messages = await conversation_store.run(_build_messages, session_id, message)
+
+    parts = []
+    async for token in stream_response(messages, model_name, session_id=session_id):
+        parts.append(token)
+        yield {"type": "token", "content": token}
+
+    with span("memory_write"):
+        await conversation_store.run(
+            conversation_store.add_interaction, session_id, message, "".join(parts)
+        )
+    schedule_compaction(session_id)
 
-    return response, session_id
\ No newline at end of file
+    yield {"type": "done", "session_id": session_id}
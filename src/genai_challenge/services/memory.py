@@ -1,49 +1,692 @@
 """
 Conversation memory store
 
-Simple in-memory storage conversation history indexed by session_id.
-Uses in-memory storage (dict)
->>>> *Consider a database persistence*
+Conversation history indexed by session_id, behind a small storage interface:
+- `ConversationStore`: in-memory storage (dict), the default. History is lost
+  on restart and is not shared between uvicorn workers.
+- `SQLiteConversationStore`: SQLite file in WAL mode, shared by every worker
+  process on the same host and persistent across restarts.
+
+Select the backend with `MEMORY_BACKEND` ("memory" or "sqlite").
+
+Stores are bounded: sessions are evicted least-recently-used past
+`memory_max_sessions` or after `memory_session_ttl_seconds` of inactivity,
+and each session keeps at most `memory_max_turns` turns.
+Only a window of recent turns (`get_window`) is sent to the model. The window
+moves in steps of `memory_window_stride` turns instead of one turn at a time,
+so between steps the history sent to the model only grows at the end and the
+LLM backend can reuse its cached prompt prefix. The steps are counted from the
+session's first turn ever, which stays fixed when old turns are dropped past
+`memory_max_turns` or compacted.
+
+Older turns can be compacted into a summary (`compact`), which the store
+keeps next to the remaining turns of the session (`get_summary`), with the
+token counts of the newest compacted turns, to tell how much of the window
+the summary replaces.
 """
 
-class ConversationStore:
+import asyncio
+import functools
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict, deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Any
+
+from genai_challenge.config import settings
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+class BaseConversationStore(ABC):
+    """
+    Storage interface for conversation memory.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int | None = None,
+        session_ttl_seconds: float | None = None,
+        max_turns: int | None = None,
+        window_turns: int | None = None,
+        window_tokens: int | None = None,
+        window_stride: int | None = None,
+    ):
+        self.max_sessions = max_sessions or settings.memory_max_sessions
+        self.session_ttl_seconds = (
+            session_ttl_seconds or settings.memory_session_ttl_seconds
+        )
+        self.max_turns = max_turns or settings.memory_max_turns
+        self.window_turns = window_turns or settings.memory_window_turns
+        self.window_tokens = window_tokens or settings.memory_window_tokens
+        self.window_stride = (
+            window_stride
+            or settings.memory_window_stride
+            or max(1, self.window_turns // 2)
+        )
+        self.evictions = 0
+        self.expirations = 0
+
+    @abstractmethod
+    def get_history(self, session_id: str) -> list[dict[str, str]]:
+        """Get conversation history as list of message dicts."""
+
+    @abstractmethod
+    def _recent_messages(
+        self, session_id: str, limit: int
+    ) -> tuple[list[dict[str, str]], int]:
+        """
+        Return up to `limit` most recent messages, oldest first, and the
+        number of turns ever added to the session (read together).
+        """
+
+    @abstractmethod
+    def add_interaction(
+        self, session_id: str, user_message: str, assistant_response: str
+    ) -> None:
+        """Save a user message and assistant response to memory"""
+
+    @abstractmethod
+    def clear_session(self, session_id: str) -> None:
+        """Clear memory for a specific session."""
+
+    @abstractmethod
+    def get_summary(self, session_id: str) -> dict | None:
+        """
+        Summary of the compacted turns of a session, if any.
+
+        Returns a dict with the summary 'content', the 'source_tokens' of
+        the messages it replaced and the 'window_turn_tokens': the token
+        count of each compacted turn the window would still hold without
+        the summary, oldest first.
+        """
+
+    @abstractmethod
+    def compact(
+        self,
+        session_id: str,
+        summary: str,
+        replaced: list[dict[str, str]],
+        source_tokens: int,
+    ) -> bool:
+        """
+        Replace the oldest messages of a session with a summary.
+
+        `replaced` must still be the oldest messages of the session;
+        otherwise (e.g. the session was cleared meanwhile) nothing changes
+        and False is returned.
+        """
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Memory usage metrics."""
+
+    def close(self) -> None:
+        """Release storage resources."""
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """
+        Call a store method (or a function using the store) from async code.
+
+        Runs inline: the in-memory store only holds its lock briefly. Stores
+        doing I/O run the call off the event loop instead.
+        """
+        return fn(*args)
+
+    def add_interactions(self, interactions: list[tuple[str, str, str]]) -> None:
+        """Save several (session_id, user_message, assistant_response) turns."""
+        for session_id, user_message, assistant_response in interactions:
+            self.add_interaction(session_id, user_message, assistant_response)
+
+    def _window_start(self, turns: int) -> int:
+        """Absolute index of the first turn in the window of `turns` turns."""
+        if turns <= self.window_turns:
+            return 0
+        stride = self.window_stride
+        return -(-(turns - self.window_turns) // stride) * stride
+
+    def _compacted_turn_tokens(
+        self, previous: list[int], replaced: list[dict[str, str]]
+    ) -> list[int]:
+        """Token counts of the newest `window_turns` compacted turns."""
+        tokens = [
+            sum(estimate_tokens(msg["content"]) for msg in replaced[i : i + 2])
+            for i in range(0, len(replaced), 2)
+        ]
+        return (previous + tokens)[-self.window_turns :]
+
+    def _compacted_in_window(
+        self, turn_tokens: list[int], first_turn: int, turns: int
+    ) -> list[int]:
+        """
+        Token counts of the compacted turns in the window, oldest first.
+
+        Args:
+            turn_tokens: Token counts of the newest compacted turns
+            first_turn: Absolute index of the first turn not compacted
+            turns: Turns in the session
+        """
+        count = first_turn - self._window_start(turns)
+        return turn_tokens[-count:] if count > 0 else []
+
+    def turn_count(self, session_id: str) -> int:
+        """Number of turns ever added to a session (0 for a new session)."""
+        return self._recent_messages(session_id, 0)[1]
+
+    def get_window(self, session_id: str) -> list[dict[str, str]]:
+        """
+        Get the recent part of the history that is sent to the model.
+
+        At most `window_turns` turns are returned; if `window_tokens` is set,
+        older turns are dropped until the window fits the token budget.
+        """
+        messages, turns = self._recent_messages(session_id, self.window_turns * 2)
+        return self.fit_window(messages, turns)
+
+    def fit_window(
+        self, messages: list[dict[str, str]], turns: int | None = None
+    ) -> list[dict[str, str]]:
+        """
+        Trim a message history to the window sent to the model.
+
+        Once the session has more than `window_turns` turns, the window starts
+        at a multiple of `window_stride` turns counted from the session's first
+        turn, leaving between `window_turns - window_stride + 1` and
+        `window_turns` turns. Then older turns are dropped one at a time until
+        the rest fits `window_tokens` (if set), which does not keep the prefix
+        stable.
+
+        Args:
+            messages: The most recent messages of the session
+            turns: Turns in the session up to the last message, including
+                turns no longer stored (default: `messages` is the whole
+                history)
+        """
+        # absolute index of the last turn, and of the first one in `messages`
+        turns = max(turns or 0, len(messages) // 2)
+        first = turns - len(messages) // 2
+        start = self._window_start(turns)
+        if start > first:
+            messages = messages[(start - first) * 2 :]
+        if self.window_tokens is None:
+            return messages
+
+        budget = self.window_tokens
+        start = len(messages)
+        # walk turns (user + assistant pairs) from newest to oldest
+        for i in range(len(messages) - 2, -1, -2):
+            cost = sum(estimate_tokens(msg["content"]) for msg in messages[i : i + 2])
+            if cost > budget:
+                break
+            budget -= cost
+            start = i
+        return messages[start:]
+
+
+class ConversationStore(BaseConversationStore):
     """
-    Manages conversation memory for multiple sessions.
+    Manages conversation memory for multiple sessions, in process memory.
     """
 
-    def __init__(self):
-        self._sessions: dict[str, list[dict[str, str]]] = {}
+    def __init__(self, clock: Callable[[], float] = time.monotonic, **limits):
+        super().__init__(**limits)
+        self._clock = clock
+        self._lock = threading.Lock()
+        # session_id -> messages, least recently used first
+        self._sessions: OrderedDict[str, deque[dict[str, str]]] = OrderedDict()
+        self._last_access: dict[str, float] = {}
+        self._summaries: dict[str, dict] = {}
+        # session_id -> turns ever added, including dropped or compacted ones
+        self._turns: dict[str, int] = {}
+        self._chars = 0
+
+    def _drop(self, session_id: str) -> None:
+        messages = self._sessions.pop(session_id)
+        self._last_access.pop(session_id, None)
+        self._summaries.pop(session_id, None)
+        self._turns.pop(session_id, None)
+        self._chars -= sum(len(msg["content"]) for msg in messages)
+
+    def _expire(self, now: float) -> None:
+        """Drop sessions idle for longer than the TTL (oldest first)."""
+        while self._sessions:
+            oldest = next(iter(self._sessions))
+            if now - self._last_access[oldest] <= self.session_ttl_seconds:
+                break
+            self._drop(oldest)
+            self.expirations += 1
+
+    def _touch(self, session_id: str) -> deque[dict[str, str]] | None:
+        now = self._clock()
+        self._expire(now)
+        messages = self._sessions.get(session_id)
+        if messages is not None:
+            self._sessions.move_to_end(session_id)
+            self._last_access[session_id] = now
+        return messages
 
     def get_history(self, session_id: str) -> list[dict[str, str]]:
         """
         Get conversation history as list of message dicts.
         """
-        return self._sessions.get(session_id, []).copy()
+        with self._lock:
+            messages = self._touch(session_id)
+            return list(messages) if messages else []
+
+    def _recent_messages(
+        self, session_id: str, limit: int
+    ) -> tuple[list[dict[str, str]], int]:
+        with self._lock:
+            messages = self._touch(session_id)
+            if not messages:
+                return [], self._turns.get(session_id, 0)
+            recent = list(islice(reversed(messages), limit))
+            recent.reverse()
+            return recent, self._turns[session_id]
 
     def add_interaction(
-        self, 
-        session_id: str, 
-        user_message: str, 
+        self,
+        session_id: str,
+        user_message: str,
         assistant_response: str
     ) -> None:
         """
         Save a user message and assistant response to memory
         """
-        if session_id not in self._sessions:
-            self._sessions[session_id] = []
+        with self._lock:
+            messages = self._touch(session_id)
+            if messages is None:
+                messages = deque(maxlen=self.max_turns * 2)
+                self._sessions[session_id] = messages
+                self._last_access[session_id] = self._clock()
+                while len(self._sessions) > self.max_sessions:
+                    self._drop(next(iter(self._sessions)))
+                    self.evictions += 1
+
+            self._turns[session_id] = self._turns.get(session_id, 0) + 1
+            for msg in (
+                {"role": "user", "content": user_message},
+                {"role": "assistant", "content": assistant_response},
+            ):
+                if len(messages) == messages.maxlen:
+                    # the deque drops its oldest message on append
+                    self._chars -= len(messages[0]["content"])
+                messages.append(msg)
+                self._chars += len(msg["content"])
+
+    def clear_session(self, session_id: str) -> None:
+        """Clear memory for a specific session."""
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+
+    def get_summary(self, session_id: str) -> dict | None:
+        with self._lock:
+            summary = self._summaries.get(session_id)
+            if summary is None:
+                return None
+            return {
+                "content": summary["content"],
+                "source_tokens": summary["source_tokens"],
+                "window_turn_tokens": self._compacted_in_window(
+                    summary["turn_tokens"],
+                    summary["first_turn"],
+                    self._turns[session_id],
+                ),
+            }
+
+    def compact(
+        self,
+        session_id: str,
+        summary: str,
+        replaced: list[dict[str, str]],
+        source_tokens: int,
+    ) -> bool:
+        with self._lock:
+            messages = self._sessions.get(session_id)
+            if (
+                not replaced
+                or not messages
+                or list(islice(messages, len(replaced))) != replaced
+            ):
+                return False
+            for _ in replaced:
+                self._chars -= len(messages.popleft()["content"])
+            previous = self._summaries.get(session_id)
+            self._summaries[session_id] = {
+                "content": summary,
+                "source_tokens": source_tokens,
+                "turn_tokens": self._compacted_turn_tokens(
+                    previous["turn_tokens"] if previous else [], replaced
+                ),
+                "first_turn": self._turns[session_id] - len(messages) // 2,
+            }
+            return True
+
+    def stats(self) -> dict:
+        """Memory usage metrics."""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "messages": sum(len(m) for m in self._sessions.values()),
+                "content_chars": self._chars,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class SQLiteConversationStore(BaseConversationStore):
+    """
+    Conversation memory in an SQLite database shared across processes.
 
-        self._sessions[session_id].append(
-            {"role": "user", "content": user_message}
+    WAL mode lets worker processes read while another one writes. Each
+    interaction (or batch of interactions) is written in one transaction,
+    and messages are indexed by (session_id, id) so history reads are a
+    range scan. Session recency uses wall-clock time so it is comparable
+    across processes.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            last_access REAL NOT NULL,
+            turns INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_sessions_last_access
+            ON sessions (last_access);
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL
+                REFERENCES sessions (session_id) ON DELETE CASCADE,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_messages_session
+            ON messages (session_id, id);
+        CREATE TABLE IF NOT EXISTS summaries (
+            session_id TEXT PRIMARY KEY
+                REFERENCES sessions (session_id) ON DELETE CASCADE,
+            content TEXT NOT NULL,
+            source_tokens INTEGER NOT NULL,
+            -- JSON list of the token counts of the newest compacted turns
+            turn_tokens TEXT NOT NULL DEFAULT '[]',
+            first_turn INTEGER NOT NULL DEFAULT 0
+        );
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        clock: Callable[[], float] = time.time,
+        **limits,
+    ):
+        super().__init__(**limits)
+        self.path = path or settings.memory_sqlite_path
+        self._clock = clock
+        self._lock = threading.Lock()
+        # every call holds the lock, so one thread is enough to keep them off
+        # the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory")
+
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            self.path,
+            timeout=settings.memory_sqlite_timeout,
+            check_same_thread=False,
+            isolation_level=None,
         )
-        self._sessions[session_id].append(
-            {"role": "assistant", "content": assistant_response}
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(self._SCHEMA)
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    def _touch(self, session_id: str) -> None:
+        """Mark a session as used now; call inside a write transaction."""
+        self._conn.execute(
+            "UPDATE sessions SET last_access = ? WHERE session_id = ?",
+            (self._clock(), session_id),
         )
 
+    def get_history(self, session_id: str) -> list[dict[str, str]]:
+        """
+        Get conversation history as list of message dicts.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._touch(session_id)
+                rows = self._conn.execute(
+                    "SELECT role, content FROM messages WHERE session_id = ? "
+                    "ORDER BY id",
+                    (session_id,),
+                ).fetchall()
+            finally:
+                self._conn.execute("COMMIT")
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def _recent_messages(
+        self, session_id: str, limit: int
+    ) -> tuple[list[dict[str, str]], int]:
+        with self._lock:
+            # messages and turn count from one snapshot
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._touch(session_id)
+                session = self._conn.execute(
+                    "SELECT turns FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                rows = self._conn.execute(
+                    "SELECT role, content FROM messages WHERE session_id = ? "
+                    "ORDER BY id DESC LIMIT ?",
+                    (session_id, limit),
+                ).fetchall()
+            finally:
+                self._conn.execute("COMMIT")
+        messages = [
+            {"role": role, "content": content} for role, content in reversed(rows)
+        ]
+        return messages, session[0] if session else 0
+
+    def add_interaction(
+        self, session_id: str, user_message: str, assistant_response: str
+    ) -> None:
+        """
+        Save a user message and assistant response to memory
+        """
+        self.add_interactions([(session_id, user_message, assistant_response)])
+
+    def add_interactions(self, interactions: list[tuple[str, str, str]]) -> None:
+        """
+        Save several turns in a single transaction.
+        """
+        if not interactions:
+            return
+
+        now = self._clock()
+        turns = Counter(session_id for session_id, _, _ in interactions)
+        rows = []
+        for session_id, user_message, assistant_response in interactions:
+            rows.append((session_id, "user", user_message))
+            rows.append((session_id, "assistant", assistant_response))
+
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                cur.execute(
+                    "DELETE FROM sessions WHERE last_access < ?",
+                    (now - self.session_ttl_seconds,),
+                )
+                self.expirations += cur.rowcount
+
+                cur.executemany(
+                    "INSERT INTO sessions (session_id, last_access, turns) "
+                    "VALUES (?, ?, ?) ON CONFLICT (session_id) "
+                    "DO UPDATE SET last_access = excluded.last_access, "
+                    "turns = turns + excluded.turns",
+                    [(session_id, now, count) for session_id, count in turns.items()],
+                )
+                cur.executemany(
+                    "INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)",
+                    rows,
+                )
+                # keep only the newest max_turns turns of each session
+                cur.executemany(
+                    "DELETE FROM messages WHERE session_id = ? AND id <= ("
+                    "SELECT id FROM messages WHERE session_id = ? "
+                    "ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    [
+                        (session_id, session_id, self.max_turns * 2)
+                        for session_id in turns
+                    ],
+                )
+                cur.execute(
+                    "DELETE FROM sessions WHERE session_id IN ("
+                    "SELECT session_id FROM sessions ORDER BY last_access DESC "
+                    "LIMIT -1 OFFSET ?)",
+                    (self.max_sessions,),
+                )
+                self.evictions += cur.rowcount
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+
     def clear_session(self, session_id: str) -> None:
         """Clear memory for a specific session."""
-        self._sessions.pop(session_id, None)
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM sessions WHERE session_id = ?", (session_id,)
+            )
+
+    def get_summary(self, session_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, source_tokens, turn_tokens, first_turn, turns "
+                "FROM summaries JOIN sessions USING (session_id) "
+                "WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        content, source_tokens, turn_tokens, first_turn, turns = row
+        return {
+            "content": content,
+            "source_tokens": source_tokens,
+            "window_turn_tokens": self._compacted_in_window(
+                json.loads(turn_tokens), first_turn, turns
+            ),
+        }
+
+    def compact(
+        self,
+        session_id: str,
+        summary: str,
+        replaced: list[dict[str, str]],
+        source_tokens: int,
+    ) -> bool:
+        if not replaced:
+            return False
+
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                rows = cur.execute(
+                    "SELECT id, role, content FROM messages WHERE session_id = ? "
+                    "ORDER BY id LIMIT ?",
+                    (session_id, len(replaced)),
+                ).fetchall()
+                oldest = [
+                    {"role": role, "content": content} for _, role, content in rows
+                ]
+                if oldest != replaced:
+                    cur.execute("ROLLBACK")
+                    return False
+
+                cur.execute(
+                    "DELETE FROM messages WHERE session_id = ? AND id <= ?",
+                    (session_id, rows[-1][0]),
+                )
+                # absolute index of the first remaining turn
+                (first_turn,) = cur.execute(
+                    "SELECT turns - (SELECT COUNT(*) / 2 FROM messages "
+                    "WHERE session_id = ?) FROM sessions WHERE session_id = ?",
+                    (session_id, session_id),
+                ).fetchone()
+                previous = cur.execute(
+                    "SELECT turn_tokens FROM summaries WHERE session_id = ?",
+                    (session_id,),
+                ).fetchone()
+                turn_tokens = self._compacted_turn_tokens(
+                    json.loads(previous[0]) if previous else [], replaced
+                )
+                cur.execute(
+                    "INSERT INTO summaries "
+                    "(session_id, content, source_tokens, turn_tokens, first_turn) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT (session_id) DO UPDATE SET "
+                    "content = excluded.content, "
+                    "source_tokens = excluded.source_tokens, "
+                    "turn_tokens = excluded.turn_tokens, "
+                    "first_turn = excluded.first_turn",
+                    (
+                        session_id,
+                        summary,
+                        source_tokens,
+                        json.dumps(turn_tokens),
+                        first_turn,
+                    ),
+                )
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+        return True
+
+    def stats(self) -> dict:
+        """Memory usage metrics."""
+        with self._lock:
+            sessions = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()
+            messages, chars = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(content)), 0) FROM messages"
+            ).fetchone()
+        return {
+            "sessions": sessions[0],
+            "messages": messages,
+            "content_chars": chars,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._executor.shutdown()
+        with self._lock:
+            self._conn.close()
+
 
+def create_conversation_store() -> BaseConversationStore:
+    """Build the conversation store selected by `settings.memory_backend`."""
+    if settings.memory_backend == "sqlite":
+        return SQLiteConversationStore()
+    if settings.memory_backend == "memory":
+        return ConversationStore()
+    raise ValueError(f"Unknown memory backend: {settings.memory_backend}")
 
 
 # singleton instance for the app
-conversation_store = ConversationStore()
\ No newline at end of file
+conversation_store = create_conversation_store()
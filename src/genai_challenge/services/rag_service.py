@@ -2,56 +2,306 @@
 RAG service.
 
 Combines document retrieval from ChromaDB with LLM generation for Q&A.
+
+Retrieval follows `settings.retrieval_mode`: vector search, BM25 keyword
+search, or both fused with reciprocal rank fusion ("hybrid"). With
+`rerank_enabled`, a wider list of `rerank_candidates` chunks is retrieved
+and a cross-encoder keeps the best `top_k` (`adapters/reranker.py`). The
+retrieved chunks are then narrowed to the prompt context by `select_context`:
+low-relevance chunks are dropped, overlapping neighbors merged and the
+context kept within a token budget. Chunk sizes come from the token counts
+stored at ingestion, so no text is re-tokenized at query time.
+
+Queries similar enough to a question of an FAQ document are answered with
+the answer stored at ingestion (`adapters/faq.py`), before any retrieval.
 """
 
-from genai_challenge.adapters.chroma import similarity_search
-from genai_challenge.adapters.ollama import generate_response
-from genai_challenge.core.prompts import format_rag_prompt
+import asyncio
+from collections.abc import AsyncIterator
 
+from genai_challenge.adapters.bm25 import keyword_search
+from genai_challenge.adapters.chroma import (
+    embed_queries,
+    embed_query,
+    get_collection_version,
+    run_retrieval,
+    similarity_search,
+    similarity_search_by_vectors,
+)
+from genai_challenge.adapters.faq import match_faq
+from genai_challenge.adapters.ollama import generate_response, stream_response
+from genai_challenge.adapters.reranker import reranker
+from genai_challenge.adapters.scheduler import BATCH
+from genai_challenge.config import settings
+from genai_challenge.core.chunking import overlap_length
+from genai_challenge.core.metrics import span
+from genai_challenge.core.prompts import RAG_SYSTEM_PROMPT, format_rag_context
+from genai_challenge.services.answer_cache import answer_cache
+from genai_challenge.services.memory import estimate_tokens
 
-async def rag_query(
-    query: str,
-    top_k: int | None = None,
-) -> dict:
+NO_DOCUMENTS_ANSWER = "I couldn't find relevant information in the documents."
+
+
+def _chunk_key(doc: dict) -> str:
+    """Vector store ID of a chunk, or 'source:chunk_id' if it has none."""
+    return (
+        doc.get("id")
+        or f"{doc['metadata'].get('source')}:{doc['metadata'].get('chunk_id')}"
+    )
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[dict]], top_k: int, constant: int | None = None
+) -> list[dict]:
     """
-    Anser a question using rag pipeline
+    Merge ranked result lists with reciprocal rank fusion.
+
+    Each chunk scores sum(1 / (constant + rank)) over the lists it appears
+    in, so chunks ranked well by several retrievers come first.
 
     Args:
-        query: users question
-        top_k: number of docuemnts to retrieve (optional)
+        rankings: Result lists, best first
+        top_k: Number of chunks to return
+        constant: RRF smoothing constant (default `settings.rrf_k`)
+    """
+    constant = constant or settings.rrf_k
+    scores: dict[str, float] = {}
+    chunks: dict[str, dict] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = _chunk_key(doc)
+            chunks.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1 / (constant + rank)
+
+    best = sorted(scores, key=scores.__getitem__, reverse=True)[:top_k]
+    return [chunks[key] for key in best]
+
+
+def retrieve(query: str, top_k: int | None = None) -> list[dict]:
+    """
+    Retrieve chunks for a query according to `settings.retrieval_mode`.
+
+    Blocking; async callers run it through `run_retrieval`.
+    """
+    k = top_k or settings.default_top_k
+    mode = settings.retrieval_mode
+    if mode == "vector":
+        return similarity_search(query, top_k=k)
+    if mode == "bm25":
+        return keyword_search(query, top_k=k)
+    if mode == "hybrid":
+        candidates = max(k, settings.hybrid_candidates)
+        return reciprocal_rank_fusion(
+            [
+                similarity_search(query, top_k=candidates),
+                keyword_search(query, top_k=candidates),
+            ],
+            k,
+        )
+    raise ValueError(f"Unknown retrieval mode: {mode}")
+
+
+def retrieve_batch(
+    queries: list[str],
+    embeddings: list[list[float]],
+    top_k: int | None = None,
+) -> list[list[dict]]:
+    """Batch `retrieve` for queries whose embeddings are already known."""
+    k = top_k or settings.default_top_k
+    mode = settings.retrieval_mode
+    if mode == "vector":
+        return similarity_search_by_vectors(embeddings, top_k=k)
+    if mode == "bm25":
+        return [keyword_search(query, top_k=k) for query in queries]
+    if mode == "hybrid":
+        candidates = max(k, settings.hybrid_candidates)
+        vector = similarity_search_by_vectors(embeddings, top_k=candidates)
+        return [
+            reciprocal_rank_fusion([docs, keyword_search(query, top_k=candidates)], k)
+            for query, docs in zip(queries, vector, strict=True)
+        ]
+    raise ValueError(f"Unknown retrieval mode: {mode}")
+
+
+def _candidates(top_k: int | None) -> int:
+    """Chunks to retrieve for `top_k`: more when they are re-ranked."""
+    k = top_k or settings.default_top_k
+    return max(k, settings.rerank_candidates) if settings.rerank_enabled else k
+
+
+def rerank(query: str, docs: list[dict], top_k: int | None = None) -> list[dict]:
+    """
+    Keep the best `top_k` retrieved chunks by cross-encoder score.
+
+    Chunks come back unchanged when re-ranking is disabled, and cut to
+    `top_k` in retrieval order when it is skipped for its time budget.
+    Blocking; async callers run it through `run_retrieval`.
+    """
+    if not settings.rerank_enabled:
+        return docs
+    return reranker.rerank(query, docs, top_k or settings.default_top_k)
+
+
+def rerank_batch(
+    queries: list[str], retrieved: list[list[dict]], top_k: int | None = None
+) -> list[list[dict]]:
+    """`rerank` for each query of a batch."""
+    return [
+        rerank(query, docs, top_k)
+        for query, docs in zip(queries, retrieved, strict=True)
+    ]
+
+
+async def _retrieve(query: str, top_k: int | None) -> list[dict]:
+    """Retrieve (and re-rank) the chunks for a query."""
+    with span("retrieve"):
+        docs = await run_retrieval(retrieve, query, top_k=_candidates(top_k))
+    if settings.rerank_enabled:
+        with span("rerank"):
+            docs = await run_retrieval(rerank, query, docs, top_k)
+    return docs
+
+
+def _join_overlapping(first: str, second: str) -> str | None:
+    """
+    Join two consecutive chunks, dropping the text they share.
+
+    Returns None if the end of `first` does not overlap the start of `second`.
+    """
+    n = overlap_length(first, second)
+    return first + second[n:] if n else None
+
+
+def _token_count(doc: dict) -> int:
+    """Tokens of a chunk, as stored at ingestion (estimated for older chunks)."""
+    count = doc["metadata"].get("token_count")
+    return count if count is not None else estimate_tokens(doc["content"])
+
+
+def _joined_tokens(first: dict, second: dict, overlap: int, content: str) -> int:
+    """Tokens of two joined neighbors; `overlap` is the tokens they share."""
+    if "token_count" in first["metadata"] and "token_count" in second["metadata"]:
+        return _token_count(first) + _token_count(second) - overlap
+    return estimate_tokens(content)
+
+
+def _with_content(passage: dict, content: str, tokens: int) -> dict:
+    metadata = {**passage["metadata"], "token_count": tokens}
+    return {**passage, "content": content, "metadata": metadata}
+
+
+def _merge_neighbors(docs: list[dict]) -> list[dict]:
+    """
+    Merge chunks that are neighbors in the same source and overlap.
+
+    The merged passage takes the place (and ID) of its best-ranked chunk.
+    """
+    # [passage, first chunk_id, last chunk_id, overlap tokens of first chunk]
+    passages: list[list] = []
+    for doc in docs:
+        source = doc["metadata"].get("source")
+        position = doc["metadata"].get("chunk_id")
+        overlap = doc["metadata"].get("overlap_tokens", 0)
+        for entry in passages:
+            passage, first, last, first_overlap = entry
+            if position is None or passage["metadata"].get("source") != source:
+                continue
+            if position == last + 1:
+                joined = _join_overlapping(passage["content"], doc["content"])
+                if joined is not None:
+                    tokens = _joined_tokens(passage, doc, overlap, joined)
+                    entry[0] = _with_content(passage, joined, tokens)
+                    entry[2] = position
+                    break
+            if position == first - 1:
+                joined = _join_overlapping(doc["content"], passage["content"])
+                if joined is not None:
+                    tokens = _joined_tokens(doc, passage, first_overlap, joined)
+                    entry[0] = _with_content(passage, joined, tokens)
+                    entry[1] = position
+                    entry[3] = overlap
+                    break
+        else:
+            passages.append([doc, position, position, overlap])
+    return [passage for passage, _, _, _ in passages]
+
+
+def select_context(retrieved_docs: list[dict]) -> tuple[list[dict], dict]:
+    """
+    Choose which retrieved chunks go into the prompt.
+
+    - chunks with a similarity 'score' below `rag_min_relevance` are dropped
+      (keyword-only hits have no similarity score and are kept)
+    - overlapping neighbor chunks are merged (`rag_merge_overlapping_chunks`)
+    - chunks are added in rank order while they fit `rag_context_max_tokens`
+      (counted with the token counts stored at ingestion); the best chunk is
+      always kept
 
     Returns:
-        Dict with 'answer' and 'sources' keys
+        Tuple of (context chunks, metadata with the counts of each step)
     """
-    # 1: retrieve relevant documents
-    retrieved_docs = similarity_search(query, top_k=top_k)
+    metadata = {
+        "retrieved": len(retrieved_docs),
+        "reranked": any("rerank_score" in doc for doc in retrieved_docs),
+    }
 
-    if not retrieved_docs:
-        return {
-            "answer": "I couldn't find relevant information in the documents.",
-            "sources": [],
-        }
-    # 2: build context from retrieved docuements
+    docs = retrieved_docs
+    if settings.rag_min_relevance is not None:
+        docs = [
+            doc
+            for doc in docs
+            if doc.get("score") is None or doc["score"] >= settings.rag_min_relevance
+        ]
+    metadata["below_relevance"] = len(retrieved_docs) - len(docs)
+
+    if settings.rag_merge_overlapping_chunks:
+        merged = _merge_neighbors(docs)
+        metadata["merged"] = len(docs) - len(merged)
+        docs = merged
+    else:
+        metadata["merged"] = 0
+
+    budget = settings.rag_context_max_tokens
+    context, tokens = [], 0
+    for doc in docs:
+        cost = _token_count(doc)
+        if context and budget is not None and tokens + cost > budget:
+            continue
+        context.append(doc)
+        tokens += cost
+    metadata["over_budget"] = len(docs) - len(context)
+    metadata["context_chunks"] = len(context)
+    metadata["context_tokens"] = tokens
+    return context, metadata
+
+
+def _build_messages(query: str, retrieved_docs: list[dict]) -> list[dict[str, str]]:
+    """
+    Build the LLM messages with retrieved documents as context.
+
+    The fixed RAG prompt comes first and the per-query context after it, so
+    every query shares the same prompt prefix.
+    """
     context_parts = []
     for i, doc in enumerate(retrieved_docs, 1):
         source = doc["metadata"].get("source", "Unknown")
+        section = doc["metadata"].get("section")
+        if section:
+            source = f"{source}, {section}"
         context_parts.append(f"[Document {i}: {source}]\n{doc['content']}")
 
     context = "\n\n".join(context_parts)
 
-    # 3: Create RAG prompt with context
-    system_prompt = format_rag_prompt(context)
-
-    messages = [
-        {"role": "system", "content": system_prompt},
+    return [
+        {"role": "system", "content": RAG_SYSTEM_PROMPT},
+        {"role": "system", "content": format_rag_context(context)},
         {"role": "user", "content": query},
     ]
 
-    # 4: response
-    answer = await generate_response(messages)
 
-    # 5: format sources for response
-    sources = [
+def _format_sources(retrieved_docs: list[dict]) -> list[dict]:
+    """Format retrieved documents as response sources."""
+    return [
         {
             "source": doc["metadata"].get("source", "Unknown"),
             "chunk_id": doc["metadata"].get("chunk_id", 0),
@@ -62,7 +312,266 @@ async def rag_query(
         for doc in retrieved_docs
     ]
 
+
+def faq_answer(query: str) -> dict | None:
+    """
+    The FAQ entry answering a query, or None (always None when disabled).
+
+    Blocking; async callers run it through `run_retrieval`.
+    """
+    if not settings.faq_enabled:
+        return None
+    return match_faq([embed_query(query)])[0]
+
+
+def _faq_source(entry: dict) -> dict:
+    """An FAQ entry shaped like a retrieved chunk."""
+    metadata = {"source": entry["source"]}
+    if entry["section"]:
+        metadata["section"] = entry["section"]
+    return {
+        "content": f"Q: {entry['question']}\nA: {entry['answer']}",
+        "metadata": metadata,
+    }
+
+
+def _faq_response(entry: dict) -> dict:
+    """`rag_query` result for a query answered from the FAQ index."""
+    # nothing was retrieved: every context selection count is zero
+    _, metadata = select_context([])
+    return {
+        "answer": entry["answer"],
+        "sources": _format_sources([_faq_source(entry)]),
+        "metadata": {**metadata, "faq_score": entry["score"]},
+    }
+
+
+async def _cache_key(
+    query: str,
+    retrieved_docs: list[dict],
+    embedding: list[float] | None = None,
+) -> dict | None:
+    """
+    Build the answer cache key for a query, or None if caching is disabled.
+
+    Chunks without a vector store ID fall back to 'source:chunk_id'.
+    The query is embedded unless its embedding is passed in.
+    """
+    if not settings.rag_cache_enabled:
+        return None
+
+    chunk_ids = [_chunk_key(doc) for doc in retrieved_docs]
+    if embedding is None:
+        embedding = await run_retrieval(embed_query, query)
+    return {
+        "embedding": embedding,
+        "chunk_ids": chunk_ids,
+        "model_name": settings.ollama_model,
+        "version": get_collection_version(),
+    }
+
+
+async def rag_query(
+    query: str,
+    top_k: int | None = None,
+) -> dict:
+    """
+    Anser a question using rag pipeline
+
+    Args:
+        query: users question
+        top_k: number of docuemnts to retrieve (optional)
+
+    Returns:
+        Dict with 'answer', 'sources' and 'metadata' (context selection
+        counts) keys
+    """
+    # 0: answer FAQ questions with their stored answer
+    if settings.faq_enabled:
+        entry = await run_retrieval(faq_answer, query)
+        if entry is not None:
+            return _faq_response(entry)
+
+    # 1: retrieve relevant documents (off the event loop)
+    retrieved_docs = await _retrieve(query, top_k)
+    with span("select_context"):
+        context_docs, metadata = select_context(retrieved_docs)
+
+    if not context_docs:
+        return {
+            "answer": NO_DOCUMENTS_ANSWER,
+            "sources": [],
+            "metadata": metadata,
+        }
+    # 2: reuse a cached answer for the same chunks and a similar query
+    with span("cache_lookup"):
+        cache_key = await _cache_key(query, retrieved_docs)
+        answer = answer_cache.get(**cache_key) if cache_key else None
+
+    if answer is None:
+        # 3: build prompt with context from retrieved docuements
+        with span("prompt_build"):
+            messages = _build_messages(query, context_docs)
+
+        # 4: response
+        answer = await generate_response(messages, priority=BATCH)
+
+        if cache_key:
+            answer_cache.put(answer=answer, **cache_key)
+
+    # 5: format sources for response
     return {
         "answer": answer,
-        "sources": sources,
+        "sources": _format_sources(context_docs),
+        "metadata": metadata,
     }
+
+
+async def rag_query_stream(
+    query: str,
+    top_k: int | None = None,
+) -> AsyncIterator[dict]:
+    """
+    Answer a question using the rag pipeline, streaming the answer.
+
+    Yields events as dicts:
+        {"type": "sources", "sources": [...]} before any token,
+        {"type": "token", "content": ...} per generated chunk,
+        {"type": "done"} once the answer is complete.
+    """
+    if settings.faq_enabled:
+        entry = await run_retrieval(faq_answer, query)
+        if entry is not None:
+            yield {"type": "sources", "sources": _format_sources([_faq_source(entry)])}
+            yield {"type": "token", "content": entry["answer"]}
+            yield {"type": "done"}
+            return
+
+    retrieved_docs = await _retrieve(query, top_k)
+    with span("select_context"):
+        context_docs, _ = select_context(retrieved_docs)
+
+    yield {"type": "sources", "sources": _format_sources(context_docs)}
+
+    if not context_docs:
+        yield {"type": "token", "content": NO_DOCUMENTS_ANSWER}
+        yield {"type": "done"}
+        return
+
+    with span("cache_lookup"):
+        cache_key = await _cache_key(query, retrieved_docs)
+        answer = answer_cache.get(**cache_key) if cache_key else None
+
+    if answer is not None:
+        yield {"type": "token", "content": answer}
+    else:
+        with span("prompt_build"):
+            messages = _build_messages(query, context_docs)
+        parts = []
+        async for token in stream_response(messages, priority=BATCH):
+            parts.append(token)
+            yield {"type": "token", "content": token}
+
+        if cache_key:
+            answer_cache.put(answer="".join(parts), **cache_key)
+
+    yield {"type": "done"}
+
+
+async def rag_query_batch(
+    queries: list[str],
+    top_k: int | None = None,
+) -> list[dict]:
+    """
+    Answer many questions using the rag pipeline.
+
+    All queries are embedded in one batch; those without an FAQ answer are
+    searched with one vector store query. Generations run concurrently, at most
+    `batch_max_concurrency` at a time. A failed generation does not fail
+    the batch: its item gets an 'error' instead of an answer.
+
+    Args:
+        queries: users questions
+        top_k: number of documents to retrieve per question (optional)
+
+    Returns:
+        One dict per query, in order, with 'answer', 'sources', 'metadata'
+        and 'error' keys
+    """
+    embeddings = await run_retrieval(embed_queries, queries)
+    if not settings.faq_enabled:
+        return await _rag_batch(queries, embeddings, top_k)
+
+    entries = await run_retrieval(match_faq, embeddings)
+    # only queries without an FAQ answer are retrieved and generated
+    pending = [i for i, entry in enumerate(entries) if entry is None]
+    generated = (
+        await _rag_batch(
+            [queries[i] for i in pending], [embeddings[i] for i in pending], top_k
+        )
+        if pending
+        else []
+    )
+    results = [
+        None if entry is None else {**_faq_response(entry), "error": None}
+        for entry in entries
+    ]
+    for i, result in zip(pending, generated, strict=True):
+        results[i] = result
+    return results
+
+
+async def _rag_batch(
+    queries: list[str], embeddings: list[list[float]], top_k: int | None
+) -> list[dict]:
+    """`rag_query_batch` for queries whose embeddings are already known."""
+    retrieved = await run_retrieval(
+        retrieve_batch, queries, embeddings, top_k=_candidates(top_k)
+    )
+    if settings.rerank_enabled:
+        with span("rerank"):
+            retrieved = await run_retrieval(rerank_batch, queries, retrieved, top_k)
+    selected = [select_context(docs) for docs in retrieved]
+    semaphore = asyncio.Semaphore(settings.batch_max_concurrency)
+
+    async def answer(
+        query: str, embedding: list[float], docs: list[dict], context: list[dict]
+    ) -> str:
+        if not context:
+            return NO_DOCUMENTS_ANSWER
+
+        cache_key = await _cache_key(query, docs, embedding)
+        cached = answer_cache.get(**cache_key) if cache_key else None
+        if cached is not None:
+            return cached
+
+        async with semaphore:
+            generated = await generate_response(
+                _build_messages(query, context), priority=BATCH
+            )
+        if cache_key:
+            answer_cache.put(answer=generated, **cache_key)
+        return generated
+
+    answers = await asyncio.gather(
+        *(
+            answer(query, embedding, docs, context)
+            for query, embedding, docs, (context, _) in zip(
+                queries, embeddings, retrieved, selected, strict=True
+            )
+        ),
+        return_exceptions=True,
+    )
+
+    results = []
+    for (context, metadata), result in zip(selected, answers, strict=True):
+        failed = isinstance(result, Exception)
+        results.append(
+            {
+                "answer": None if failed else result,
+                "sources": _format_sources(context),
+                "metadata": metadata,
+                "error": (str(result) or type(result).__name__) if failed else None,
+            }
+        )
+    return results
@@ -2,13 +2,169 @@
 Pytest configuration and shared fixtures
 """
 
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
 from fastapi.testclient import TestClient
 
+from genai_challenge.config import settings
 from genai_challenge.main import app
 
 
+@pytest.fixture(autouse=True)
+def disable_answer_cache(mocker):
+    """Keep the RAG answer cache out of tests unless a test enables it."""
+    mocker.patch.object(settings, "rag_cache_enabled", False)
+
+
+@pytest.fixture(autouse=True)
+def disable_faq_answers(mocker):
+    """Keep stored FAQ answers out of tests unless a test enables it."""
+    mocker.patch.object(settings, "faq_enabled", False)
+
+
 @pytest.fixture
 def client():
     """FastAPI test client for integration test."""
     return TestClient(app)
+
+
+class OllamaStub(ThreadingHTTPServer):
+    """
+    Minimal local HTTP server that answers like Ollama's /api/chat.
+
+    Records which client connections were used and how many requests
+    were being served at the same time.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, reply: str = "Stub reply", delay: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _OllamaStubHandler)
+        self.reply = reply
+        self.delay = delay
+        # answer every request with a 500, like an overloaded host
+        self.failing = False
+        self.requests: list[dict] = []
+        self.connections: set[tuple] = set()
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+
+class _OllamaStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        # health probes hit /api/tags
+        if self.server.failing:
+            self._send_json(500, {"error": "stub failure"})
+        else:
+            self._send_json(200, {"models": []})
+
+    def do_POST(self):
+        server: OllamaStub = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if server.failing:
+            self._send_json(500, {"error": "stub failure"})
+            return
+
+        with server._lock:
+            server.requests.append(payload)
+            server.connections.add(self.client_address)
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            if server.delay:
+                time.sleep(server.delay)
+            body = self._chat_body(payload, server.reply)
+        finally:
+            with server._lock:
+                server.active -= 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    @staticmethod
+    def _chat_body(payload: dict, reply: str) -> bytes:
+        model = payload.get("model", "stub")
+        tokens = reply.split(" ")
+        lines = [
+            {
+                "model": model,
+                "created_at": "2024-01-01T00:00:00Z",
+                "message": {
+                    "role": "assistant",
+                    "content": token if i == 0 else f" {token}",
+                },
+                "done": False,
+            }
+            for i, token in enumerate(tokens)
+        ]
+        lines.append(
+            {
+                "model": model,
+                "created_at": "2024-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+                "done_reason": "stop",
+                "prompt_eval_count": 10,
+                "eval_count": len(tokens),
+            }
+        )
+        if not payload.get("stream", True):
+            lines = [lines[-1] | {"message": {"role": "assistant", "content": reply}}]
+        return "".join(json.dumps(line) + "\n" for line in lines).encode()
+
+
+def _start_stub() -> OllamaStub:
+    server = OllamaStub()
+    threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    ).start()
+    return server
+
+
+def _stop_stub(server: OllamaStub) -> None:
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def ollama_stub():
+    """Local stub server standing in for Ollama."""
+    server = _start_stub()
+    yield server
+    _stop_stub(server)
+
+
+@pytest.fixture
+def ollama_stubs():
+    """Three local stub servers standing in for several Ollama hosts."""
+    servers = [_start_stub() for _ in range(3)]
+    yield servers
+    for server in servers:
+        _stop_stub(server)
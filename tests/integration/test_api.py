@@ -2,6 +2,10 @@
 Integration tests for API endpoints.
 """
 
+import json
+
+from genai_challenge.adapters.scheduler import LLMBusyError
+
 
 class TestHealthcheck:
     """Test for GET /api/v1/healthcheck"""
@@ -51,3 +55,222 @@ class TestChat:
     def test_chat_rejects_empty_message(self, client):
         response = client.post("/api/v1/chat", json={"message": ""})
         assert response.status_code == 422  # validation error
+
+    def test_chat_returns_503_when_llm_is_busy(self, client, mocker):
+        mocker.patch(
+            "genai_challenge.services.llm_service.generate_response",
+            side_effect=LLMBusyError("Timed out waiting for the LLM"),
+        )
+
+        response = client.post("/api/v1/chat", json={"message": "Hello"})
+
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+
+
+class TestChatBatch:
+    """Tests for POST /api/v1/chat/batch"""
+
+    def test_returns_results_in_order(self, client, mocker):
+        async def fake_generate(messages, model_name=None, **kwargs):
+            return f"Re: {messages[-1]['content']}"
+
+        mocker.patch(
+            "genai_challenge.services.llm_service.generate_response",
+            side_effect=fake_generate,
+        )
+
+        response = client.post(
+            "/api/v1/chat/batch",
+            json={
+                "messages": [
+                    {"message": "Hello", "session_id": "api-batch"},
+                    {"message": "Again", "session_id": "api-batch"},
+                    {"message": "New session"},
+                ]
+            },
+        )
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["response"] for r in results] == [
+            "Re: Hello",
+            "Re: Again",
+            "Re: New session",
+        ]
+        assert results[0]["session_id"] == "api-batch"
+
+    def test_rejects_empty_message(self, client):
+        response = client.post(
+            "/api/v1/chat/batch", json={"messages": [{"message": ""}]}
+        )
+
+        assert response.status_code == 422
+
+
+class TestChatStream:
+    """Tests for POST /api/v1/chat/stream"""
+
+    def test_streams_ndjson_events(self, client, mocker):
+        async def fake_stream(messages, model_name=None, **kwargs):
+            for token in ["Hi", " there"]:
+                yield token
+
+        mocker.patch(
+            "genai_challenge.services.llm_service.stream_response",
+            side_effect=fake_stream,
+        )
+
+        response = client.post("/api/v1/chat/stream", json={"message": "Hello"})
+        events = [json.loads(line) for line in response.text.splitlines()]
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert events[0]["type"] == "session"
+        assert "".join(e["content"] for e in events if e["type"] == "token") == (
+            "Hi there"
+        )
+        assert events[-1]["type"] == "done"
+
+    def test_reports_errors_in_band(self, client, mocker):
+        async def failing_stream(messages, model_name=None, **kwargs):
+            yield "partial"
+            raise RuntimeError("Ollama unavailable")
+
+        mocker.patch(
+            "genai_challenge.services.llm_service.stream_response",
+            side_effect=failing_stream,
+        )
+
+        response = client.post("/api/v1/chat/stream", json={"message": "Hello"})
+        events = [json.loads(line) for line in response.text.splitlines()]
+
+        assert events[-1] == {"type": "error", "detail": "Ollama unavailable"}
+
+
+class TestRAGQueryStream:
+    """Tests for POST /api/v1/rag-query/stream"""
+
+    def test_streams_sources_then_tokens(self, client, mocker):
+        async def fake_stream(messages, model_name=None, **kwargs):
+            yield "30 days."
+
+        mocker.patch(
+            "genai_challenge.services.rag_service.similarity_search",
+            return_value=[
+                {
+                    "content": "Returns within 30 days.",
+                    "metadata": {"source": "refund_policy.txt", "chunk_id": 0},
+                }
+            ],
+        )
+        mocker.patch(
+            "genai_challenge.services.rag_service.stream_response",
+            side_effect=fake_stream,
+        )
+
+        response = client.post(
+            "/api/v1/rag-query/stream", json={"query": "Refund window?"}
+        )
+        events = [json.loads(line) for line in response.text.splitlines()]
+
+        assert [e["type"] for e in events] == ["sources", "token", "done"]
+        assert events[0]["sources"][0]["source"] == "refund_policy.txt"
+
+
+class TestRAGQueryBatch:
+    """Tests for POST /api/v1/rag-query/batch"""
+
+    def test_returns_results_in_order(self, client, mocker):
+        async def fake_generate(messages, model_name=None, **kwargs):
+            return f"Answer to {messages[-1]['content']}"
+
+        mocker.patch(
+            "genai_challenge.services.rag_service.embed_queries",
+            side_effect=lambda queries: [[1.0] for _ in queries],
+        )
+        mocker.patch(
+            "genai_challenge.services.rag_service.similarity_search_by_vectors",
+            return_value=[
+                [
+                    {
+                        "id": "chunk-1",
+                        "content": "Returns within 30 days.",
+                        "metadata": {"source": "refund_policy.txt", "chunk_id": 0},
+                    }
+                ],
+                [],
+            ],
+        )
+        mocker.patch(
+            "genai_challenge.services.rag_service.generate_response",
+            side_effect=fake_generate,
+        )
+
+        response = client.post(
+            "/api/v1/rag-query/batch",
+            json={"queries": ["Refund window?", "Unknown topic"]},
+        )
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert results[0]["answer"] == "Answer to Refund window?"
+        assert results[0]["error"] is None
+        assert results[1]["sources"] == []
+
+    def test_rejects_empty_batch(self, client):
+        response = client.post("/api/v1/rag-query/batch", json={"queries": []})
+
+        assert response.status_code == 422
+
+
+class TestMetrics:
+    """Tests for GET /api/v1/metrics and the X-Timing header"""
+
+    def test_exposes_request_and_stage_metrics(self, client, mocker):
+        mocker.patch(
+            "genai_challenge.services.llm_service.generate_response",
+            return_value="Mocked response",
+        )
+        client.post("/api/v1/chat", json={"message": "Hello"})
+
+        response = client.get("/api/v1/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert (
+            'genai_http_requests_total{method="POST",path="/api/v1/chat",'
+            'status="200"}' in response.text
+        )
+        assert 'genai_stage_duration_seconds_count{stage="memory_read"}' in (
+            response.text
+        )
+        assert "genai_answer_cache_hits_total" in response.text
+
+    def test_timing_header(self, client, mocker):
+        mocker.patch("genai_challenge.main.settings.timing_header_enabled", True)
+        mocker.patch(
+            "genai_challenge.services.rag_service.similarity_search",
+            return_value=[
+                {
+                    "content": "Returns within 30 days.",
+                    "metadata": {"source": "refund_policy.txt", "chunk_id": 0},
+                }
+            ],
+        )
+        mocker.patch(
+            "genai_challenge.services.rag_service.generate_response",
+            return_value="30 days.",
+        )
+
+        response = client.post("/api/v1/rag-query", json={"query": "Refund window?"})
+        timing = response.headers["X-Timing"]
+        stages = [part.split(";")[0] for part in timing.split(", ")]
+
+        assert stages[:2] == ["retrieve", "select_context"]
+        assert "prompt_build" in stages and stages[-1] == "total"
+
+    def test_no_timing_header_by_default(self, client):
+        response = client.get("/api/v1/healthcheck")
+
+        assert "X-Timing" not in response.headers
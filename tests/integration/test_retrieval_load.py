@@ -0,0 +1,96 @@
+"""
+Load test: RAG traffic must not stall the event loop.
+
+Retrieval is simulated with a blocking sleep. While a burst of RAG queries
+runs, /healthcheck latency has to stay flat.
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from genai_challenge.adapters import chroma
+from genai_challenge.adapters.chroma import RetrievalExecutor
+from genai_challenge.main import app
+
+RETRIEVAL_SECONDS = 0.2
+
+
+def slow_similarity_search(query, top_k=None):
+    time.sleep(RETRIEVAL_SECONDS)  # blocking, like embedding + Chroma I/O
+    return [
+        {
+            "content": "Refunds within 30 days.",
+            "metadata": {"source": "refund_policy.txt", "chunk_id": 0},
+        }
+    ]
+
+
+class TestRetrievalLoad:
+    """Healthcheck latency under concurrent RAG load"""
+
+    @pytest.fixture(autouse=True)
+    def slow_retrieval(self, mocker):
+        mocker.patch(
+            "genai_challenge.services.rag_service.similarity_search",
+            side_effect=slow_similarity_search,
+        )
+        mocker.patch(
+            "genai_challenge.services.rag_service.generate_response",
+            return_value="Within 30 days.",
+        )
+        executor = RetrievalExecutor(workers=4, max_queue=2, queue_timeout=5.0)
+        mocker.patch.object(chroma, "retrieval_executor", executor)
+        yield
+        executor.shutdown()
+
+    @pytest.fixture
+    async def api(self):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            yield client
+
+    async def _healthcheck_latencies(self, api, n: int) -> list[float]:
+        latencies = []
+        for _ in range(n):
+            started = time.perf_counter()
+            response = await api.get("/api/v1/healthcheck")
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200
+            await asyncio.sleep(0.02)
+        return latencies
+
+    @pytest.mark.asyncio
+    async def test_healthcheck_latency_flat_under_rag_load(self, api):
+        rag_requests = [
+            api.post("/api/v1/rag-query", json={"query": f"Refund {i}?"})
+            for i in range(6)
+        ]
+
+        *rag_responses, latencies = await asyncio.gather(
+            *rag_requests, self._healthcheck_latencies(api, 10)
+        )
+
+        assert all(r.status_code == 200 for r in rag_responses)
+        # a blocked loop would push healthchecks to >= RETRIEVAL_SECONDS
+        assert max(latencies) < RETRIEVAL_SECONDS / 2
+
+    @pytest.mark.asyncio
+    async def test_saturated_retrieval_returns_429(self, api):
+        responses = await asyncio.gather(
+            *(
+                api.post("/api/v1/rag-query", json={"query": f"Q{i}?"})
+                for i in range(10)
+            )
+        )
+
+        codes = sorted(r.status_code for r in responses)
+        # 4 running + 2 queued are served, the rest are rejected
+        assert codes.count(200) == 6
+        assert codes.count(429) == 4
+        rejected = next(r for r in responses if r.status_code == 429)
+        assert rejected.headers["Retry-After"] == "1"
@@ -0,0 +1,75 @@
+"""
+Unit tests for the semantic RAG answer cache
+"""
+
+import pytest
+
+from genai_challenge.services.answer_cache import SemanticAnswerCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestSemanticAnswerCache:
+    """Tests for SemanticAnswerCache"""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    @pytest.fixture
+    def cache(self, clock):
+        return SemanticAnswerCache(
+            max_entries=2, ttl_seconds=60, similarity_threshold=0.9, clock=clock
+        )
+
+    def test_miss_on_empty_cache(self, cache):
+        assert cache.get([1.0, 0.0], ["a"], "llama") is None
+        assert cache.stats()["misses"] == 1
+
+    def test_hit_on_similar_embedding(self, cache):
+        cache.put([1.0, 0.0], ["a", "b"], "llama", "30 days")
+
+        # slightly different query, same chunks in another order
+        assert cache.get([0.99, 0.05], ["b", "a"], "llama") == "30 days"
+        assert cache.stats()["hits"] == 1
+
+    def test_miss_below_similarity_threshold(self, cache):
+        cache.put([1.0, 0.0], ["a"], "llama", "30 days")
+
+        assert cache.get([0.0, 1.0], ["a"], "llama") is None
+
+    def test_miss_on_different_chunks_or_model(self, cache):
+        cache.put([1.0, 0.0], ["a"], "llama", "30 days")
+
+        assert cache.get([1.0, 0.0], ["b"], "llama") is None
+        assert cache.get([1.0, 0.0], ["a"], "mistral") is None
+
+    def test_entries_expire_after_ttl(self, cache, clock):
+        cache.put([1.0, 0.0], ["a"], "llama", "30 days")
+        clock.now = 61
+
+        assert cache.get([1.0, 0.0], ["a"], "llama") is None
+        assert cache.stats()["size"] == 0
+
+    def test_evicts_least_recently_used(self, cache):
+        cache.put([1.0, 0.0], ["a"], "llama", "answer a")
+        cache.put([1.0, 0.0], ["b"], "llama", "answer b")
+        cache.get([1.0, 0.0], ["a"], "llama")  # touch a
+
+        cache.put([1.0, 0.0], ["c"], "llama", "answer c")
+
+        assert cache.get([1.0, 0.0], ["a"], "llama") == "answer a"
+        assert cache.get([1.0, 0.0], ["b"], "llama") is None
+        assert cache.stats()["evictions"] == 1
+
+    def test_version_change_invalidates(self, cache):
+        cache.put([1.0, 0.0], ["a"], "llama", "old", version="v1")
+
+        assert cache.get([1.0, 0.0], ["a"], "llama", version="v2") is None
+        assert cache.stats()["invalidations"] == 1
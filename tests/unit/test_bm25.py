@@ -0,0 +1,103 @@
+"""
+Unit tests for the BM25 keyword index
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from genai_challenge.adapters import bm25
+from genai_challenge.adapters.bm25 import BM25Index, tokenize, write_bm25_index
+from genai_challenge.config import settings
+
+
+@pytest.fixture
+def chunks():
+    return {
+        "ids": ["security:0", "release:0", "handbook:0"],
+        "documents": [
+            "Our data centers are SOC 2 Type II certified.",
+            "Version 4.5.0 adds dark mode. Version 4.4.0 added backups.",
+            "Employees receive 20 days of paid annual leave.",
+        ],
+        "metadatas": [
+            {"source": "security_policy.txt"},
+            {"source": "release_notes.txt"},
+            None,
+        ],
+    }
+
+
+@pytest.fixture
+def collection(chunks):
+    collection = MagicMock()
+    collection.count.return_value = 3
+    collection.get.return_value = chunks
+    return collection
+
+
+class TestTokenize:
+    """Tests for tokenize()"""
+
+    def test_keeps_numbers_and_versions(self):
+        assert tokenize("SOC 2, release 4.5.0!") == ["soc", "2", "release", "4.5.0"]
+
+
+class TestBM25Index:
+    """Tests for BM25Index"""
+
+    def test_ranks_exact_terms_first(self, chunks):
+        index = BM25Index.build(**chunks)
+
+        results = index.search("What is new in 4.5.0?", k=3)
+
+        assert results[0]["id"] == "release:0"
+        assert results[0]["metadata"] == {"source": "release_notes.txt"}
+        assert len(results) == 1
+
+    def test_rare_terms_weigh_more(self, chunks):
+        index = BM25Index.build(**chunks)
+
+        results = index.search("SOC 2 annual leave days", k=2)
+
+        assert [doc["id"] for doc in results] == ["handbook:0", "security:0"]
+        assert results[0]["bm25_score"] > results[1]["bm25_score"]
+
+    def test_save_and_load(self, chunks, tmp_path):
+        index = BM25Index.build(**chunks)
+        index.save(tmp_path / "bm25.json")
+
+        loaded = BM25Index.load(tmp_path / "bm25.json")
+
+        assert loaded.search("SOC 2", k=1) == index.search("SOC 2", k=1)
+
+    def test_load_missing_index(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            BM25Index.load(tmp_path / "missing.json")
+
+    def test_empty_index(self):
+        assert BM25Index.build([], [], []).search("anything", k=3) == []
+
+
+class TestKeywordSearch:
+    """Tests for the shared index used by keyword_search()"""
+
+    @pytest.fixture(autouse=True)
+    def persist_dir(self, mocker, tmp_path):
+        mocker.patch.object(settings, "chroma_persist_directory", str(tmp_path))
+        mocker.patch.object(bm25, "_index", None)
+
+    def test_built_from_collection(self, collection):
+        count = write_bm25_index(collection, bm25.bm25_index_path())
+
+        assert count == 3
+        assert bm25.keyword_search("dark mode", top_k=1)[0]["id"] == "release:0"
+
+    def test_reloads_on_new_version(self, mocker, collection):
+        version = mocker.patch.object(bm25, "get_collection_version", return_value="v1")
+        write_bm25_index(collection, bm25.bm25_index_path())
+        first = bm25.get_bm25_index()
+        assert bm25.get_bm25_index() is first
+
+        version.return_value = "v2"
+        assert bm25.get_bm25_index() is not first
@@ -0,0 +1,270 @@
+"""
+Unit tests for ChromaDB adapter
+
+Tests the lifecycle of the shared embedding model and vector store
+with mocked LangChain classes.
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from genai_challenge.adapters import chroma
+from genai_challenge.adapters.chroma import RetrievalBusyError, RetrievalExecutor
+from genai_challenge.adapters.embedding_cache import EmbeddingCache
+from genai_challenge.adapters.retrievers import QuantizedRetriever, write_numpy_index
+
+
+class TestVectorStoreLifecycle:
+    """Tests for shared embeddings / vector store instances."""
+
+    @pytest.fixture(autouse=True)
+    def reset_adapter(self):
+        """Start and finish each test without shared instances."""
+        chroma.shutdown()
+        yield
+        chroma.shutdown()
+
+    @pytest.fixture
+    def mock_embeddings_cls(self, mocker):
+        mocker.patch.object(chroma, "embedding_cache", EmbeddingCache())
+        mock = mocker.patch("genai_challenge.adapters.chroma.HuggingFaceEmbeddings")
+        mock.return_value.embed_query.return_value = [0.5, 0.25]
+        return mock
+
+    @pytest.fixture
+    def mock_chroma_cls(self, mocker, tmp_path):
+        mocker.patch.object(
+            chroma.settings, "chroma_persist_directory", str(tmp_path / "chroma")
+        )
+        mock = mocker.patch("genai_challenge.adapters.chroma.Chroma")
+        mock.return_value._collection.query.return_value = {
+            "ids": [[]],
+            "documents": [[]],
+            "metadatas": [[]],
+            "distances": [[]],
+        }
+        return mock
+
+    def test_model_loads_once_across_queries(
+        self, mock_embeddings_cls, mock_chroma_cls
+    ):
+        for _ in range(5):
+            chroma.similarity_search("How many vacation days?")
+
+        mock_embeddings_cls.assert_called_once()
+        mock_chroma_cls.assert_called_once()
+
+    def test_model_loads_once_under_concurrency(
+        self, mock_embeddings_cls, mock_chroma_cls
+    ):
+        threads = [
+            threading.Thread(target=chroma.similarity_search, args=("query",))
+            for _ in range(16)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        mock_embeddings_cls.assert_called_once()
+        mock_chroma_cls.assert_called_once()
+
+    def test_repeated_query_is_embedded_once(
+        self, mock_embeddings_cls, mock_chroma_cls
+    ):
+        # an uncased model: the cache ignores case too
+        mock_embeddings_cls.return_value._client.tokenizer.do_lower_case = True
+        chroma.similarity_search("How many vacation days?")
+        chroma.similarity_search("  how many  VACATION days? ")
+
+        mock_embeddings_cls.return_value.embed_query.assert_called_once()
+        collection = mock_chroma_cls.return_value._collection
+        assert collection.query.call_count == 2
+        assert chroma.embedding_cache.stats()["hits"] == 1
+
+    def test_cased_model_keeps_query_case(self, mock_embeddings_cls):
+        mock_embeddings_cls.return_value._client.tokenizer.do_lower_case = False
+
+        chroma.embed_query("Apple")
+        chroma.embed_query("apple")
+
+        assert mock_embeddings_cls.return_value.embed_query.call_count == 2
+
+    def test_embed_queries_batches_cache_misses(
+        self, mock_embeddings_cls, mock_chroma_cls
+    ):
+        embeddings = mock_embeddings_cls.return_value
+        embeddings.embed_documents.side_effect = lambda texts: [
+            [float(len(text))] for text in texts
+        ]
+        chroma.embed_query("cached")
+
+        result = chroma.embed_queries(["cached", "new", "newer", "new"])
+
+        embeddings.embed_documents.assert_called_once_with(["new", "newer"])
+        assert result == [[0.5, 0.25], [3.0], [5.0], [3.0]]
+
+    def test_multi_query_search_uses_one_collection_query(
+        self, mock_embeddings_cls, mock_chroma_cls
+    ):
+        collection = mock_chroma_cls.return_value._collection
+        collection.query.return_value = {
+            "ids": [["a"], ["a"]],
+            "documents": [["doc a"], ["doc a"]],
+            "metadatas": [[{"source": "a.txt"}], [{"source": "a.txt"}]],
+            "distances": [[0.2], [0.4]],
+        }
+
+        results = chroma.similarity_search_by_vectors([[0.1], [0.2]], top_k=1)
+
+        collection.query.assert_called_once()
+        assert [batch[0]["score"] for batch in results] == [0.9, 0.8]
+
+    def test_numpy_backend_reloads_on_new_version(
+        self, mocker, mock_embeddings_cls, mock_chroma_cls
+    ):
+        mocker.patch.object(chroma.settings, "retrieval_backend", "numpy")
+        mocker.patch.object(chroma.settings, "embedding_model", "minilm")
+        collection = MagicMock()
+        collection.count.return_value = 4
+        collection.get.return_value = {
+            "ids": [f"chunk-{i}" for i in range(4)],
+            "embeddings": np.eye(4),
+            "documents": [f"text {i}" for i in range(4)],
+            "metadatas": [None] * 4,
+        }
+        write_numpy_index(collection, chroma.numpy_index_path(), "minilm")
+        chroma.bump_collection_version()
+
+        first = chroma.get_retriever()
+        assert chroma.get_retriever() is first
+        results = chroma.similarity_search_by_vectors([[0.0, 1.0, 0.0, 0.0]], 1)
+        assert results[0][0]["id"] == "chunk-1"
+
+        chroma.bump_collection_version()
+        assert chroma.get_retriever() is not first
+
+    def test_token_counter_uses_embedding_tokenizer(self, mock_embeddings_cls):
+        tokenizer = mock_embeddings_cls.return_value._client.tokenizer
+        tokenizer.encode.return_value = [101, 102, 103]
+
+        count_tokens = chroma.get_token_counter()
+
+        assert count_tokens("three tokens here") == 3
+        tokenizer.encode.assert_called_once_with(
+            "three tokens here", add_special_tokens=False
+        )
+
+    def test_quantized_numpy_backend(
+        self, mocker, mock_embeddings_cls, mock_chroma_cls
+    ):
+        mocker.patch.object(chroma.settings, "retrieval_backend", "numpy")
+        mocker.patch.object(chroma.settings, "retrieval_quantization", "binary")
+        mocker.patch.object(chroma.settings, "embedding_model", "minilm")
+        collection = MagicMock()
+        collection.count.return_value = 4
+        collection.get.return_value = {
+            "ids": [f"chunk-{i}" for i in range(4)],
+            "embeddings": np.eye(4) - 0.5,
+            "documents": [f"text {i}" for i in range(4)],
+            "metadatas": [None] * 4,
+        }
+        write_numpy_index(collection, chroma.numpy_index_path(), "minilm")
+
+        retriever = chroma.create_retriever()
+
+        assert isinstance(retriever, QuantizedRetriever)
+        assert retriever.quantization == "binary"
+
+    def test_unknown_backend(self, mocker):
+        mocker.patch.object(chroma.settings, "retrieval_backend", "faiss")
+
+        with pytest.raises(ValueError):
+            chroma.create_retriever()
+
+    def test_warm_up_embeds_a_query(self, mock_embeddings_cls, mock_chroma_cls):
+        chroma.warm_up()
+
+        mock_embeddings_cls.return_value.embed_query.assert_called_once()
+        mock_chroma_cls.assert_called_once()
+
+    def test_shutdown_closes_client_and_allows_reload(
+        self, mock_embeddings_cls, mock_chroma_cls
+    ):
+        client = MagicMock()
+        mock_chroma_cls.return_value._client = client
+        chroma.get_vector_store()
+
+        chroma.shutdown()
+        client.close.assert_called_once()
+
+        chroma.get_vector_store()
+        assert mock_embeddings_cls.call_count == 2
+
+
+class TestRetrievalExecutor:
+    """Tests for running blocking retrieval off the event loop."""
+
+    @pytest.fixture
+    def executor(self):
+        executor = RetrievalExecutor(workers=1, max_queue=1, queue_timeout=0.5)
+        yield executor
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_runs_in_worker_thread(self, executor):
+        thread_name = await executor.run(lambda: threading.current_thread().name)
+
+        assert thread_name.startswith("retrieval")
+
+    @pytest.mark.asyncio
+    async def test_event_loop_stays_responsive(self, executor):
+        task = asyncio.create_task(executor.run(time.sleep, 0.2))
+
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        assert time.perf_counter() - started < 0.1
+        await task
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_is_full(self, executor):
+        running = asyncio.create_task(executor.run(time.sleep, 0.2))
+        await asyncio.sleep(0.01)
+        queued = asyncio.create_task(executor.run(time.sleep, 0))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(RetrievalBusyError):
+            await executor.run(time.sleep, 0)
+
+        await asyncio.gather(running, queued)
+        assert executor.rejected == 1
+
+    @pytest.mark.asyncio
+    async def test_rejects_after_queue_timeout(self):
+        executor = RetrievalExecutor(workers=1, max_queue=5, queue_timeout=0.05)
+        running = asyncio.create_task(executor.run(time.sleep, 0.3))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(RetrievalBusyError):
+            await executor.run(time.sleep, 0)
+
+        await running
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_zero_queue_timeout_rejects_immediately(self):
+        executor = RetrievalExecutor(workers=1, max_queue=5, queue_timeout=0)
+        assert await executor.run(sum, [1, 2]) == 3
+        running = asyncio.create_task(executor.run(time.sleep, 0.1))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(RetrievalBusyError):
+            await executor.run(time.sleep, 0)
+
+        await running
+        executor.shutdown()
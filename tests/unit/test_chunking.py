@@ -0,0 +1,103 @@
+"""
+Unit tests for document chunking
+
+Uses a whitespace token counter in place of the embedding tokenizer.
+"""
+
+from genai_challenge.core.chunking import (
+    chunk_document,
+    heading_title,
+    overlap_length,
+    split_sections,
+)
+
+DOCUMENT = """ACME Corporation Refund Policy
+
+Effective Date: January 1, 2024
+
+1. General Refund Terms
+
+Products can be returned within 30 days of purchase.
+
+2. How to Request a Refund
+
+- Contact support@acme.com
+- Include your order number
+"""
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+class TestSections:
+    """Tests for heading detection and section splitting"""
+
+    def test_recognizes_headings(self):
+        assert heading_title("Chapter 2: Leave Policy") == "Chapter 2: Leave Policy"
+        assert heading_title("## Billing Questions") == "Billing Questions"
+        assert heading_title("Welcome to ACME Corporation!") is None
+        assert heading_title("Annual Leave:") is None
+        assert heading_title("- Include your order number") is None
+        assert heading_title("Sick Leave:\n- 10 days per year") is None
+
+    def test_splits_at_headings(self):
+        sections = split_sections(DOCUMENT)
+
+        assert [title for title, _, _ in sections] == [
+            "ACME Corporation Refund Policy > Effective Date: January 1, 2024 "
+            "> 1. General Refund Terms",
+            "2. How to Request a Refund",
+        ]
+        assert sections[1][2] == (
+            "- Contact support@acme.com\n- Include your order number"
+        )
+
+    def test_text_before_first_heading_has_no_title(self):
+        sections = split_sections("Just a sentence.\n\nOverview\n\nMore text.")
+
+        assert sections == [
+            (None, "", "Just a sentence."),
+            ("Overview", "Overview", "More text."),
+        ]
+
+
+class TestChunkDocument:
+    """Tests for token-sized, section-aligned chunks"""
+
+    def test_chunks_never_span_sections(self):
+        chunks = chunk_document(DOCUMENT, count_words, 200, 0)
+
+        assert [chunk["section"] for chunk in chunks] == [
+            "ACME Corporation Refund Policy > Effective Date: January 1, 2024 "
+            "> 1. General Refund Terms",
+            "2. How to Request a Refund",
+        ]
+        assert chunks[1]["content"].startswith("2. How to Request a Refund\n\n")
+
+    def test_stores_token_counts_within_chunk_size(self):
+        text = "Overview\n\n" + " ".join(f"word{i}" for i in range(100))
+
+        chunks = chunk_document(text, count_words, 30, 5)
+
+        assert len(chunks) > 1
+        assert all(chunk["token_count"] <= 30 for chunk in chunks)
+        assert all(
+            chunk["token_count"] == count_words(chunk["content"]) for chunk in chunks
+        )
+        # the heading starts the first chunk instead of standing alone
+        assert chunks[0]["content"].startswith("Overview\n\nword0")
+
+    def test_records_overlap_with_previous_chunk(self):
+        text = " ".join(f"word{i}" for i in range(100))
+
+        chunks = chunk_document(text, count_words, 30, 5)
+
+        assert chunks[0]["overlap_tokens"] == 0
+        assert all(chunk["overlap_tokens"] == 5 for chunk in chunks[1:])
+
+    def test_overlap_length(self):
+        first, second = "Refund policy: returns are ok", "returns are ok. Then"
+        assert overlap_length(first, second) == 14
+        assert overlap_length("no shared text here", "something else entirely") == 0
+        assert overlap_length("ends with abc", "abc starts") == 0
@@ -0,0 +1,74 @@
+"""
+Unit tests for the query embedding cache
+"""
+
+import numpy as np
+import pytest
+
+from genai_challenge.adapters.embedding_cache import EmbeddingCache, normalize_query
+
+
+class TestNormalizeQuery:
+    """Tests for normalize_query()"""
+
+    def test_collapses_whitespace(self):
+        assert normalize_query("  Refund   Window?\n") == "Refund Window?"
+
+    def test_lowercases_for_uncased_models(self):
+        text = "  Refund   Window?\n"
+        assert normalize_query(text, lowercase=True) == "refund window?"
+
+
+class TestEmbeddingCache:
+    """Tests for EmbeddingCache"""
+
+    @pytest.fixture
+    def cache(self):
+        return EmbeddingCache(max_entries=2, max_bytes=1024)
+
+    def test_miss_then_hit(self, cache):
+        assert cache.get("refund window", "minilm") is None
+
+        cache.put("refund window", "minilm", [0.5, 0.25])
+        vector = cache.get("refund  window", "minilm")
+
+        assert vector.dtype == np.float32
+        assert vector.tolist() == [0.5, 0.25]
+        assert cache.stats()["hit_rate"] == 0.5
+
+    def test_case_is_ignored_only_when_asked(self, cache):
+        cache.put("refund window", "minilm", [0.5, 0.25], lowercase=True)
+
+        assert cache.get("Refund window", "minilm", lowercase=True) is not None
+        assert cache.get("Refund window", "minilm") is None
+
+    def test_key_includes_model_name(self, cache):
+        cache.put("refund window", "minilm", [0.5, 0.25])
+
+        assert cache.get("refund window", "mpnet") is None
+
+    def test_cached_vectors_are_read_only(self, cache):
+        vector = cache.put("refund window", "minilm", [0.5, 0.25])
+
+        with pytest.raises(ValueError):
+            vector[0] = 1.0
+
+    def test_evicts_least_recently_used_entry(self, cache):
+        cache.put("a", "minilm", [1.0])
+        cache.put("b", "minilm", [2.0])
+        cache.get("a", "minilm")
+
+        cache.put("c", "minilm", [3.0])
+
+        assert cache.get("b", "minilm") is None
+        assert cache.get("a", "minilm") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_bounded_by_bytes(self):
+        cache = EmbeddingCache(max_entries=100, max_bytes=384 * 4 * 2)
+        for i in range(5):
+            cache.put(f"query {i}", "minilm", [0.0] * 384)
+
+        stats = cache.stats()
+        assert stats["entries"] == 2
+        assert stats["bytes"] == 384 * 4 * 2
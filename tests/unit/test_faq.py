@@ -0,0 +1,153 @@
+"""
+Unit tests for the FAQ answer index
+"""
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from genai_challenge.adapters import faq
+from genai_challenge.adapters.faq import (
+    FAQIndex,
+    extract_qa_pairs,
+    match_faq,
+    update_faq_index,
+)
+from genai_challenge.config import settings
+
+FAQ_TEXT = """ACME FAQ
+
+Billing
+
+Q: Is there a free trial?
+A: Yes, all plans include a 14-day free trial.
+
+Q: Do you offer discounts
+for nonprofits?
+A: Yes, qualified nonprofits receive a 30% discount.
+Contact sales@acme.com.
+
+Q: A question nobody answered?
+
+Technical Questions
+
+Q: Is there a mobile app?
+A: Yes, for iOS and Android.
+"""
+
+
+class RecordingEmbeddings:
+    """Deterministic fake embeddings that record the embedded texts."""
+
+    def __init__(self):
+        self.fake = DeterministicFakeEmbedding(size=8)
+        self.calls = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(texts)
+        return self.fake.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.fake.embed_query(text)
+
+
+def document(source: str, content: str) -> dict:
+    return {"source": source, "content": content, "hash": str(hash(content))}
+
+
+class TestExtractQAPairs:
+    """Tests for extract_qa_pairs()"""
+
+    def test_extracts_pairs_with_sections(self):
+        pairs = extract_qa_pairs(FAQ_TEXT, "faq.txt")
+
+        assert [pair["question"] for pair in pairs] == [
+            "Is there a free trial?",
+            "Do you offer discounts for nonprofits?",
+            "Is there a mobile app?",
+        ]
+        assert pairs[1]["answer"] == (
+            "Yes, qualified nonprofits receive a 30% discount. Contact sales@acme.com."
+        )
+        assert pairs[0]["section"] == "ACME FAQ > Billing"
+        assert pairs[2]["section"] == "Technical Questions"
+        assert pairs[2]["source"] == "faq.txt"
+
+    def test_documents_without_pairs(self):
+        assert extract_qa_pairs("Refunds within 30 days.", "refund.txt") == []
+
+
+class TestFAQIndex:
+    """Tests for FAQIndex and update_faq_index()"""
+
+    @pytest.fixture
+    def embeddings(self):
+        return RecordingEmbeddings()
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        return tmp_path / "faq_index.json"
+
+    def test_match_respects_threshold(self):
+        index = FAQIndex(
+            [{"question": "a", "answer": "A"}, {"question": "b", "answer": "B"}],
+            np.eye(2, dtype=np.float32),
+            "model",
+            {},
+        )
+
+        first, second = index.match([[0.1, 2.0], [1.0, 1.0]], threshold=0.9)
+
+        assert first["answer"] == "B"
+        assert first["score"] == pytest.approx(0.9988, abs=1e-4)
+        assert second is None
+
+    def test_stored_question_matches_itself(self, embeddings, path):
+        update_faq_index(path, [document("faq.txt", FAQ_TEXT)], embeddings, "fake")
+        index = FAQIndex.load(path)
+
+        query = embeddings.embed_query("Is there a mobile app?")
+        (entry,) = index.match([query], threshold=0.99)
+
+        assert entry["answer"] == "Yes, for iOS and Android."
+        assert len(index) == 3
+
+    def test_only_changed_files_are_embedded(self, embeddings, path):
+        docs = [document("faq.txt", FAQ_TEXT), document("other.txt", "Q: x?\nA: y")]
+        update_faq_index(path, docs, embeddings, "fake")
+
+        docs[1] = document("other.txt", "Q: Changed?\nA: Yes")
+        questions, updated = update_faq_index(path, docs, embeddings, "fake")
+
+        assert (questions, updated) == (4, 1)
+        assert embeddings.calls[-1] == ["Changed?"]
+        index = FAQIndex.load(path)
+        assert [entry["question"] for entry in index.entries][-1] == "Changed?"
+        assert index.embeddings.shape == (4, 8)
+
+    def test_unchanged_documents_leave_index_alone(self, embeddings, path):
+        docs = [document("faq.txt", FAQ_TEXT)]
+        update_faq_index(path, docs, embeddings, "fake")
+
+        assert update_faq_index(path, docs, embeddings, "fake") == (3, 0)
+        assert len(embeddings.calls) == 1
+
+    def test_removed_files_are_dropped(self, embeddings, path):
+        docs = [document("faq.txt", FAQ_TEXT), document("other.txt", "Q: x?\nA: y")]
+        update_faq_index(path, docs, embeddings, "fake")
+
+        assert update_faq_index(path, docs[1:], embeddings, "fake") == (1, 1)
+        assert set(FAQIndex.load(path).sources) == {"other.txt"}
+
+    def test_other_embedding_model_rebuilds(self, embeddings, path):
+        docs = [document("faq.txt", FAQ_TEXT)]
+        update_faq_index(path, docs, embeddings, "fake")
+
+        assert update_faq_index(path, docs, embeddings, "other") == (3, 1)
+        assert FAQIndex.load(path).embedding_model == "other"
+
+    def test_match_faq_without_index(self, mocker, tmp_path):
+        mocker.patch.object(settings, "chroma_persist_directory", str(tmp_path))
+        mocker.patch.object(faq, "_index", None)
+
+        assert match_faq([[1.0, 0.0]]) == [None]
@@ -0,0 +1,262 @@
+"""
+Unit tests for the document ingestion script
+
+Runs incremental ingestion against a temporary Chroma collection with
+deterministic fake embeddings.
+"""
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+from langchain_chroma import Chroma
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from genai_challenge.adapters.bm25 import BM25Index, bm25_index_path
+from genai_challenge.adapters.chroma import get_collection_version, numpy_index_path
+from genai_challenge.adapters.faq import FAQIndex, faq_index_path
+from genai_challenge.adapters.retrievers import (
+    INT8_FILE,
+    INT8_SCALES_FILE,
+    NumpyRetriever,
+    QuantizedRetriever,
+)
+from genai_challenge.config import settings
+
+SCRIPT = Path(__file__).parents[2] / "scripts" / "ingest_documents.py"
+
+
+@pytest.fixture
+def ingest(mocker, tmp_path):
+    """Load the ingestion script with a temporary vector store."""
+    spec = importlib.util.spec_from_file_location("ingest_documents", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    mocker.patch.object(settings, "chroma_persist_directory", str(tmp_path / "db"))
+    vector_store = Chroma(
+        collection_name=f"test_{tmp_path.name}",
+        embedding_function=DeterministicFakeEmbedding(size=8),
+    )
+    mocker.patch.object(module, "get_vector_store", return_value=vector_store)
+    # whitespace tokens instead of the embedding model's tokenizer
+    mocker.patch.object(
+        module, "get_token_counter", return_value=lambda text: len(text.split())
+    )
+    module.vector_store = vector_store
+    yield module
+    vector_store.delete_collection()
+
+
+@pytest.fixture
+def docs(tmp_path):
+    path = tmp_path / "docs"
+    path.mkdir()
+    (path / "refund_policy.txt").write_text("Refunds within 30 days.")
+    (path / "faq.txt").write_text("Q: How do I reset my password?")
+    return path
+
+
+def stored_sources(vector_store) -> list[str]:
+    return sorted(m["source"] for m in vector_store.get()["metadatas"])
+
+
+class TestIncrementalIngestion:
+    """Tests for manifest-based incremental ingestion"""
+
+    def test_first_run_embeds_everything(self, ingest, docs):
+        ingest.main(str(docs))
+
+        assert stored_sources(ingest.vector_store) == ["faq.txt", "refund_policy.txt"]
+        manifest = ingest.load_manifest()
+        assert set(manifest["files"]) == {"faq.txt", "refund_policy.txt"}
+
+    def test_rerun_does_not_duplicate_or_reembed(self, ingest, docs, mocker):
+        ingest.main(str(docs))
+        spy = mocker.spy(ingest, "ingest_to_chroma")
+
+        ingest.main(str(docs))
+
+        assert spy.spy_return == 0
+        assert stored_sources(ingest.vector_store) == ["faq.txt", "refund_policy.txt"]
+
+    def test_modified_file_replaces_its_chunks(self, ingest, docs):
+        ingest.main(str(docs))
+        (docs / "refund_policy.txt").write_text("Refunds within 60 days.")
+
+        ingest.main(str(docs))
+
+        contents = ingest.vector_store.get(where={"source": "refund_policy.txt"})
+        assert contents["documents"] == ["Refunds within 60 days."]
+
+    def test_deleted_file_chunks_are_removed(self, ingest, docs):
+        ingest.main(str(docs))
+        (docs / "faq.txt").unlink()
+
+        ingest.main(str(docs))
+
+        assert stored_sources(ingest.vector_store) == ["refund_policy.txt"]
+        assert "faq.txt" not in ingest.load_manifest()["files"]
+
+    def test_chunking_change_reembeds_all(self, ingest, docs, mocker):
+        ingest.main(str(docs))
+        mocker.patch.object(settings, "chunk_size", 10)
+        mocker.patch.object(settings, "chunk_overlap", 0)
+
+        summary = ingest.main(str(docs))
+
+        assert summary["new"] == 2
+        assert summary["unchanged"] == 0
+        assert summary["removed"] == 2
+
+    def test_empty_files_are_recorded(self, ingest, docs):
+        ingest.main(str(docs))
+        (docs / "empty.txt").write_text("  \n")
+        (docs / "refund_policy.txt").write_text("")
+        ingest.main(str(docs))
+
+        summary = ingest.main(str(docs))
+
+        assert summary["unchanged"] == 3
+        assert summary["new"] == summary["modified"] == 0
+        assert stored_sources(ingest.vector_store) == ["faq.txt"]
+
+    def test_chunk_ids_are_deterministic(self, ingest, docs):
+        documents = list(ingest.load_documents(docs))
+
+        first = [c["id"] for c in ingest.split_documents(documents)]
+        second = [c["id"] for c in ingest.split_documents(documents)]
+
+        assert first == second
+        assert len(set(first)) == len(first)
+
+    def test_chunks_store_section_and_token_count(self, ingest, tmp_path):
+        path = tmp_path / "sections"
+        path.mkdir()
+        (path / "handbook.txt").write_text(
+            "Chapter 1: Working Hours\n\nWe work from 9 to 5.\n\n"
+            "Chapter 2: Leave\n\nEmployees get 20 days of leave."
+        )
+
+        chunks = list(ingest.split_documents(ingest.load_documents(path)))
+
+        assert [chunk["metadata"]["section"] for chunk in chunks] == [
+            "Chapter 1: Working Hours",
+            "Chapter 2: Leave",
+        ]
+        assert [chunk["metadata"]["token_count"] for chunk in chunks] == [10, 9]
+
+    def test_changes_bump_collection_version(self, ingest, docs):
+        ingest.main(str(docs))
+        version = get_collection_version()
+
+        ingest.main(str(docs))
+        assert get_collection_version() == version
+
+        (docs / "faq.txt").write_text("Q: Changed?")
+        ingest.main(str(docs))
+        assert get_collection_version() != version
+
+    def test_builds_bm25_index(self, ingest, docs):
+        ingest.main(str(docs))
+
+        index = BM25Index.load(bm25_index_path())
+        assert index.search("password reset", k=1)[0]["metadata"]["source"] == (
+            "faq.txt"
+        )
+
+    def test_builds_faq_index(self, ingest, docs):
+        (docs / "faq.txt").write_text("Q: How do I reset a password?\nA: Use Settings.")
+        ingest.main(str(docs))
+        version = get_collection_version()
+
+        index = FAQIndex.load(faq_index_path())
+        assert [entry["answer"] for entry in index.entries] == ["Use Settings."]
+
+        (docs / "faq.txt").unlink()
+        ingest.main(str(docs))
+        assert len(FAQIndex.load(faq_index_path())) == 0
+        assert get_collection_version() != version
+
+    def test_numpy_backend_exports_index(self, ingest, docs, mocker):
+        mocker.patch.object(settings, "retrieval_backend", "numpy")
+
+        ingest.main(str(docs))
+        retriever = NumpyRetriever(numpy_index_path(), settings.embedding_model)
+        assert len(retriever) == 2
+
+        (docs / "faq.txt").unlink()
+        ingest.main(str(docs))
+        retriever = NumpyRetriever(numpy_index_path(), settings.embedding_model)
+        assert len(retriever) == 1
+
+    def test_rebuilds_index_without_quantized_codes(self, ingest, docs, mocker):
+        mocker.patch.object(settings, "retrieval_backend", "numpy")
+        ingest.main(str(docs))
+        # an index written before the quantized codes existed
+        (numpy_index_path() / INT8_FILE).unlink()
+        (numpy_index_path() / INT8_SCALES_FILE).unlink()
+        version = get_collection_version()
+
+        ingest.main(str(docs))
+
+        retriever = QuantizedRetriever(numpy_index_path(), settings.embedding_model)
+        assert len(retriever) == 2
+        assert get_collection_version() != version
+
+
+class TestBatchedPipeline:
+    """Tests for the streaming, batched embedding pipeline"""
+
+    @pytest.fixture
+    def many_docs(self, tmp_path):
+        path = tmp_path / "many"
+        path.mkdir()
+        for i in range(6):
+            paragraphs = [f"Document {i} paragraph {j}. " * 3 for j in range(4)]
+            (path / f"doc_{i}.txt").write_text("\n\n".join(paragraphs))
+        return path
+
+    def test_writes_all_chunks_in_batches(self, ingest, many_docs, mocker):
+        mocker.patch.object(settings, "chunk_size", 16)
+        mocker.patch.object(settings, "chunk_overlap", 0)
+        mocker.patch.object(settings, "ingest_batch_size", 5)
+        mocker.patch.object(settings, "ingest_workers", 3)
+        write_spy = mocker.spy(ingest, "write_batch")
+
+        summary = ingest.main(str(many_docs))
+
+        expected = len(list(ingest.split_documents(ingest.load_documents(many_docs))))
+        assert summary["ingested"] == expected
+        assert len(ingest.vector_store.get()["ids"]) == expected
+        assert all(len(call.args[0]) <= 5 for call in write_spy.call_args_list)
+        assert summary["chunks_per_second"] > 0
+
+    def test_interrupted_run_resumes(self, ingest, many_docs, mocker):
+        mocker.patch.object(settings, "chunk_size", 16)
+        mocker.patch.object(settings, "chunk_overlap", 0)
+        mocker.patch.object(settings, "ingest_batch_size", 4)
+        mocker.patch.object(settings, "ingest_workers", 1)
+        real_write = ingest.write_batch
+        calls = {"n": 0}
+
+        def crash_on_fourth(batch, vectors):
+            calls["n"] += 1
+            if calls["n"] == 4:
+                raise RuntimeError("crash")
+            real_write(batch, vectors)
+
+        mocker.patch.object(ingest, "write_batch", side_effect=crash_on_fourth)
+        with pytest.raises(RuntimeError):
+            ingest.main(str(many_docs))
+
+        completed = set(ingest.load_manifest()["files"])
+        assert 0 < len(completed) < 6
+
+        mocker.patch.object(ingest, "write_batch", side_effect=real_write)
+        summary = ingest.main(str(many_docs))
+
+        assert summary["unchanged"] == len(completed)
+        assert set(ingest.load_manifest()["files"]) == {
+            f"doc_{i}.txt" for i in range(6)
+        }
@@ -4,12 +4,15 @@ Unit tests for LLM service
 Tests the chat orchestratio logic with mocked dependencies
 """
 
+import asyncio
 from unittest.mock import AsyncMock
 
 import pytest
 
-from genai_challenge.core.prompts import SYSTEM_PROMPT
-from genai_challenge.services.llm_service import chat
+from genai_challenge.config import settings
+from genai_challenge.core.prompts import SUMMARY_PROMPT, SYSTEM_PROMPT
+from genai_challenge.services import llm_service
+from genai_challenge.services.llm_service import chat, chat_batch, chat_stream
 from genai_challenge.services.memory import conversation_store
 
 
@@ -135,3 +138,234 @@ class TestChatService:
         call_args = mock_generate_response.call_args
         # model_name is the second positional argument
         assert call_args[0][1] == "llama3:8b"
+
+    @pytest.mark.asyncio
+    async def test_passes_session_for_fair_queuing(self, mock_generate_response):
+        """Should tell the scheduler which session the turn belongs to."""
+        await chat(message="Hello", session_id="test-session-queue")
+
+        call_args = mock_generate_response.call_args
+        assert call_args.kwargs["session_id"] == "test-session-queue"
+
+
+class TestChatStreamService:
+    """Tests for chat_stream() function."""
+
+    @pytest.fixture
+    def mock_stream_response(self, mocker):
+        """Mock the Ollama streaming adapter."""
+
+        async def fake_stream(messages, model_name=None, **kwargs):
+            for token in ["Hello", " human", "!"]:
+                yield token
+
+        return mocker.patch(
+            "genai_challenge.services.llm_service.stream_response",
+            side_effect=fake_stream,
+        )
+
+    @pytest.mark.asyncio
+    async def test_yields_session_tokens_and_done(self, mock_stream_response):
+        events = [e async for e in chat_stream(message="Hi", session_id="stream-1")]
+
+        assert events[0] == {"type": "session", "session_id": "stream-1"}
+        assert [e["content"] for e in events if e["type"] == "token"] == [
+            "Hello",
+            " human",
+            "!",
+        ]
+        assert events[-1] == {"type": "done", "session_id": "stream-1"}
+
+    @pytest.mark.asyncio
+    async def test_saves_full_reply_after_stream(self, mock_stream_response):
+        session_id = "stream-save"
+
+        async for _ in chat_stream(message="Hi there", session_id=session_id):
+            pass
+
+        history = conversation_store.get_history(session_id)
+        assert history[1] == {"role": "assistant", "content": "Hello human!"}
+
+    @pytest.mark.asyncio
+    async def test_interrupted_stream_is_not_saved(self, mock_stream_response):
+        session_id = "stream-interrupted"
+
+        stream = chat_stream(message="Hi", session_id=session_id)
+        async for event in stream:
+            if event["type"] == "token":
+                break
+        await stream.aclose()
+
+        assert conversation_store.get_history(session_id) == []
+
+
+class TestChatBatchService:
+    """Tests for chat_batch() function."""
+
+    @pytest.fixture
+    def mock_generate_response(self, mocker):
+        """Echo the last user message and the history size."""
+
+        async def fake_generate(messages, model_name=None, **kwargs):
+            await asyncio.sleep(0)
+            return f"{messages[-1]['content']} ({len(messages) - 2} previous)"
+
+        return mocker.patch(
+            "genai_challenge.services.llm_service.generate_response",
+            side_effect=fake_generate,
+        )
+
+    @pytest.mark.asyncio
+    async def test_keeps_session_order(self, mock_generate_response):
+        results = await chat_batch(
+            [
+                ("first", "batch-a"),
+                ("other", "batch-b"),
+                ("second", "batch-a"),
+            ]
+        )
+
+        assert [r["response"] for r in results] == [
+            "first (0 previous)",
+            "other (0 previous)",
+            "second (2 previous)",
+        ]
+        history = conversation_store.get_history("batch-a")
+        assert [msg["content"] for msg in history][::2] == ["first", "second"]
+
+    @pytest.mark.asyncio
+    async def test_new_sessions_get_their_own_id(self, mock_generate_response):
+        results = await chat_batch([("Hi", None), ("Hello", None)])
+
+        assert results[0]["session_id"] != results[1]["session_id"]
+        assert all(len(r["session_id"]) == 36 for r in results)
+
+    @pytest.mark.asyncio
+    async def test_writes_memory_once(self, mocker, mock_generate_response):
+        add_interactions = mocker.spy(conversation_store, "add_interactions")
+
+        await chat_batch([("q1", "batch-c"), ("q2", "batch-d")])
+
+        add_interactions.assert_called_once()
+        assert len(add_interactions.call_args[0][0]) == 2
+
+    @pytest.mark.asyncio
+    async def test_failure_skips_later_turns_of_session(self, mocker):
+        async def flaky_generate(messages, model_name=None, **kwargs):
+            if messages[-1]["content"] == "bad":
+                raise RuntimeError("Ollama unavailable")
+            return "ok"
+
+        mocker.patch(
+            "genai_challenge.services.llm_service.generate_response",
+            side_effect=flaky_generate,
+        )
+
+        results = await chat_batch(
+            [("bad", "batch-e"), ("after", "batch-e"), ("fine", "batch-f")]
+        )
+
+        assert results[0]["error"] == "Ollama unavailable"
+        assert results[1]["error"].startswith("Skipped")
+        assert results[2] == {
+            "response": "ok",
+            "session_id": "batch-f",
+            "error": None,
+        }
+        assert conversation_store.get_history("batch-e") == []
+
+
+class TestHistorySummarization:
+    """Tests for compacting long histories into a summary."""
+
+    @pytest.fixture(autouse=True)
+    def enable_summaries(self, mocker):
+        mocker.patch.object(settings, "memory_summary_enabled", True)
+        mocker.patch.object(settings, "memory_summary_threshold_tokens", 20)
+        mocker.patch.object(settings, "memory_summary_keep_turns", 1)
+
+    @pytest.fixture
+    def mock_generate_response(self, mocker):
+        """Summaries for summary requests, a fixed reply otherwise."""
+
+        async def fake_generate(messages, model_name=None, **kwargs):
+            if messages[0]["content"] == SUMMARY_PROMPT:
+                return " The user asked about vacation days. "
+            return "A reply of a few words"
+
+        return mocker.patch(
+            "genai_challenge.services.llm_service.generate_response",
+            side_effect=fake_generate,
+        )
+
+    async def wait_for_compactions(self):
+        await asyncio.gather(*llm_service._compactions.values())
+
+    @pytest.mark.asyncio
+    async def test_compacts_after_the_reply(self, mock_generate_response):
+        for i in range(3):
+            await chat(f"Question number {i} about vacation days", "summary-a")
+            await self.wait_for_compactions()
+
+        history = conversation_store.get_history("summary-a")
+        assert [msg["content"] for msg in history][::2] == [
+            "Question number 2 about vacation days"
+        ]
+        summary = conversation_store.get_summary("summary-a")
+        assert summary["content"] == "The user asked about vacation days."
+        assert summary["source_tokens"] > 0
+
+    @pytest.mark.asyncio
+    async def test_sends_summary_before_recent_history(self, mock_generate_response):
+        for i in range(3):
+            await chat(f"Question number {i} about vacation days", "summary-b")
+            await self.wait_for_compactions()
+        saved_before = llm_service.summary_tokens_saved.count()
+
+        await chat("And sick days?", "summary-b")
+
+        messages = mock_generate_response.call_args[0][0]
+        assert messages[0]["content"] == SYSTEM_PROMPT
+        assert messages[1]["content"].startswith("Summary of the earlier")
+        assert messages[2]["content"] == "Question number 2 about vacation days"
+        assert llm_service.summary_tokens_saved.count() == saved_before + 1
+        await self.wait_for_compactions()
+
+    def test_savings_count_only_turns_the_window_would_send(self, mocker):
+        # a 3-token summary replacing compacted turns of 10 and 20 tokens
+        summary = {"content": "x" * 8, "window_turn_tokens": [10, 20]}
+        mocker.patch.object(conversation_store, "window_tokens", None)
+        assert llm_service._tokens_saved(summary, []) == 27
+
+        # a 25-token budget with 5 tokens of window left room for 20 more
+        mocker.patch.object(conversation_store, "window_tokens", 25)
+        window = [{"role": "user", "content": "x" * 16}]
+        assert llm_service._tokens_saved(summary, window) == 17
+
+    @pytest.mark.asyncio
+    async def test_short_history_is_not_compacted(self, mock_generate_response):
+        await chat("Hi", "summary-c")
+        await self.wait_for_compactions()
+
+        assert mock_generate_response.call_count == 1
+        assert conversation_store.get_summary("summary-c") is None
+
+    @pytest.mark.asyncio
+    async def test_failed_summary_keeps_history(self, mocker):
+        async def fake_generate(messages, model_name=None, **kwargs):
+            if messages[0]["content"] == SUMMARY_PROMPT:
+                raise RuntimeError("Ollama unavailable")
+            return "A reply of a few words"
+
+        mocker.patch(
+            "genai_challenge.services.llm_service.generate_response",
+            side_effect=fake_generate,
+        )
+        errors = llm_service.compactions.value(result="error")
+
+        for i in range(3):
+            await chat(f"Question number {i} about vacation days", "summary-d")
+            await self.wait_for_compactions()
+
+        assert len(conversation_store.get_history("summary-d")) == 6
+        assert llm_service.compactions.value(result="error") > errors
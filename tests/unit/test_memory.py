@@ -2,9 +2,16 @@
 Unit tests for conversation memory store
 """
 
+import threading
+
 import pytest
 
-from genai_challenge.services.memory import ConversationStore
+from genai_challenge.config import settings
+from genai_challenge.services.memory import (
+    ConversationStore,
+    SQLiteConversationStore,
+    create_conversation_store,
+)
 
 
 class TestConversationStore:
@@ -65,3 +72,350 @@ class TestConversationStore:
         history.append({"role": "user", "content": "Modified"})
 
         assert len(store.get_history("session-1")) == 2
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestBoundedConversationStore:
+    """Tests for eviction, turn windows and metrics"""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    def test_evicts_least_recently_used_session(self):
+        store = ConversationStore(max_sessions=2)
+        store.add_interaction("session-1", "Hello", "Hi!")
+        store.add_interaction("session-2", "Hello", "Hi!")
+        store.get_history("session-1")  # session-1 becomes most recent
+
+        store.add_interaction("session-3", "Hello", "Hi!")
+
+        assert store.get_history("session-2") == []
+        assert len(store.get_history("session-1")) == 2
+        assert store.stats()["evictions"] == 1
+
+    def test_expires_idle_sessions(self, clock):
+        store = ConversationStore(session_ttl_seconds=60, clock=clock)
+        store.add_interaction("session-1", "Hello", "Hi!")
+
+        clock.now = 61
+
+        assert store.get_history("session-1") == []
+        assert store.stats()["expirations"] == 1
+
+    def test_keeps_at_most_max_turns(self):
+        store = ConversationStore(max_turns=2)
+        for i in range(5):
+            store.add_interaction("session-1", f"q{i}", f"a{i}")
+
+        history = store.get_history("session-1")
+        assert [msg["content"] for msg in history] == ["q3", "a3", "q4", "a4"]
+
+    def test_window_limits_turns(self):
+        store = ConversationStore(window_turns=2)
+        for i in range(5):
+            store.add_interaction("session-1", f"q{i}", f"a{i}")
+
+        window = store.get_window("session-1")
+        assert [msg["content"] for msg in window] == ["q3", "a3", "q4", "a4"]
+        assert len(store.get_history("session-1")) == 10
+
+    def test_window_moves_in_strides(self):
+        store = ConversationStore(window_turns=4, window_stride=2)
+        windows = []
+        for i in range(7):
+            store.add_interaction("session-1", f"q{i}", f"a{i}")
+            window = store.get_window("session-1")
+            windows.append([msg["content"] for msg in window if msg["role"] == "user"])
+
+        assert windows[3] == ["q0", "q1", "q2", "q3"]
+        # full window: the two oldest turns go at once
+        assert windows[4] == ["q2", "q3", "q4"]
+        # then the window only grows at the end until it is full again
+        assert windows[5] == ["q2", "q3", "q4", "q5"]
+        assert windows[6] == ["q4", "q5", "q6"]
+
+    def test_strides_stay_aligned_past_max_turns(self):
+        store = ConversationStore(max_turns=12, window_turns=4, window_stride=2)
+        first = []
+        for i in range(20):
+            store.add_interaction("session-1", f"q{i}", f"a{i}")
+            first.append(store.get_window("session-1")[0]["content"])
+
+        # the window start moves once per stride, also after turns are dropped
+        assert first[12:] == ["q10", "q10", "q12", "q12", "q14", "q14", "q16", "q16"]
+        assert store.turn_count("session-1") == 20
+
+    def test_window_respects_token_budget(self):
+        store = ConversationStore(window_tokens=30)
+        store.add_interaction("session-1", "x" * 200, "old answer")
+        store.add_interaction("session-1", "short", "reply")
+
+        window = store.get_window("session-1")
+        assert [msg["content"] for msg in window] == ["short", "reply"]
+
+    def test_fit_window_trims_unsaved_history(self):
+        store = ConversationStore(window_turns=1)
+        messages = [
+            {"role": "user", "content": "q0"},
+            {"role": "assistant", "content": "a0"},
+            {"role": "user", "content": "q1"},
+            {"role": "assistant", "content": "a1"},
+        ]
+
+        window = store.fit_window(messages)
+        assert [msg["content"] for msg in window] == ["q1", "a1"]
+
+    def test_compact_replaces_oldest_turns(self):
+        store = ConversationStore()
+        for i in range(3):
+            store.add_interaction("session-1", f"q{i}", f"a{i}")
+        older = store.get_history("session-1")[:4]
+
+        assert store.compact("session-1", "summary", older, source_tokens=8)
+
+        history = store.get_history("session-1")
+        assert [msg["content"] for msg in history] == ["q2", "a2"]
+        assert store.get_summary("session-1") == {
+            "content": "summary",
+            "source_tokens": 8,
+            "window_turn_tokens": [2, 2],
+        }
+        assert store.stats()["content_chars"] == 4
+
+    def test_summary_tracks_compacted_turns_in_window(self):
+        store = ConversationStore(window_turns=3, window_stride=1)
+        for i in range(4):
+            store.add_interaction("session-1", f"q{i}", f"answer {i}")
+        older = store.get_history("session-1")[:4]
+        store.compact("session-1", "summary", older, source_tokens=8)
+
+        # the window (q1..q3) would still hold the compacted q1
+        assert store.get_summary("session-1")["window_turn_tokens"] == [4]
+
+        store.add_interaction("session-1", "q4", "answer 4")
+        assert store.get_summary("session-1")["window_turn_tokens"] == []
+
+    def test_compact_skips_changed_history(self):
+        store = ConversationStore()
+        store.add_interaction("session-1", "q0", "a0")
+        older = store.get_history("session-1")
+        store.clear_session("session-1")
+        store.add_interaction("session-1", "new", "turn")
+
+        assert not store.compact("session-1", "summary", older, source_tokens=2)
+        assert store.get_summary("session-1") is None
+        assert len(store.get_history("session-1")) == 2
+
+    def test_stats_track_content_size(self):
+        store = ConversationStore(max_turns=1)
+        store.add_interaction("session-1", "abc", "de")
+        assert store.stats()["content_chars"] == 5
+
+        store.add_interaction("session-1", "f", "g")
+        stats = store.stats()
+        assert stats["content_chars"] == 2
+        assert stats["messages"] == 2
+
+        store.clear_session("session-1")
+        assert store.stats() == {
+            "sessions": 0,
+            "messages": 0,
+            "content_chars": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+
+class TestSQLiteConversationStore:
+    """Tests for SQLiteConversationStore"""
+
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        return str(tmp_path / "conversations.db")
+
+    @pytest.fixture
+    def store(self, db_path):
+        store = SQLiteConversationStore(path=db_path)
+        yield store
+        store.close()
+
+    def test_get_history_empty_session(self, store):
+        assert store.get_history("new-session") == []
+
+    def test_add_interaction(self, store):
+        store.add_interaction("session-1", "Hello", "Hi there!")
+
+        assert store.get_history("session-1") == [
+            {"role": "user", "content": "Hello"},
+            {"role": "assistant", "content": "Hi there!"},
+        ]
+
+    def test_uses_wal_mode(self, store):
+        mode = store._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+    def test_shared_between_instances(self, store, db_path):
+        """Two stores on one file behave like two worker processes."""
+        other = SQLiteConversationStore(path=db_path)
+        store.add_interaction("session-1", "Hello", "Hi!")
+
+        assert len(other.get_history("session-1")) == 2
+
+        other.add_interaction("session-1", "Again", "Hi again!")
+        assert len(store.get_history("session-1")) == 4
+        other.close()
+
+    def test_survives_restart(self, db_path):
+        store = SQLiteConversationStore(path=db_path)
+        store.add_interaction("session-1", "Hello", "Hi!")
+        store.close()
+
+        reopened = SQLiteConversationStore(path=db_path)
+        assert len(reopened.get_history("session-1")) == 2
+        reopened.close()
+
+    def test_bulk_add_interactions(self, store):
+        store.add_interactions(
+            [
+                ("session-1", "q1", "a1"),
+                ("session-2", "q2", "a2"),
+                ("session-1", "q3", "a3"),
+            ]
+        )
+
+        history = store.get_history("session-1")
+        assert [msg["content"] for msg in history] == ["q1", "a1", "q3", "a3"]
+        assert store.stats()["sessions"] == 2
+
+    def test_window_and_max_turns(self, db_path):
+        store = SQLiteConversationStore(path=db_path, max_turns=3, window_turns=2)
+        for i in range(5):
+            store.add_interaction("session-1", f"q{i}", f"a{i}")
+
+        assert len(store.get_history("session-1")) == 6
+        window = store.get_window("session-1")
+        assert [msg["content"] for msg in window] == ["q3", "a3", "q4", "a4"]
+        store.close()
+
+    def test_strides_stay_aligned_past_max_turns(self, mocker, db_path):
+        store = SQLiteConversationStore(
+            path=db_path, max_turns=12, window_turns=4, window_stride=2
+        )
+        recent = mocker.spy(store, "_recent_messages")
+        first = []
+        for i in range(20):
+            store.add_interaction("session-1", f"q{i}", f"a{i}")
+            first.append(store.get_window("session-1")[0]["content"])
+
+        assert first[12:] == ["q10", "q10", "q12", "q12", "q14", "q14", "q16", "q16"]
+        # only the window is read, not the whole stored history
+        assert {call.args[1] for call in recent.call_args_list} == {8}
+        store.close()
+
+    def test_evicts_least_recently_used_session(self, db_path):
+        clock = FakeClock()
+        store = SQLiteConversationStore(path=db_path, max_sessions=2, clock=clock)
+        for i, session_id in enumerate(["session-1", "session-2", "session-3"]):
+            clock.now = i
+            store.add_interaction(session_id, "Hello", "Hi!")
+
+        assert store.get_history("session-1") == []
+        assert store.stats()["evictions"] == 1
+        store.close()
+
+    def test_reads_refresh_last_access(self, db_path):
+        clock = FakeClock()
+        store = SQLiteConversationStore(path=db_path, max_sessions=2, clock=clock)
+        store.add_interaction("session-1", "Hello", "Hi!")
+        clock.now = 1
+        store.add_interaction("session-2", "Hello", "Hi!")
+        clock.now = 2
+        store.get_window("session-1")  # session-1 becomes most recent
+
+        clock.now = 3
+        store.add_interaction("session-3", "Hello", "Hi!")
+
+        assert store.get_history("session-2") == []
+        assert len(store.get_history("session-1")) == 2
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_run_calls_off_event_loop(self, store):
+        await store.run(store.add_interaction, "session-1", "Hello", "Hi!")
+
+        thread = await store.run(threading.current_thread)
+
+        assert thread is not threading.main_thread()
+        assert len(await store.run(store.get_history, "session-1")) == 2
+
+    def test_expires_idle_sessions(self, db_path):
+        clock = FakeClock()
+        store = SQLiteConversationStore(
+            path=db_path, session_ttl_seconds=60, clock=clock
+        )
+        store.add_interaction("session-1", "Hello", "Hi!")
+
+        clock.now = 61
+        store.add_interaction("session-2", "Hello", "Hi!")
+
+        assert store.get_history("session-1") == []
+        assert store.stats()["expirations"] == 1
+        store.close()
+
+    def test_clear_session(self, store):
+        store.add_interaction("session-1", "Hello", "Hi!")
+        store.clear_session("session-1")
+
+        assert store.get_history("session-1") == []
+        assert store.stats()["messages"] == 0
+
+    def test_compact_replaces_oldest_turns(self, store):
+        for i in range(3):
+            store.add_interaction("session-1", f"q{i}", f"a{i}")
+        older = store.get_history("session-1")[:4]
+
+        assert store.compact("session-1", "summary", older, source_tokens=8)
+        assert not store.compact("session-1", "again", older, source_tokens=8)
+
+        history = store.get_history("session-1")
+        assert [msg["content"] for msg in history] == ["q2", "a2"]
+        assert store.get_summary("session-1") == {
+            "content": "summary",
+            "source_tokens": 8,
+            "window_turn_tokens": [2, 2],
+        }
+
+        store.clear_session("session-1")
+        assert store.get_summary("session-1") is None
+
+
+class TestCreateConversationStore:
+    """Tests for backend selection"""
+
+    def test_memory_backend_is_default(self):
+        assert isinstance(create_conversation_store(), ConversationStore)
+
+    def test_sqlite_backend(self, mocker, tmp_path):
+        mocker.patch.object(settings, "memory_backend", "sqlite")
+        mocker.patch.object(
+            settings, "memory_sqlite_path", str(tmp_path / "conversations.db")
+        )
+
+        store = create_conversation_store()
+
+        assert isinstance(store, SQLiteConversationStore)
+        store.close()
+
+    def test_unknown_backend(self, mocker):
+        mocker.patch.object(settings, "memory_backend", "redis")
+
+        with pytest.raises(ValueError):
+            create_conversation_store()
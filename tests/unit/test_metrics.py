@@ -0,0 +1,125 @@
+"""
+Unit tests for the metrics registry and timing spans
+"""
+
+import pytest
+
+from genai_challenge.adapters.chroma import RetrievalExecutor
+from genai_challenge.core import metrics as metrics_module
+from genai_challenge.core.metrics import (
+    MetricsRegistry,
+    collect_timings,
+    format_timings,
+    span,
+)
+
+
+class TestMetricsRegistry:
+    """Tests for counters, histograms and collectors"""
+
+    @pytest.fixture
+    def registry(self):
+        return MetricsRegistry()
+
+    def test_counter_per_label_set(self, registry):
+        counter = registry.counter("requests_total", "Requests")
+        counter.inc(status="200")
+        counter.inc(2, status="200")
+        counter.inc(status="500")
+
+        assert counter.value(status="200") == 3
+        assert 'requests_total{status="500"} 1.0' in registry.render()
+
+    def test_gauge_is_set(self, registry):
+        gauge = registry.gauge("queue_depth", "Depth")
+        gauge.set(3, priority="batch")
+        gauge.set(1, priority="batch")
+
+        text = registry.render()
+        assert "# TYPE queue_depth gauge" in text
+        assert 'queue_depth{priority="batch"} 1' in text
+
+    def test_same_name_returns_same_metric(self, registry):
+        assert registry.counter("a", "A") is registry.counter("a", "A")
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        histogram = registry.histogram("latency_seconds", "Latency", (0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, stage="llm")
+
+        text = registry.render()
+        assert 'latency_seconds_bucket{stage="llm",le="0.1"} 2.0' in text
+        assert 'latency_seconds_bucket{stage="llm",le="1"} 3.0' in text
+        assert 'latency_seconds_bucket{stage="llm",le="+Inf"} 4.0' in text
+        assert 'latency_seconds_count{stage="llm"} 4.0' in text
+        assert histogram.count(stage="llm") == 4
+
+    def test_label_values_are_escaped(self, registry):
+        registry.counter("c", "C").inc(path='a"b')
+
+        assert 'c{path="a\\"b"} 1.0' in registry.render()
+
+    def test_collectors_are_read_at_render(self, registry):
+        size = [1]
+        registry.register_collector(lambda: [("cache_size", "gauge", "Size", size[0])])
+        size[0] = 5
+
+        assert "cache_size 5.0" in registry.render()
+
+
+class TestSpan:
+    """Tests for span() and per-request timings"""
+
+    def test_records_stage_duration(self, mocker):
+        histogram = mocker.patch.object(metrics_module, "stage_seconds")
+
+        with span("embed"):
+            pass
+
+        histogram.observe.assert_called_once()
+        assert histogram.observe.call_args.kwargs == {"stage": "embed"}
+
+    def test_counts_errors(self, mocker):
+        errors = mocker.patch.object(metrics_module, "stage_errors")
+
+        with pytest.raises(RuntimeError), span("llm"):
+            raise RuntimeError("boom")
+
+        errors.inc.assert_called_once_with(stage="llm")
+
+    def test_noop_when_disabled(self, mocker):
+        mocker.patch.object(metrics_module.settings, "metrics_enabled", False)
+        histogram = mocker.patch.object(metrics_module, "stage_seconds")
+
+        with span("embed"):
+            pass
+
+        histogram.observe.assert_not_called()
+
+    def test_collects_request_timings(self, mocker):
+        mocker.patch.object(metrics_module.settings, "metrics_enabled", False)
+
+        with collect_timings() as timings:
+            with span("embed"):
+                pass
+            with span("embed"):
+                pass
+        with span("embed"):
+            pass
+
+        assert list(timings) == ["embed"]
+        assert format_timings({"embed": 0.0123}) == "embed;dur=12.3"
+
+    @pytest.mark.asyncio
+    async def test_timings_cross_the_retrieval_executor(self):
+        executor = RetrievalExecutor(workers=1, max_queue=1, queue_timeout=1)
+
+        def search():
+            with span("vector_search"):
+                pass
+
+        with collect_timings() as timings:
+            await executor.run(search)
+        executor.shutdown()
+
+        assert "vector_search" in timings
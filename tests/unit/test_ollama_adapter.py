@@ -0,0 +1,243 @@
+"""
+Unit tests for Ollama adapter
+
+Runs the adapter against a local stub server standing in for Ollama.
+"""
+
+import asyncio
+import socket
+
+import httpx
+import pytest
+
+from genai_challenge.adapters import ollama
+from genai_challenge.adapters.ollama import (
+    ChatModelPool,
+    generate_response,
+    stream_response,
+)
+from genai_challenge.config import settings
+
+
+class TestChatModelPool:
+    """Tests for pooled ChatOllama clients."""
+
+    @pytest.fixture
+    def pool(self, mocker, ollama_stub):
+        mocker.patch.object(ollama.settings, "ollama_base_url", ollama_stub.url)
+        pool = ChatModelPool(max_concurrency=2)
+        mocker.patch.object(ollama, "chat_model_pool", pool)
+        return pool
+
+    @pytest.fixture
+    def messages(self):
+        return [
+            {"role": "system", "content": "You are a test."},
+            {"role": "user", "content": "Hello"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_returns_stub_reply(self, pool, ollama_stub, messages):
+        response = await generate_response(messages)
+
+        assert response == "Stub reply"
+        assert ollama_stub.requests[0]["messages"][-1]["content"] == "Hello"
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_reuses_client_and_connection(self, pool, ollama_stub, messages):
+        for _ in range(3):
+            await generate_response(messages)
+
+        stats = pool.stats()
+        assert stats["clients_created"] == 1
+        assert stats["clients_reused"] == 2
+        assert stats["requests"] == 3
+        # keep-alive: every request went over the same TCP connection
+        assert len(ollama_stub.connections) == 1
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_one_client_per_model(self, pool, messages):
+        await generate_response(messages, "model-a")
+        await generate_response(messages, "model-b")
+        await generate_response(messages, "model-a")
+
+        stats = pool.stats()
+        assert stats["models"] == ["model-a", "model-b"]
+        assert stats["clients_created"] == 2
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_caps_in_flight_requests(self, pool, ollama_stub, messages):
+        ollama_stub.delay = 0.05
+
+        await asyncio.gather(*(generate_response(messages) for _ in range(6)))
+
+        assert ollama_stub.max_active <= 2
+        stats = pool.stats()
+        assert stats["in_flight"] == 0
+        assert stats["waiting"] == 0
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_passes_keep_alive_and_context_size(
+        self, mocker, pool, ollama_stub, messages
+    ):
+        mocker.patch.object(ollama.settings, "ollama_keep_alive", "30m")
+        mocker.patch.object(ollama.settings, "ollama_num_ctx", 8192)
+
+        await generate_response(messages)
+
+        payload = ollama_stub.requests[0]
+        assert payload["keep_alive"] == "30m"
+        assert payload["options"]["num_ctx"] == 8192
+        await pool.aclose()
+
+
+def _closed_port_url() -> str:
+    """URL of a local port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+class TestBackendRouting:
+    """Tests for routing generations across several Ollama backends."""
+
+    @pytest.fixture
+    def messages(self):
+        return [{"role": "user", "content": "Hello"}]
+
+    @pytest.fixture
+    def make_pool(self, mocker):
+        pools = []
+
+        def make(urls: list[str]) -> ChatModelPool:
+            pool = ChatModelPool(max_concurrency=2, base_urls=urls)
+            mocker.patch.object(ollama, "chat_model_pool", pool)
+            pools.append(pool)
+            return pool
+
+        yield make
+
+    @pytest.mark.asyncio
+    async def test_spreads_load_by_outstanding_requests(
+        self, make_pool, ollama_stubs, messages
+    ):
+        pool = make_pool([stub.url for stub in ollama_stubs])
+        for stub in ollama_stubs:
+            stub.delay = 0.05
+
+        await asyncio.gather(*(generate_response(messages) for _ in range(6)))
+
+        assert [len(stub.requests) for stub in ollama_stubs] == [2, 2, 2]
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_session_sticks_to_one_backend(
+        self, make_pool, ollama_stubs, messages
+    ):
+        pool = make_pool([stub.url for stub in ollama_stubs])
+
+        for _ in range(3):
+            await generate_response(messages, session_id="session-a")
+            await generate_response(messages, session_id="session-b")
+
+        counts = sorted(len(stub.requests) for stub in ollama_stubs)
+        assert counts == [0, 3, 3]
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_busy_sticky_backend_spills_over(
+        self, make_pool, ollama_stubs, messages
+    ):
+        stubs = ollama_stubs[:2]
+        pool = make_pool([stub.url for stub in stubs])
+        for stub in stubs:
+            stub.delay = 0.05
+        sessions = ["session-a", "session-b", "session-c", "session-d"]
+        for session_id in sessions:
+            pool._sessions[session_id] = pool.backends[0]
+
+        await asyncio.gather(
+            *(generate_response(messages, session_id=s) for s in sessions)
+        )
+
+        # the first backend is full at max_concurrency=2, so the rest move
+        assert [len(stub.requests) for stub in stubs] == [2, 2]
+        assert pool._sessions["session-d"] is pool.backends[1]
+        await pool.aclose()
+
+    def test_sticky_sessions_are_bounded(self, make_pool, mocker):
+        mocker.patch.object(settings, "ollama_sticky_max_sessions", 2)
+        pool = make_pool(["http://ollama-a:11434", "http://ollama-b:11434"])
+
+        for session_id in ["session-a", "session-b", "session-c"]:
+            pool.choose(session_id)
+
+        assert list(pool._sessions) == ["session-b", "session-c"]
+
+    @pytest.mark.asyncio
+    async def test_fails_over_from_unreachable_backend(
+        self, make_pool, ollama_stub, messages
+    ):
+        pool = make_pool([_closed_port_url(), ollama_stub.url])
+        # the unreachable host looks idle, so it is tried first
+        pool.backends[1].outstanding = 1
+
+        response = await generate_response(messages)
+
+        assert response == "Stub reply"
+        assert pool.backends[0].failures == 1
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_circuit_opens_after_failures(
+        self, mocker, make_pool, ollama_stubs, messages
+    ):
+        mocker.patch.object(ollama.settings, "ollama_failure_threshold", 2)
+        failing, healthy = ollama_stubs[:2]
+        failing.failing = True
+        pool = make_pool([failing.url, healthy.url])
+
+        for _ in range(4):
+            await generate_response(messages)
+
+        # two failed attempts open the circuit; later requests skip the host
+        assert len(failing.requests) == 0
+        assert pool.backends[0].failures == 2
+        assert pool.stats()["backends"][0]["circuit_open"]
+        assert len(healthy.requests) == 4
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_raises_when_every_backend_fails(self, make_pool, messages):
+        make_pool([_closed_port_url(), _closed_port_url()])
+
+        with pytest.raises(httpx.TransportError):
+            await generate_response(messages)
+
+    @pytest.mark.asyncio
+    async def test_stream_fails_over_before_first_token(
+        self, make_pool, ollama_stubs, messages
+    ):
+        failing, healthy = ollama_stubs[:2]
+        failing.failing = True
+        pool = make_pool([failing.url, healthy.url])
+
+        tokens = [token async for token in stream_response(messages)]
+
+        assert "".join(tokens) == "Stub reply"
+        await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_health_check_marks_backends(self, make_pool, ollama_stubs):
+        ollama_stubs[1].failing = True
+        pool = make_pool([ollama_stubs[0].url, ollama_stubs[1].url, _closed_port_url()])
+
+        await pool.check_health()
+
+        assert [b["healthy"] for b in pool.stats()["backends"]] == [True, False, False]
+        assert pool.choose() is pool.backends[0]
@@ -4,11 +4,23 @@ Unit tests for RAG service.
 Tests the RAG pipeline orchestration with mocked dependencies.
 """
 
+import asyncio
 from unittest.mock import AsyncMock
 
 import pytest
 
-from genai_challenge.services.rag_service import rag_query
+from genai_challenge.adapters.reranker import PairScoreCache, Reranker
+from genai_challenge.config import settings
+from genai_challenge.core.prompts import RAG_SYSTEM_PROMPT
+from genai_challenge.services.answer_cache import SemanticAnswerCache
+from genai_challenge.services.rag_service import (
+    rag_query,
+    rag_query_batch,
+    rag_query_stream,
+    reciprocal_rank_fusion,
+    retrieve,
+    select_context,
+)
 
 
 class TestRAGService:
@@ -147,8 +159,9 @@ class TestRAGService:
         call_args = mock_generate_response.call_args
         messages = call_args[0][0]
 
-        # System message should contain the document content
-        system_content = messages[0]["content"]
+        # The context message after the fixed prompt holds the documents
+        assert messages[0]["content"] == RAG_SYSTEM_PROMPT
+        system_content = messages[1]["content"]
         assert "refund policy allows returns within 30 days" in system_content
         assert "contact support@acme.com" in system_content
 
@@ -168,6 +181,17 @@ class TestRAGService:
         assert messages[-1]["role"] == "user"
         assert messages[-1]["content"] == "How do I get a refund?"
 
+    @pytest.mark.asyncio
+    async def test_generates_with_batch_priority(
+        self, mock_similarity_search, mock_generate_response, sample_documents
+    ):
+        """RAG generations should queue behind interactive chat."""
+        mock_similarity_search.return_value = sample_documents
+
+        await rag_query(query="Refund policy?")
+
+        assert mock_generate_response.call_args.kwargs["priority"] == "batch"
+
     @pytest.mark.asyncio
     async def test_handles_missing_metadata_gracefully(
         self, mock_similarity_search, mock_generate_response
@@ -185,3 +209,586 @@ class TestRAGService:
         source = result["sources"][0]
         assert source["source"] == "Unknown"
         assert source["chunk_id"] == 0
+
+
+class TestRAGStreamService:
+    """Tests for rag_query_stream() function."""
+
+    @pytest.fixture
+    def mock_similarity_search(self, mocker):
+        return mocker.patch("genai_challenge.services.rag_service.similarity_search")
+
+    @pytest.fixture
+    def mock_stream_response(self, mocker):
+        async def fake_stream(messages, model_name=None, **kwargs):
+            for token in ["Within", " 30 days."]:
+                yield token
+
+        return mocker.patch(
+            "genai_challenge.services.rag_service.stream_response",
+            side_effect=fake_stream,
+        )
+
+    @pytest.mark.asyncio
+    async def test_emits_sources_before_tokens(
+        self, mock_similarity_search, mock_stream_response
+    ):
+        mock_similarity_search.return_value = [
+            {
+                "content": "Returns within 30 days.",
+                "metadata": {"source": "refund_policy.txt", "chunk_id": 0},
+            }
+        ]
+
+        events = [e async for e in rag_query_stream(query="Refund window?")]
+
+        assert events[0]["type"] == "sources"
+        assert events[0]["sources"][0]["source"] == "refund_policy.txt"
+        assert [e["content"] for e in events[1:-1]] == ["Within", " 30 days."]
+        assert events[-1] == {"type": "done"}
+
+    @pytest.mark.asyncio
+    async def test_no_documents_skips_llm(
+        self, mock_similarity_search, mock_stream_response
+    ):
+        mock_similarity_search.return_value = []
+
+        events = [e async for e in rag_query_stream(query="Unknown topic")]
+
+        assert events[0] == {"type": "sources", "sources": []}
+        assert "couldn't find relevant information" in events[1]["content"]
+        mock_stream_response.assert_not_called()
+
+
+class TestRAGAnswerCache:
+    """Tests for the answer cache in front of generation."""
+
+    @pytest.fixture(autouse=True)
+    def enable_cache(self, mocker):
+        mocker.patch.object(settings, "rag_cache_enabled", True)
+        mocker.patch(
+            "genai_challenge.services.rag_service.answer_cache",
+            SemanticAnswerCache(),
+        )
+        mocker.patch(
+            "genai_challenge.services.rag_service.embed_query",
+            return_value=[0.6, 0.8],
+        )
+        return mocker.patch(
+            "genai_challenge.services.rag_service.get_collection_version",
+            return_value="v1",
+        )
+
+    @pytest.fixture
+    def mock_similarity_search(self, mocker):
+        mock = mocker.patch("genai_challenge.services.rag_service.similarity_search")
+        mock.return_value = [
+            {
+                "id": "chunk-1",
+                "content": "Returns within 30 days.",
+                "metadata": {"source": "refund_policy.txt", "chunk_id": 0},
+            }
+        ]
+        return mock
+
+    @pytest.fixture
+    def mock_generate_response(self, mocker):
+        mock = mocker.patch(
+            "genai_challenge.services.rag_service.generate_response",
+            new_callable=AsyncMock,
+        )
+        mock.return_value = "Within 30 days."
+        return mock
+
+    @pytest.mark.asyncio
+    async def test_repeated_query_skips_generation(
+        self, mock_similarity_search, mock_generate_response
+    ):
+        first = await rag_query(query="Refund window?")
+        second = await rag_query(query="What is the refund window?")
+
+        assert first == second
+        mock_generate_response.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_collection_change_invalidates(
+        self, enable_cache, mock_similarity_search, mock_generate_response
+    ):
+        await rag_query(query="Refund window?")
+        enable_cache.return_value = "v2"
+        await rag_query(query="Refund window?")
+
+        assert mock_generate_response.call_count == 2
+
+
+class TestRAGBatchService:
+    """Tests for rag_query_batch() function."""
+
+    @pytest.fixture
+    def refund_chunk(self):
+        return {
+            "id": "chunk-1",
+            "content": "Returns within 30 days.",
+            "metadata": {"source": "refund_policy.txt", "chunk_id": 0},
+        }
+
+    @pytest.fixture
+    def mock_embed_queries(self, mocker):
+        return mocker.patch(
+            "genai_challenge.services.rag_service.embed_queries",
+            side_effect=lambda queries: [[1.0, 0.0] for _ in queries],
+        )
+
+    @pytest.fixture
+    def mock_search(self, mocker):
+        return mocker.patch(
+            "genai_challenge.services.rag_service.similarity_search_by_vectors"
+        )
+
+    @pytest.fixture
+    def mock_generate_response(self, mocker):
+        async def fake_generate(messages, model_name=None, **kwargs):
+            return f"Answer to {messages[-1]['content']}"
+
+        return mocker.patch(
+            "genai_challenge.services.rag_service.generate_response",
+            side_effect=fake_generate,
+        )
+
+    @pytest.mark.asyncio
+    async def test_embeds_and_searches_once(
+        self, mock_embed_queries, mock_search, mock_generate_response, refund_chunk
+    ):
+        mock_search.return_value = [[refund_chunk], [refund_chunk]]
+
+        results = await rag_query_batch(["Refund window?", "Return policy?"])
+
+        mock_embed_queries.assert_called_once_with(["Refund window?", "Return policy?"])
+        mock_search.assert_called_once()
+        assert [r["answer"] for r in results] == [
+            "Answer to Refund window?",
+            "Answer to Return policy?",
+        ]
+        assert results[0]["sources"][0]["source"] == "refund_policy.txt"
+
+    @pytest.mark.asyncio
+    async def test_failed_item_does_not_fail_batch(
+        self, mocker, mock_embed_queries, mock_search, refund_chunk
+    ):
+        async def flaky_generate(messages, model_name=None, **kwargs):
+            if messages[-1]["content"] == "bad":
+                raise RuntimeError("Ollama unavailable")
+            return "ok"
+
+        mocker.patch(
+            "genai_challenge.services.rag_service.generate_response",
+            side_effect=flaky_generate,
+        )
+        mock_search.return_value = [[refund_chunk], [refund_chunk], []]
+
+        results = await rag_query_batch(["good", "bad", "unknown"])
+
+        assert results[0]["answer"] == "ok"
+        assert results[0]["error"] is None
+        assert results[1]["answer"] is None
+        assert results[1]["error"] == "Ollama unavailable"
+        assert "couldn't find relevant information" in results[2]["answer"]
+
+    @pytest.mark.asyncio
+    async def test_bounds_concurrent_generations(
+        self, mocker, mock_embed_queries, mock_search, refund_chunk
+    ):
+        mocker.patch.object(settings, "batch_max_concurrency", 2)
+        active = peak = 0
+
+        async def slow_generate(messages, model_name=None, **kwargs):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return "ok"
+
+        mocker.patch(
+            "genai_challenge.services.rag_service.generate_response",
+            side_effect=slow_generate,
+        )
+        mock_search.return_value = [[refund_chunk]] * 6
+
+        await rag_query_batch([f"q{i}" for i in range(6)])
+
+        assert peak == 2
+
+
+class TestHybridRetrieval:
+    """Tests for retrieval modes and reciprocal rank fusion."""
+
+    @staticmethod
+    def chunk(chunk_id: str) -> dict:
+        return {"id": chunk_id, "content": chunk_id, "metadata": {}}
+
+    @pytest.fixture
+    def mock_similarity_search(self, mocker):
+        return mocker.patch(
+            "genai_challenge.services.rag_service.similarity_search",
+            return_value=[self.chunk("a"), self.chunk("b"), self.chunk("c")],
+        )
+
+    @pytest.fixture
+    def mock_keyword_search(self, mocker):
+        return mocker.patch(
+            "genai_challenge.services.rag_service.keyword_search",
+            return_value=[self.chunk("c"), self.chunk("d")],
+        )
+
+    def test_fusion_favours_chunks_found_by_both(self):
+        fused = reciprocal_rank_fusion(
+            [
+                [self.chunk("a"), self.chunk("b"), self.chunk("c")],
+                [self.chunk("c"), self.chunk("d")],
+            ],
+            top_k=2,
+            constant=60,
+        )
+
+        assert [doc["id"] for doc in fused] == ["c", "a"]
+
+    def test_vector_mode_is_default(self, mock_similarity_search, mock_keyword_search):
+        results = retrieve("query", top_k=2)
+
+        assert [doc["id"] for doc in results] == ["a", "b", "c"]
+        mock_keyword_search.assert_not_called()
+
+    def test_bm25_mode(self, mocker, mock_similarity_search, mock_keyword_search):
+        mocker.patch.object(settings, "retrieval_mode", "bm25")
+
+        results = retrieve("query", top_k=2)
+
+        assert [doc["id"] for doc in results] == ["c", "d"]
+        mock_similarity_search.assert_not_called()
+
+    def test_hybrid_mode_fuses_candidates(
+        self, mocker, mock_similarity_search, mock_keyword_search
+    ):
+        mocker.patch.object(settings, "retrieval_mode", "hybrid")
+        mocker.patch.object(settings, "hybrid_candidates", 10)
+
+        results = retrieve("query", top_k=2)
+
+        assert [doc["id"] for doc in results] == ["c", "a"]
+        mock_similarity_search.assert_called_once_with("query", top_k=10)
+        mock_keyword_search.assert_called_once_with("query", top_k=10)
+
+    def test_unknown_mode(self, mocker):
+        mocker.patch.object(settings, "retrieval_mode", "splade")
+
+        with pytest.raises(ValueError):
+            retrieve("query")
+
+
+class TestReranking:
+    """Tests for the cross-encoder re-ranking stage."""
+
+    class StubCrossEncoder:
+        """Scores a pair by the length of the chunk."""
+
+        def __init__(self):
+            self.calls = 0
+
+        def predict(self, pairs, batch_size, show_progress_bar):
+            self.calls += 1
+            return [len(text) for _, text in pairs]
+
+    @pytest.fixture
+    def model(self, mocker):
+        mocker.patch.object(settings, "rerank_enabled", True)
+        mocker.patch.object(settings, "rerank_candidates", 4)
+        mocker.patch.object(settings, "rag_cache_enabled", False)
+        model = self.StubCrossEncoder()
+        reranker = Reranker(model_name="stub", cache=PairScoreCache(max_entries=10))
+        reranker._model = model
+        mocker.patch("genai_challenge.services.rag_service.reranker", reranker)
+        return model
+
+    @pytest.fixture
+    def mock_similarity_search(self, mocker):
+        return mocker.patch(
+            "genai_challenge.services.rag_service.similarity_search",
+            return_value=[
+                {"content": text, "metadata": {"source": "a.txt", "chunk_id": i}}
+                for i, text in enumerate(["b", "dddd", "a", "ccc"])
+            ],
+        )
+
+    @pytest.fixture
+    def mock_generate_response(self, mocker):
+        return mocker.patch(
+            "genai_challenge.services.rag_service.generate_response",
+            new_callable=AsyncMock,
+            return_value="Answer",
+        )
+
+    @pytest.mark.asyncio
+    async def test_sends_best_candidates_to_llm(
+        self, model, mock_similarity_search, mock_generate_response
+    ):
+        result = await rag_query(query="Question", top_k=2)
+
+        mock_similarity_search.assert_called_once_with("Question", top_k=4)
+        assert [s["content_preview"] for s in result["sources"]] == ["dddd", "ccc"]
+        assert result["metadata"]["reranked"]
+        assert model.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_disabled_by_default(
+        self, mocker, model, mock_similarity_search, mock_generate_response
+    ):
+        mocker.patch.object(settings, "rerank_enabled", False)
+
+        result = await rag_query(query="Question", top_k=2)
+
+        mock_similarity_search.assert_called_once_with("Question", top_k=2)
+        assert not result["metadata"]["reranked"]
+        assert model.calls == 0
+
+
+class TestFAQAnswers:
+    """Tests for answering FAQ questions from the FAQ index."""
+
+    @pytest.fixture
+    def entry(self):
+        return {
+            "question": "Is there a free trial?",
+            "answer": "Yes, all plans include a 14-day free trial.",
+            "source": "faq.txt",
+            "section": "Billing Questions",
+            "score": 0.97,
+        }
+
+    @pytest.fixture
+    def mock_match_faq(self, mocker, entry):
+        mocker.patch.object(settings, "faq_enabled", True)
+        mocker.patch(
+            "genai_challenge.services.rag_service.embed_query",
+            return_value=[1.0, 0.0],
+        )
+        mocker.patch(
+            "genai_challenge.services.rag_service.embed_queries",
+            side_effect=lambda queries: [[1.0, 0.0] for _ in queries],
+        )
+        return mocker.patch(
+            "genai_challenge.services.rag_service.match_faq",
+            side_effect=lambda embeddings: [entry for _ in embeddings],
+        )
+
+    @pytest.fixture
+    def mock_similarity_search(self, mocker):
+        return mocker.patch(
+            "genai_challenge.services.rag_service.similarity_search",
+            return_value=[
+                {
+                    "content": "Returns within 30 days.",
+                    "metadata": {"source": "refund_policy.txt", "chunk_id": 0},
+                }
+            ],
+        )
+
+    @pytest.fixture
+    def mock_generate_response(self, mocker):
+        return mocker.patch(
+            "genai_challenge.services.rag_service.generate_response",
+            new_callable=AsyncMock,
+            return_value="Generated",
+        )
+
+    @pytest.mark.asyncio
+    async def test_matching_query_skips_retrieval_and_generation(
+        self, mock_match_faq, mock_similarity_search, mock_generate_response
+    ):
+        result = await rag_query(query="Do you have a free trial?")
+
+        assert result["answer"] == "Yes, all plans include a 14-day free trial."
+        assert result["sources"][0]["source"] == "faq.txt"
+        assert result["sources"][0]["content_preview"].startswith("Q: Is there")
+        assert result["metadata"]["faq_score"] == 0.97
+        assert result["metadata"]["retrieved"] == 0
+        mock_similarity_search.assert_not_called()
+        mock_generate_response.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_other_queries_use_the_pipeline(
+        self, mock_match_faq, mock_similarity_search, mock_generate_response
+    ):
+        mock_match_faq.side_effect = lambda embeddings: [None for _ in embeddings]
+
+        result = await rag_query(query="What is the refund window?")
+
+        assert result["answer"] == "Generated"
+        assert "faq_score" not in result["metadata"]
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_stored_answer(
+        self, mock_match_faq, mock_generate_response
+    ):
+        events = [event async for event in rag_query_stream("Free trial?")]
+
+        assert [event["type"] for event in events] == ["sources", "token", "done"]
+        assert events[1]["content"] == "Yes, all plans include a 14-day free trial."
+        mock_generate_response.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_batch_generates_only_unmatched_queries(
+        self, mocker, mock_match_faq, entry, mock_generate_response
+    ):
+        mock_match_faq.side_effect = lambda embeddings: [entry, None]
+        mock_search = mocker.patch(
+            "genai_challenge.services.rag_service.similarity_search_by_vectors",
+            return_value=[
+                [
+                    {
+                        "content": "Returns within 30 days.",
+                        "metadata": {"source": "refund_policy.txt", "chunk_id": 0},
+                    }
+                ]
+            ],
+        )
+
+        results = await rag_query_batch(["Free trial?", "Refund window?"])
+
+        assert results[0]["answer"] == entry["answer"]
+        assert results[0]["error"] is None
+        assert results[1]["answer"] == "Generated"
+        assert len(mock_search.call_args.args[0]) == 1
+        mock_generate_response.assert_awaited_once()
+
+
+class TestContextSelection:
+    """Tests for select_context()"""
+
+    @staticmethod
+    def chunk(source: str, position: int, content: str, score=None) -> dict:
+        doc = {
+            "id": f"{source}:{position}",
+            "content": content,
+            "metadata": {"source": source, "chunk_id": position},
+        }
+        if score is not None:
+            doc["score"] = score
+        return doc
+
+    def test_defaults_keep_everything(self):
+        docs = [self.chunk("a.txt", 0, "alpha", 0.1), self.chunk("b.txt", 0, "beta")]
+
+        context, metadata = select_context(docs)
+
+        assert context == docs
+        assert metadata == {
+            "retrieved": 2,
+            "reranked": False,
+            "below_relevance": 0,
+            "merged": 0,
+            "over_budget": 0,
+            "context_chunks": 2,
+            "context_tokens": 4,
+        }
+
+    def test_drops_low_relevance_chunks(self, mocker):
+        mocker.patch.object(settings, "rag_min_relevance", 0.5)
+        docs = [
+            self.chunk("a.txt", 0, "relevant", 0.8),
+            self.chunk("b.txt", 0, "irrelevant", 0.2),
+            self.chunk("c.txt", 0, "keyword hit"),
+        ]
+
+        context, metadata = select_context(docs)
+
+        assert [doc["id"] for doc in context] == ["a.txt:0", "c.txt:0"]
+        assert metadata["below_relevance"] == 1
+
+    def test_merges_overlapping_neighbors(self):
+        overlap = "returns are accepted"
+        docs = [
+            self.chunk("refund.txt", 1, f"{overlap} within 30 days."),
+            self.chunk("other.txt", 0, "Unrelated."),
+            self.chunk("refund.txt", 0, f"Refund policy: {overlap}"),
+        ]
+
+        context, metadata = select_context(docs)
+
+        assert [doc["id"] for doc in context] == ["refund.txt:1", "other.txt:0"]
+        assert context[0]["content"] == (
+            "Refund policy: returns are accepted within 30 days."
+        )
+        assert metadata["merged"] == 1
+
+    def test_keeps_neighbors_without_overlap(self):
+        docs = [
+            self.chunk("refund.txt", 0, "Our refund policy allows returns."),
+            self.chunk("refund.txt", 1, "To request a refund, contact support."),
+        ]
+
+        context, _ = select_context(docs)
+
+        assert context == docs
+
+    def test_respects_token_budget(self, mocker):
+        mocker.patch.object(settings, "rag_context_max_tokens", 30)
+        docs = [
+            self.chunk("a.txt", 0, "x" * 80),
+            self.chunk("b.txt", 0, "y" * 400),
+            self.chunk("c.txt", 0, "z" * 20),
+        ]
+
+        context, metadata = select_context(docs)
+
+        assert [doc["id"] for doc in context] == ["a.txt:0", "c.txt:0"]
+        assert metadata["over_budget"] == 1
+        assert metadata["context_tokens"] == 27
+
+    def test_budgets_with_stored_token_counts(self, mocker):
+        mocker.patch.object(settings, "rag_context_max_tokens", 30)
+        docs = [self.chunk("a.txt", 0, "short"), self.chunk("b.txt", 0, "short")]
+        docs[0]["metadata"]["token_count"] = 20
+        docs[1]["metadata"]["token_count"] = 15
+
+        context, metadata = select_context(docs)
+
+        assert [doc["id"] for doc in context] == ["a.txt:0"]
+        assert metadata["context_tokens"] == 20
+
+    def test_merged_passage_counts_overlap_once(self):
+        first = self.chunk("refund.txt", 0, "Refund policy: returns are accepted")
+        second = self.chunk("refund.txt", 1, "returns are accepted within 30 days.")
+        first["metadata"].update(token_count=5, overlap_tokens=0)
+        second["metadata"].update(token_count=6, overlap_tokens=3)
+
+        context, metadata = select_context([second, first])
+
+        assert len(context) == 1
+        assert context[0]["metadata"]["token_count"] == 8
+        assert metadata["context_tokens"] == 8
+
+    def test_best_chunk_always_kept(self, mocker):
+        mocker.patch.object(settings, "rag_context_max_tokens", 10)
+
+        context, _ = select_context([self.chunk("a.txt", 0, "x" * 400)])
+
+        assert len(context) == 1
+
+    @pytest.mark.asyncio
+    async def test_rag_query_reports_metadata(self, mocker):
+        mocker.patch.object(settings, "rag_min_relevance", 0.5)
+        mocker.patch(
+            "genai_challenge.services.rag_service.similarity_search",
+            return_value=[self.chunk("a.txt", 0, "irrelevant", 0.1)],
+        )
+        mock_generate = mocker.patch(
+            "genai_challenge.services.rag_service.generate_response",
+            new_callable=AsyncMock,
+        )
+
+        result = await rag_query(query="Question")
+
+        assert "couldn't find relevant information" in result["answer"]
+        assert result["metadata"]["below_relevance"] == 1
+        mock_generate.assert_not_called()
@@ -0,0 +1,163 @@
+"""
+Unit tests for cross-encoder re-ranking
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from genai_challenge.adapters.reranker import PairScoreCache, Reranker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeCrossEncoder:
+    """Scores a pair by the number of query words in the text."""
+
+    def __init__(self, clock: FakeClock, seconds_per_pair: float = 0.01):
+        self.clock = clock
+        self.seconds_per_pair = seconds_per_pair
+        self.tokenizer = SimpleNamespace(do_lower_case=True)
+        self.calls = []
+
+    def predict(self, pairs, batch_size, show_progress_bar):
+        self.calls.append(list(pairs))
+        self.clock.now += self.seconds_per_pair * len(pairs)
+        return [
+            sum(word in text.split() for word in query.split()) for query, text in pairs
+        ]
+
+
+def chunk(text: str) -> dict:
+    return {"content": text, "metadata": {"source": "a.txt"}, "score": 0.5}
+
+
+class TestPairScoreCache:
+    """Tests for PairScoreCache"""
+
+    def test_miss_then_hit(self):
+        cache = PairScoreCache(max_entries=10)
+        assert cache.get_many("model", "refund window", ["a", "b"]) == [None, None]
+
+        cache.put_many("model", "refund window", ["a"], [2.5])
+
+        assert cache.get_many("model", "refund  window", ["a", "b"]) == [2.5, None]
+        assert cache.get_many("model", "Refund window", ["a"]) == [None]
+        assert cache.get_many("other-model", "refund window", ["a"]) == [None]
+        assert cache.stats()["hits"] == 1
+
+    def test_ignores_case_for_uncased_models(self):
+        cache = PairScoreCache(max_entries=10)
+        cache.put_many("model", "refund window", ["a"], [2.5], lowercase=True)
+
+        assert cache.get_many("model", "Refund Window", ["a"], lowercase=True) == [2.5]
+
+    def test_evicts_least_recently_used(self):
+        cache = PairScoreCache(max_entries=2)
+        cache.put_many("model", "q", ["a", "b"], [1.0, 2.0])
+        cache.get_many("model", "q", ["a"])  # "a" becomes most recent
+
+        cache.put_many("model", "q", ["c"], [3.0])
+
+        assert cache.get_many("model", "q", ["a", "b", "c"]) == [1.0, None, 3.0]
+        assert cache.stats()["evictions"] == 1
+
+
+class TestReranker:
+    """Tests for Reranker"""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    @pytest.fixture
+    def model(self, clock):
+        return FakeCrossEncoder(clock)
+
+    @pytest.fixture
+    def reranker(self, clock, model):
+        reranker = Reranker(
+            model_name="fake",
+            budget_seconds=0.1,
+            cache=PairScoreCache(max_entries=100),
+            clock=clock,
+        )
+        reranker._model = model
+        return reranker
+
+    @pytest.fixture
+    def docs(self):
+        return [
+            chunk("shipping takes five days"),
+            chunk("the refund window is 30 days"),
+            chunk("refund requests go to support"),
+        ]
+
+    def test_keeps_best_chunks_in_score_order(self, reranker, model, docs):
+        ranked = reranker.rerank("refund window", docs, top_n=2)
+
+        assert [doc["content"] for doc in ranked] == [
+            "the refund window is 30 days",
+            "refund requests go to support",
+        ]
+        assert ranked[0]["rerank_score"] == 2
+        assert ranked[0]["score"] == 0.5
+        # every pair in one batched call
+        assert len(model.calls) == 1
+        assert len(model.calls[0]) == 3
+
+    def test_scores_only_uncached_pairs(self, reranker, model, docs):
+        reranker.rerank("refund window", docs[:2], top_n=2)
+
+        reranker.rerank("refund window", docs, top_n=2)
+
+        assert [text for _, text in model.calls[1]] == [docs[2]["content"]]
+
+        reranker.rerank("Refund window", docs, top_n=2)
+        assert len(model.calls) == 2
+
+    def test_cased_model_keeps_query_case(self, reranker, model, docs):
+        model.tokenizer.do_lower_case = False
+        reranker.rerank("refund window", docs, top_n=2)
+
+        reranker.rerank("Refund window", docs, top_n=2)
+
+        assert len(model.calls) == 2
+
+    def test_skips_scoring_over_budget(self, reranker, model, docs):
+        # 3 pairs at 0.05s each take longer than the 0.1s budget
+        model.seconds_per_pair = 0.05
+        reranker.rerank("shipping", docs[:2], top_n=2)
+        assert reranker.seconds_per_pair == pytest.approx(0.05)
+
+        ranked = reranker.rerank("refund window", docs, top_n=2)
+
+        assert ranked == docs[:2]
+        assert len(model.calls) == 1
+
+    def test_scoring_resumes_after_skips(self, reranker, model, docs):
+        reranker.seconds_per_pair = 0.05
+
+        for _ in range(3):
+            reranker.rerank("refund window", docs, top_n=2)
+
+        # the estimate decays on every skip until the pairs fit again
+        assert len(model.calls) == 1
+
+    def test_single_chunk_is_not_scored(self, reranker, model):
+        docs = [chunk("refund window")]
+
+        assert reranker.rerank("refund", docs, top_n=3) == docs
+        assert model.calls == []
+
+    def test_warm_up_is_not_timed(self, reranker, model):
+        reranker.warm_up()
+
+        assert len(model.calls) == 1
+        assert reranker.seconds_per_pair == 0.0
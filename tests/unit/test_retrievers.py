@@ -0,0 +1,240 @@
+"""
+Unit tests for the retrieval backends
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from genai_challenge.adapters import retrievers
+from genai_challenge.adapters.retrievers import (
+    METADATA_FILE,
+    VECTOR_FILES,
+    ChromaRetriever,
+    NumpyRetriever,
+    QuantizedRetriever,
+    write_numpy_index,
+)
+
+
+class FakeCollection:
+    """Just enough of a Chroma collection to export and query."""
+
+    def __init__(self, embeddings: np.ndarray):
+        self.embeddings = embeddings
+        self.ids = [f"chunk-{i}" for i in range(len(embeddings))]
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def get(self, include, limit, offset):
+        rows = slice(offset, offset + limit)
+        return {
+            "ids": self.ids[rows],
+            "embeddings": self.embeddings[rows],
+            "documents": [f"text {i}" for i in range(len(self.ids))][rows],
+            "metadatas": [{"source": f"doc{i}.txt"} for i in range(len(self.ids))][
+                rows
+            ],
+        }
+
+
+@pytest.fixture
+def embeddings():
+    return np.random.default_rng(0).normal(size=(50, 16)).astype(np.float32)
+
+
+@pytest.fixture
+def index_dir(tmp_path, embeddings):
+    write_numpy_index(FakeCollection(embeddings), tmp_path / "index", "minilm")
+    return tmp_path / "index"
+
+
+class TestNumpyRetriever:
+    """Tests for NumpyRetriever and write_numpy_index()"""
+
+    def test_matches_brute_force_ranking(self, index_dir, embeddings):
+        retriever = NumpyRetriever(index_dir, "minilm")
+        query = embeddings[7] + 0.1
+
+        results = retriever.search([query.tolist()], k=5)[0]
+
+        normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        expected = np.argsort(-(normalized @ query))[:5]
+        assert [doc["id"] for doc in results] == [f"chunk-{i}" for i in expected]
+        scores = [doc["score"] for doc in results]
+        assert scores == sorted(scores, reverse=True)
+        assert results[0]["content"] == "text 7"
+        assert results[0]["metadata"] == {"source": "doc7.txt"}
+
+    def test_batch_search_shares_chunks(self, index_dir, embeddings):
+        retriever = NumpyRetriever(index_dir, "minilm")
+
+        first, second = retriever.search(
+            [embeddings[3].tolist(), embeddings[3].tolist()], k=2
+        )
+
+        assert first[0]["id"] == "chunk-3"
+        assert first[0]["score"] == pytest.approx(1.0)
+        assert first[0]["content"] is second[0]["content"]
+
+    def test_k_larger_than_index(self, index_dir, embeddings):
+        retriever = NumpyRetriever(index_dir, "minilm")
+
+        results = retriever.search([embeddings[0].tolist()], k=500)[0]
+
+        assert len(results) == len(embeddings)
+
+    def test_matrix_is_memory_mapped(self, index_dir):
+        retriever = NumpyRetriever(index_dir, "minilm")
+
+        assert isinstance(retriever._matrix, np.memmap)
+
+    def test_builds_in_pages(self, mocker, tmp_path, embeddings):
+        mocker.patch.object(retrievers, "BUILD_PAGE_SIZE", 8)
+
+        count = write_numpy_index(FakeCollection(embeddings), tmp_path, "minilm")
+
+        assert count == 50
+        assert len(NumpyRetriever(tmp_path, "minilm")) == 50
+
+    def test_empty_collection(self, tmp_path):
+        write_numpy_index(FakeCollection(np.zeros((0, 16))), tmp_path, "minilm")
+
+        results = NumpyRetriever(tmp_path, "minilm").search([[1.0] * 16], k=3)
+
+        assert results == [[]]
+
+    def test_emptied_collection_removes_vectors(self, index_dir):
+        write_numpy_index(FakeCollection(np.zeros((0, 16))), index_dir, "minilm")
+
+        assert sorted(path.name for path in index_dir.iterdir()) == [METADATA_FILE]
+        assert len(NumpyRetriever(index_dir, "minilm")) == 0
+
+    def test_metadata_is_replaced_last(self, mocker, index_dir, embeddings):
+        replace = mocker.spy(Path, "replace")
+
+        write_numpy_index(FakeCollection(embeddings[:10]), index_dir, "minilm")
+
+        targets = [call.args[1].name for call in replace.call_args_list]
+        assert sorted(targets) == sorted([*VECTOR_FILES, METADATA_FILE])
+        assert targets[-1] == METADATA_FILE
+        assert not list(index_dir.glob("*.tmp"))
+        assert len(NumpyRetriever(index_dir, "minilm")) == 10
+
+    def test_rejects_other_embedding_model(self, index_dir):
+        with pytest.raises(ValueError, match="minilm"):
+            NumpyRetriever(index_dir, "mpnet")
+
+    def test_missing_index(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            NumpyRetriever(tmp_path / "missing", "minilm")
+
+
+class TestChromaRetriever:
+    """Tests for ChromaRetriever"""
+
+    def test_cosine_space_scores(self, mocker):
+        collection = mocker.MagicMock()
+        collection.metadata = {"hnsw:space": "cosine"}
+        collection.query.return_value = {
+            "ids": [["a"]],
+            "documents": [["doc a"]],
+            "metadatas": [[None]],
+            "distances": [[0.25]],
+        }
+
+        results = ChromaRetriever(collection).search([[0.1]], k=1)
+
+        assert results[0][0]["score"] == 0.75
+
+    def test_multi_query_search_shares_chunks(self, mocker):
+        collection = mocker.MagicMock()
+        collection.query.return_value = {
+            "ids": [["a", "b"], ["b"]],
+            "documents": [["doc a", "doc b"], ["doc b"]],
+            "metadatas": [[{"source": "a.txt"}, {"source": "b.txt"}], [None]],
+            "distances": [[0.0, 0.5], [1.0]],
+        }
+
+        results = ChromaRetriever(collection).search([[0.1], [0.2]], k=2)
+
+        collection.query.assert_called_once()
+        assert [[doc["id"] for doc in batch] for batch in results] == [
+            ["a", "b"],
+            ["b"],
+        ]
+        assert results[0][1]["metadata"] is results[1][0]["metadata"]
+        assert [doc["score"] for doc in results[0]] == [1.0, 0.75]
+
+
+class TestQuantizedRetriever:
+    """Tests for the int8 / binary first pass with full-precision re-scoring"""
+
+    @pytest.fixture
+    def clustered(self):
+        """Unit vectors around a few centers, like real embeddings."""
+        rng = np.random.default_rng(1)
+        centers = rng.normal(size=(8, 64))
+        vectors = centers[rng.integers(0, 8, size=400)] + rng.normal(size=(400, 64))
+        return vectors.astype(np.float32)
+
+    @pytest.fixture
+    def clustered_dir(self, tmp_path, clustered):
+        write_numpy_index(FakeCollection(clustered), tmp_path / "index", "minilm")
+        return tmp_path / "index"
+
+    def test_writes_compact_codes(self, clustered_dir):
+        int8 = np.load(clustered_dir / retrievers.INT8_FILE)
+        binary = np.load(clustered_dir / retrievers.BINARY_FILE)
+
+        assert int8.dtype == np.int8 and int8.shape == (400, 64)
+        # 64 sign bits per vector: one uint64 word
+        assert binary.dtype == np.uint64 and binary.shape == (400, 1)
+
+    @pytest.mark.parametrize("quantization", ["int8", "binary"])
+    def test_recall_against_exact_search(self, clustered_dir, clustered, quantization):
+        exact = NumpyRetriever(clustered_dir, "minilm")
+        quantized = QuantizedRetriever(
+            clustered_dir, "minilm", quantization=quantization, rescore_multiplier=10
+        )
+        queries = (clustered[:20] + 0.3).tolist()
+
+        expected = exact.search(queries, k=5)
+        results = quantized.search(queries, k=5)
+
+        hits = sum(
+            len({d["id"] for d in got} & {d["id"] for d in want})
+            for got, want in zip(results, expected, strict=True)
+        )
+        assert hits / (20 * 5) >= 0.9
+        # re-scored with the full-precision vectors
+        assert results[0][0]["score"] == pytest.approx(
+            next(d["score"] for d in expected[0] if d["id"] == results[0][0]["id"])
+        )
+
+    def test_codes_are_smaller_than_vectors(self, clustered_dir):
+        int8 = QuantizedRetriever(clustered_dir, "minilm", quantization="int8")
+        binary = QuantizedRetriever(clustered_dir, "minilm", quantization="binary")
+
+        assert int8.nbytes == 400 * 64
+        assert binary.nbytes == 400 * 8
+
+    def test_scans_in_blocks(self, mocker, clustered_dir, clustered):
+        mocker.patch.object(retrievers, "BLOCK_ROWS", 64)
+        retriever = QuantizedRetriever(clustered_dir, "minilm", quantization="binary")
+
+        results = retriever.search([clustered[3].tolist()], k=1)
+
+        assert results[0][0]["id"] == "chunk-3"
+
+    def test_unknown_quantization(self, clustered_dir):
+        with pytest.raises(ValueError):
+            QuantizedRetriever(clustered_dir, "minilm", quantization="int4")
+
+    def test_missing_codes(self, clustered_dir):
+        (clustered_dir / retrievers.BINARY_FILE).unlink()
+
+        with pytest.raises(FileNotFoundError):
+            QuantizedRetriever(clustered_dir, "minilm", quantization="binary")
@@ -0,0 +1,111 @@
+"""
+Unit tests for the LLM admission scheduler
+"""
+
+import asyncio
+
+import pytest
+
+from genai_challenge.adapters.scheduler import (
+    BATCH,
+    INTERACTIVE,
+    GenerationScheduler,
+    LLMBusyError,
+)
+
+
+async def _queue(scheduler, order, name, priority=INTERACTIVE, session_id=None):
+    """Wait for a slot, record the admission order, then free the slot."""
+    async with scheduler.slot(priority, session_id):
+        order.append(name)
+        await asyncio.sleep(0)
+
+
+class TestGenerationScheduler:
+    """Tests for GenerationScheduler"""
+
+    @pytest.mark.asyncio
+    async def test_caps_in_flight(self):
+        scheduler = GenerationScheduler(max_in_flight=2, queue_timeout=1)
+        active = peak = 0
+
+        async def generation():
+            nonlocal active, peak
+            async with scheduler.slot():
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(generation() for _ in range(6)))
+
+        assert peak == 2
+        assert scheduler.stats()["in_flight"] == 0
+        assert scheduler.stats()["admitted"] == 6
+
+    @pytest.mark.asyncio
+    async def test_interactive_before_batch(self):
+        scheduler = GenerationScheduler(max_in_flight=1, queue_timeout=1)
+        order = []
+
+        await scheduler.acquire()
+        tasks = [
+            asyncio.create_task(_queue(scheduler, order, "batch", BATCH)),
+            asyncio.create_task(_queue(scheduler, order, "chat", INTERACTIVE)),
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["waiting_batch"] == 1
+        scheduler.release()
+        await asyncio.gather(*tasks)
+
+        assert order == ["chat", "batch"]
+
+    @pytest.mark.asyncio
+    async def test_sessions_are_served_round_robin(self):
+        scheduler = GenerationScheduler(max_in_flight=1, queue_timeout=1)
+        order = []
+
+        await scheduler.acquire()
+        tasks = [
+            asyncio.create_task(_queue(scheduler, order, name, session_id=name[0]))
+            for name in ("a1", "a2", "a3", "b1", "b2")
+        ]
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(*tasks)
+
+        assert order == ["a1", "b1", "a2", "b2", "a3"]
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self):
+        scheduler = GenerationScheduler(max_in_flight=1, queue_timeout=0.05)
+        await scheduler.acquire()
+
+        with pytest.raises(LLMBusyError):
+            await scheduler.acquire(BATCH)
+
+        assert scheduler.stats()["timeouts"] == 1
+        assert scheduler.waiting() == 0
+        scheduler.release()
+        # the slot is free again
+        await asyncio.wait_for(scheduler.acquire(), 0.1)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_frees_its_place(self):
+        scheduler = GenerationScheduler(max_in_flight=1, queue_timeout=1)
+        await scheduler.acquire()
+        waiter = asyncio.create_task(scheduler.acquire())
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        scheduler.release()
+
+        assert scheduler.stats()["in_flight"] == 0
+        assert scheduler.waiting() == 0
+
+    @pytest.mark.asyncio
+    async def test_unknown_priority(self):
+        with pytest.raises(ValueError):
+            await GenerationScheduler().acquire("urgent")